@@ -1,55 +1,80 @@
 import unittest
-import subprocess
 import time
-from selenium import webdriver
+import os
+import sys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from testkit import browser, profiler, schedule, waits
+from testkit.server import StaticServer
+from testkit.oauth_stub import OAuthStub
+from testkit.page_reset import PageResetter
+from testkit.pages import LoginPage, GoogleSignInPage
+
+
+def message_shown(driver):
+    """#message once the login check (the auth service, or the page's mock users) has answered."""
+    message = driver.find_element(By.ID, "message")
+    return message if message.text else False
+
+
 class LoginPageTests(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        cls.server_process = subprocess.Popen(["python3", "-m", "http.server", "3000"])
-        options = webdriver.ChromeOptions()
-        options.add_argument("--disable-popup-blocking")
-        options.add_argument("--lang=en-US")
-        options.add_argument("--allow-file-access-from-files")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_argument("--disable-web-security")
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option("useAutomationExtension", False)
+        # In-process server on an ephemeral port; start() returns once it answers
+        cls.server = StaticServer(HERE).start()
+        print(f"[INFO] Static server ready on {cls.server.url} in {cls.server.startup_ms:.1f} ms")
+        # Cold launch, or a fresh context in the pre-warmed Chrome with CS458_BROWSER=daemon;
+        # replaced between tests when it grows too big (see config.recycle_limits)
+        # The Google popup needs popups allowed and cross-origin checks off (browser.POPUP_ARGS)
+        cls.driver = browser.RecyclingDriver(
+            lambda: profiler.attach(browser.chrome(browser.POPUP_ARGS + browser.NO_SANDBOX_ARGS)))
+        print(f"[INFO] Chrome ready in {cls.driver.startup_ms:.0f} ms")
+        # Google sign-in is served locally; accounts.google.com is blocked in the browser
+        cls.oauth = OAuthStub().start()
+        cls.driver.on_start(cls.oauth.install)
+        # No implicit wait: declared locators fail at once (testkit.locators), waits are explicit
+        cls.driver.on_start(lambda driver: driver.implicitly_wait(0))
 
-        cls.driver = webdriver.Chrome(options=options)
-        cls.driver.implicitly_wait(5)
 
-        cls.base_url = "http://localhost:3000/index.html"
+        cls.base_url = cls.server.url_for("index.html")
+        # Clears the inputs and the message in place; reloads only if that isn't safe
+        cls.page = PageResetter(
+            cls.driver, cls.server, "index.html",
+            reset_js="const m = document.getElementById('message');"
+                     " m.textContent = ''; m.className = 'message';",
+            ready=EC.visibility_of_element_located((By.ID, "emailInput")),
+            settle=True,
+        )
     @classmethod
     def tearDownClass(cls):
-        cls.driver.implicitly_wait(100)
-        cls.server_process.terminate()
+        cls.server.stop()
+        cls.oauth.stop()
         cls.driver.quit()
+        print(waits.summary())
+        profiler.finish()
     def setUp(self):
-        print(f"\n[INFO] Navigating to {self.base_url}")
-        self.driver.get(self.base_url)
-        time.sleep(2)
+        self.oauth.configure()  # no latency, no failures
+        mode = self.page.reset()
+        self.login_page = LoginPage(self.driver)
+        print(f"\n[INFO] {self.base_url} ready ({mode})")
     def test_valid_standard_login(self):
         """Test Case #1: Valid Standard Login"""
         driver = self.driver
         try:
             print("[DEBUG] Attempting standard login...")
-            email_field = driver.find_element(By.ID, "emailInput")
-            password_field = driver.find_element(By.ID, "passwordInput")
-            login_button = driver.find_element(By.CLASS_NAME, "btn-login")
-            print(f"[DEBUG] Email field displayed: {email_field.is_displayed()}")
-            print(f"[DEBUG] Password field displayed: {password_field.is_displayed()}")
-            print(f"[DEBUG] Login button displayed: {login_button.is_displayed()}")
-            email_field.send_keys("john@example.com")
-            password_field.send_keys("12345")
-            login_button.click()
+            page = LoginPage(driver)
+            fields = page.read("emailInput", "passwordInput")
+            print(f"[DEBUG] Email field displayed: {fields['emailInput']['displayed']}")
+            print(f"[DEBUG] Password field displayed: {fields['passwordInput']['displayed']}")
+            page.login("john@example.com", "12345")
             print("[DEBUG] Clicked login button")
             success_msg = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "message"))
+                message_shown
             )
             print(f"[DEBUG] Success message received: {success_msg.text}")
             self.assertIn("Login Successful", success_msg.text)
@@ -61,12 +86,12 @@ class LoginPageTests(unittest.TestCase):
         driver = self.driver
         try:
             print("[DEBUG] Testing invalid password...")
-            driver.find_element(By.ID, "emailInput").send_keys("john@example.com")
-            driver.find_element(By.ID, "passwordInput").send_keys("wrongpass")
-            driver.find_element(By.CLASS_NAME, "btn-login").click()
+            self.login_page.el("email").send_keys("john@example.com")
+            self.login_page.el("password").send_keys("wrongpass")
+            self.login_page.el("login").click()
             print("[DEBUG] Clicked login button")
             error_msg = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "message"))
+                message_shown
             )
             print(f"[DEBUG] Error message received: {error_msg.text}")
             self.assertIn("Invalid credentials. Please try again.", error_msg.text)
@@ -78,8 +103,8 @@ class LoginPageTests(unittest.TestCase):
         driver = self.driver
         try:
             print("[DEBUG] Testing missing email scenario...")
-            driver.find_element(By.ID, "passwordInput").send_keys("12345")
-            driver.find_element(By.CLASS_NAME, "btn-login").click()
+            self.login_page.el("password").send_keys("12345")
+            self.login_page.el("login").click()
             print("[DEBUG] Clicked login button")
             error_msg = WebDriverWait(driver,10).until(
                 EC.presence_of_element_located((By.ID, "message"))
@@ -89,43 +114,39 @@ class LoginPageTests(unittest.TestCase):
         except Exception as e:
             print("[ERROR] Missing email test failed")
             self.fail(str(e))
+    def open_google_popup(self):
+        """Click the Google button and switch to its sign-in popup; returns the main window."""
+        driver = self.driver
+        main_window = driver.current_window_handle
+        # Compare with the handles open now: the browser may have other tabs than this one
+        self.windows_before_popup = set(driver.window_handles)
+        google_button = self.login_page.wait_for("google")
+        print("[DEBUG] Clicking Google login button")
+        google_button.click()
+        WebDriverWait(driver, 5).until(lambda d: set(d.window_handles) - self.windows_before_popup)
+        new_window = next(iter(set(driver.window_handles) - self.windows_before_popup), None)
+        if new_window is None:
+            raise AssertionError("[ERROR] Google login popup did not open!")
+        driver.switch_to.window(new_window)
+        return main_window
     def test_google_login(self):
         """Test Case #4: Google Login (Mock)"""
         driver = self.driver
-        driver.execute_script("document.documentElement.lang = 'en';")
         try:
             print("[DEBUG] Testing Google login...")
-            google_button_xpath = "/html/body/div/div[3]/div[2]/div/div/div/div[2]"  # Replace with actual XPath
-            google_button = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable((By.XPATH, google_button_xpath))
-            )
-            print("[DEBUG] Clicking Google login button")
-            google_button.click()
-            WebDriverWait(driver, 10).until(lambda d: len(d.window_handles) > 1)
-            main_window = driver.current_window_handle
-            new_window = None
-            for handle in driver.window_handles:
-                if handle != main_window:
-                    new_window = handle
-                    break
-            if new_window is None:
-                raise AssertionError("[ERROR] Google login popup did not open!")
-            driver.switch_to.window(new_window)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.NAME, "identifier"))
-            )
+            main_window = self.open_google_popup()
+            popup = GoogleSignInPage(driver)
+            email_input = popup.wait_for("identifier")
             print("[DEBUG] Google login popup detected.")
-            email_input = driver.find_elements(By.XPATH, "//*[@id='identifierId']")
-            email_input[0].send_keys("invalid_email@example.com")
-            next_button_email_xpath = "/html/body/div[1]/div[1]/div[2]/c-wiz/div/div[3]/div/div[1]/div/div/button/div[3]"  # Correct XPath
-            next_button_email = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, next_button_email_xpath))
-            )
+            email_input.send_keys("invalid_email@example.com")
             current_url_before = driver.current_url
             print(f"[DEBUG] Current URL before login attempt: {current_url_before}")
             print("[DEBUG] Clicking the 'Next' button for email")
-            driver.execute_script("arguments[0].click();", next_button_email)
-            time.sleep(5)
+            popup.el("identifier next").click()
+            # The account is unknown: the error shows in place, without navigating
+            error = popup.el("error")
+            WebDriverWait(driver, 5).until(lambda d: error.is_displayed())
+            self.assertIn("Couldn't find your Google Account", error.text)
             current_url_after = driver.current_url
             print(f"[DEBUG] Current URL after login attempt: {current_url_after}")
             self.assertEqual(current_url_before, current_url_after, "The page should not have changed!")
@@ -135,12 +156,50 @@ class LoginPageTests(unittest.TestCase):
         except Exception as e:
             print(f"[ERROR] Google login test failed: {e}")
             self.fail(str(e))
+    def test_google_login_with_known_account(self):
+        """Test Case #4b: Google Login completes and calls the page's callback"""
+        driver = self.driver
+        try:
+            main_window = self.open_google_popup()
+            popup = GoogleSignInPage(driver)
+            popup.wait_for("identifier").send_keys("tester@gmail.com")
+            popup.el("identifier next").click()
+            password = popup.el("password")
+            WebDriverWait(driver, 5).until(lambda d: password.is_displayed())
+            password.send_keys("cs458-pass")
+            popup.el("password next").click()
+            # The popup closes itself after handing the ID token to the page
+            WebDriverWait(driver, 5).until(lambda d: set(d.window_handles) <= self.windows_before_popup)
+            driver.switch_to.window(main_window)
+            success_msg = WebDriverWait(driver, 5).until(
+                EC.text_to_be_present_in_element((By.ID, "message"), "Google sign-in successful!")
+            )
+            self.assertTrue(success_msg)
+            self.assertEqual(self.oauth.issued[-1], ("google", "tester@gmail.com"))
+        except Exception as e:
+            print(f"[ERROR] Google login test failed: {e}")
+            self.fail(str(e))
+    def test_google_login_when_provider_is_down(self):
+        """Test Case #4c: A failing, slow provider leaves the page logged out"""
+        driver = self.driver
+        self.oauth.configure(latency=0.3, failure="server_error")
+        try:
+            main_window = self.open_google_popup()
+            WebDriverWait(driver, 5).until(
+                EC.text_to_be_present_in_element((By.TAG_NAME, "h1"), "500")
+            )
+            driver.close()
+            driver.switch_to.window(main_window)
+            self.assertEqual(self.login_page.el("message").text, "")
+        except Exception as e:
+            print(f"[ERROR] Google login test failed: {e}")
+            self.fail(str(e))
     def test_facebook_login(self):
         """Test Case #5: Facebook Login (Mock)"""
         driver = self.driver
         try:
             print("[DEBUG] Testing Facebook login...")
-            facebook_button = driver.find_element(By.CLASS_NAME, "btn-facebook")
+            facebook_button = self.login_page.el("facebook")
             print(f"[DEBUG] Facebook button displayed: {facebook_button.is_displayed()}")
             facebook_button.click()
             print("[DEBUG] Clicked Facebook login button")
@@ -157,12 +216,12 @@ class LoginPageTests(unittest.TestCase):
         driver = self.driver
         try:
             print("[DEBUG] Testing input with @@.")
-            driver.find_element(By.ID, "emailInput").send_keys("test@@example.comñ")
-            driver.find_element(By.ID, "passwordInput").send_keys("12345")
-            driver.find_element(By.CLASS_NAME, "btn-login").click()
+            self.login_page.el("email").send_keys("test@@example.comñ")
+            self.login_page.el("password").send_keys("12345")
+            self.login_page.el("login").click()
             print("[DEBUG] Clicked login button")
             success_msg = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "message"))
+                message_shown
             )
             print(f"[DEBUG] Success message received: {success_msg.text}")
             self.assertIn("Login Successful", success_msg.text)
@@ -174,9 +233,9 @@ class LoginPageTests(unittest.TestCase):
         driver = self.driver
         try:
             print("[DEBUG] Attempting standard login...")
-            email_field = driver.find_element(By.ID, "emailInput")
-            password_field = driver.find_element(By.ID, "passwordInput")
-            login_button = driver.find_element(By.CLASS_NAME, "btn-login")
+            # one lookup for all three
+            fields = self.login_page.resolve("email", "password", "login")
+            email_field, password_field, login_button = fields["email"], fields["password"], fields["login"]
             print(f"[DEBUG] Email field displayed: {email_field.is_displayed()}")
             print(f"[DEBUG] Password field displayed: {password_field.is_displayed()}")
             print(f"[DEBUG] Login button displayed: {login_button.is_displayed()}")
@@ -185,7 +244,7 @@ class LoginPageTests(unittest.TestCase):
             login_button.click()
             print("[DEBUG] Clicked login button")
             success_msg = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "message"))
+                message_shown
             )
             print(f"[DEBUG] Success message received: {success_msg.text}")
             self.assertIn("Login Successful", success_msg.text)
@@ -193,4 +252,4 @@ class LoginPageTests(unittest.TestCase):
             print("[ERROR] Standard login test failed")
             self.fail(str(e))
 if __name__ == "__main__":
-    unittest.main()
+    schedule.main()
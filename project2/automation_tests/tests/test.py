@@ -1,57 +1,116 @@
 import unittest
-import time
 import os
-from appium import webdriver
-from appium.options.common import AppiumOptions
+import sys
 
 from appium_flutter_finder import FlutterFinder, FlutterElement
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from testkit import profiler, schedule, waits
+from testkit.flutter_snapshot import snapshot
+from testkit.appium_pool import SessionPool, remote_session
+from testkit.auth_state import AppLogin, real_login, request, wants_real_login
+from testkit.smtp_sink import SmtpSink
+
+APK_PATH = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        "../../build/app/outputs/apk/debug/app-debug.apk"
+    )
+)
+
+# The APK must be built with --dart-define=SMTP_HOST=10.0.2.2 --dart-define=SMTP_PORT=2525
+# so the app mails the sink instead of Gmail (10.0.2.2 is this machine, seen from the emulator).
+SMTP_PORT = int(os.environ.get("CS458_SMTP_PORT", "2525"))
 
 
 class TestSurveyApp(unittest.TestCase):
 
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         """
-        Runs before each test method. 
-        1) Launch new Appium driver
-        2) Log in
+        One Appium session is shared by every test in the class.
+        The APK is only reinstalled when its contents changed since the last run.
         """
-        options = AppiumOptions()
-        options.set_capability("platformName", "Android")
-        options.set_capability("deviceName", "emulator-5554")
+        cls.finder = FlutterFinder()
+        cls.smtp = SmtpSink("0.0.0.0", SMTP_PORT).start()
+        # One real login per session; other tests reopen the Survey Form through the app
+        cls.auth = AppLogin(cls.login_through_ui, cls.finder.by_type("MaterialApp"), "Survey Form")
+        cls.pool = SessionPool(
+            "http://localhost:4723",
+            {
+                "platformName": "Android",
+                "deviceName": "emulator-5554",
+                "udid": os.environ.get("CS458_DEVICE_UDID", "emulator-5554"),
+                "automationName": "Flutter",
+                "newCommandTimeout": 300,
+            },
+            APK_PATH,
+            reset=cls.reset_app,
+            create=lambda url, caps: profiler.attach(remote_session(url, caps)),
+        )
 
-        options.set_capability("automationName", "Flutter")
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        cls.smtp.stop()
+        print(cls.auth.summary())
+        print(waits.summary())
+        profiler.finish()
 
-        apk_path = os.path.abspath(
-            os.path.join(
-                os.path.dirname(__file__),
-                "../../build/app/outputs/apk/debug/app-debug.apk"
-            )
-        )
-        options.set_capability("app", apk_path)
-        options.set_capability("newCommandTimeout", 300)
+    @classmethod
+    def reset_app(cls, driver):
+        """
+        Brings a reused session back to a fresh login screen without relaunching
+        (through the app's session handler, or by logging out on APKs without it).
+        """
+        if request(driver, "session:login") == "login":
+            return
+        if waits.flutter_wait_for(driver, cls.finder.by_value_key("LogoutButton"), 1):
+            FlutterElement(driver, cls.finder.by_value_key("LogoutButton")).click()
+        if not waits.flutter_wait_for(driver, cls.finder.by_value_key("EmailField"), 5):
+            raise RuntimeError("login screen did not appear during reset")
 
-        self.driver = webdriver.Remote("http://localhost:4723", options=options)
-        self.finder = FlutterFinder()
-        time.sleep(5)  
-        self.login_with_email()
+    def setUp(self):
+        """
+        Runs before each test method.
+        1) Get the pooled Appium session (new session only the first time)
+        2) Log in: through the UI for the first test and for @real_login tests,
+           otherwise by reopening the page that login captured
+        """
+        sessions = self.pool.sessions_created
+        self.driver = self.pool.acquire()
+        if self.pool.sessions_created != sessions:
+            waits.flutter_first_frame(self.driver)
+            waits.flutter_wait_for(self.driver, self.finder.by_value_key("EmailField"), 10)
+        self.auth.enter(self.driver, real=wants_real_login(self))
         self.assertTrue(
             self.element_exists("Survey Form", 5),
             "Survey Form header not found after login!"
         )
 
-    def tearDown(self):
+    def wait(self, key_name, timeout=3, absent=False):
         """
-        Runs after each test method.
-        Logs out (if desired) and quits the driver.
+        Helper to wait for the UI instead of sleeping.
+        Waits until the widget with the given ValueKey is present (or gone, with absent=True).
+        Returns as soon as the condition holds; `timeout` is only the deadline.
         """
-        self.driver.quit()
+        return waits.flutter_wait_for(
+            self.driver, self.finder.by_value_key(key_name), timeout, absent=absent
+        )
 
-    def wait(self, sec=2):
+    def wait_for_text(self, key_name, text, timeout=3):
         """
-        Helper to do a sleep-based wait (in seconds).
+        Waits until the widget with the given ValueKey shows `text`
+        (e.g. a field after the app has reformatted what was typed).
         """
-        time.sleep(sec)
+        try:
+            return waits.Waiter(self.driver, timeout).until(
+                lambda d: self.find_key(key_name).text == text, label=f"{key_name} == {text!r}"
+            )
+        except TimeoutException:
+            return False
+
     def find_key(self, key_name):
         """
         Returns a FlutterElement for the given ValueKey name.
@@ -60,41 +119,53 @@ class TestSurveyApp(unittest.TestCase):
         return FlutterElement(self.driver, raw_finder)
 
 
-    def element_exists(self, key_name, wait_seconds=3):
+    def widgets(self):
+        """
+        Snapshot of the ValueKeys in the current widget tree (one driver call,
+        reused until the next interaction).
+        """
+        return snapshot(self.driver, self.finder.by_type("MaterialApp"))
 
+    def element_shown(self, key_name):
+        """
+        Returns True if the widget with the given ValueKey is in the settled tree right now.
+        Use this for negative checks: it answers at once instead of waiting out a timeout.
+        """
+        return key_name in self.widgets()
+
+    def element_exists(self, key_name, wait_seconds=3):
         """
         Returns True if the widget with the given ValueKey is found
         within `wait_seconds`, else False.
+        Don't use it for absence checks: a missing widget always waits out the
+        full timeout. Use element_shown() or element_absent() instead.
         """
-        finder = self.finder.by_value_key(key_name)
-        try:
-            self.driver.execute_script("flutter: waitFor", finder, wait_seconds)
-            return True
-        except Exception:
-            return False
+        return self.element_shown(key_name) or self.wait(key_name, wait_seconds)
 
     def element_absent(self, key_name, wait_seconds=3):
         """
         Returns True if the widget with the given ValueKey is gone
         (not found) within `wait_seconds`, else False.
         """
-        finder = self.finder.by_value_key(key_name)
-        try:
-            self.driver.execute_script("flutter: waitForAbsent", finder, wait_seconds)
-            return True
-        except Exception:
-            return False
+        return not self.element_shown(key_name) or self.wait(key_name, wait_seconds, absent=True)
+
+    @classmethod
+    def login_through_ui(cls, driver):
+        """
+        Fill email + password fields, and tap 'EmailLoginButton'
+        """
+        FlutterElement(driver, cls.finder.by_value_key("EmailField")).send_keys("test@example.com")
+        FlutterElement(driver, cls.finder.by_value_key("PasswordField")).send_keys("12345")
+        FlutterElement(driver, cls.finder.by_value_key("EmailLoginButton")).click()
+        waits.flutter_wait_for(driver, cls.finder.by_value_key("Survey Form"), 5)
 
     def login_with_email(self):
         """
         Helper method: fill email + password fields, and tap 'EmailLoginButton'
         """
-        self.find_key("EmailField").send_keys("test@example.com")
-  
-        self.find_key("PasswordField").send_keys("12345")
-        self.find_key("EmailLoginButton").click()
-        self.wait(3)
+        self.login_through_ui(self.driver)
 
+    @real_login
     def test_login_and_navigation(self):
         """
         TC1: Already logged in (setUp did it).
@@ -110,7 +181,6 @@ class TestSurveyApp(unittest.TestCase):
         TC2: Toggle ChatGPTCheckbox -> ChatGPTConsField appears/disappears.
         """
         self.find_key("ChatGPTCheckbox").click()
-        self.wait()
 
         self.assertTrue(
             self.element_exists("ChatGPTConsField"),
@@ -118,7 +188,6 @@ class TestSurveyApp(unittest.TestCase):
         )
 
         self.find_key("ChatGPTCheckbox").click()
-        self.wait()
 
         self.assertTrue(
             self.element_absent("ChatGPTConsField"),
@@ -131,7 +200,7 @@ class TestSurveyApp(unittest.TestCase):
         (including valid manual date) are filled.
         """
         self.assertFalse(
-            self.element_exists("SendSurveyButton", 2),
+            self.element_shown("SendSurveyButton"),
             "SendSurveyButton appeared prematurely!"
         )
 
@@ -139,7 +208,7 @@ class TestSurveyApp(unittest.TestCase):
         self.find_key("CityField").send_keys("Ankara")
 
         self.find_key("BirthDateField").send_keys("02.04.2022")
-        self.wait(1)
+        self.wait_for_text("BirthDateField", "02.04.2022")
 
         self.find_key("EducationDropdown").click()
         self.find_key("BachelorOption").click()
@@ -151,7 +220,6 @@ class TestSurveyApp(unittest.TestCase):
         self.find_key("ChatGPTConsField").send_keys("Sometimes inaccurate")
 
         self.find_key("AIUseCaseField").send_keys("Helps in coding")
-        self.wait()
 
         self.assertTrue(
             self.element_exists("SendSurveyButton", 3),
@@ -160,13 +228,14 @@ class TestSurveyApp(unittest.TestCase):
 
     def test_email_data_accuracy(self):
         """
-        TC4: Fill out form + click 'SendSurveyButton' -> Confirm success message/log, all fields should be filled.
+        TC4: Fill out form + click 'SendSurveyButton' -> the mail caught by the local SMTP sink
+             carries every field exactly as entered.
         """
         self.find_key("NameSurnameField").send_keys("Tester")
         self.find_key("CityField").send_keys("Izmir")
 
         self.find_key("BirthDateField").send_keys("02.04.2023")
-        self.wait(1)
+        self.wait_for_text("BirthDateField", "02.04.2023")
 
         self.find_key("EducationDropdown").click()
         self.find_key("BachelorOption").click()
@@ -178,12 +247,28 @@ class TestSurveyApp(unittest.TestCase):
         self.find_key("ChatGPTConsField").send_keys("Occasionally wrong")
 
         self.find_key("AIUseCaseField").send_keys("Project help")
-        self.wait()
+        waits.flutter_wait_for(
+            self.driver, self.finder.by_value_key("SendSurveyButton"), 3, tappable=True
+        )
 
+        after = self.smtp.mark()
         self.find_key("SendSurveyButton").click()
-        self.wait(3)
 
-        print("Survey sent. Check logs or test email for result.")
+        mail = self.smtp.wait_for(to="example@gmail.com", subject="AI Survey Response",
+                                  after=after, timeout=15)
+        self.assertEqual(mail.mail_from, "borahaliloglu03@yahoo.com")
+        self.assertEqual(mail.fields(), {
+            "Name-Surname": "Tester",
+            "Birth Date": "2023-04-02 00:00:00.000",
+            "Education Level": "Bachelor",
+            "City": "Izmir",
+            "Gender": "Female",
+            "AI Models Tried": "ChatGPT",
+            "Model Cons": "ChatGPT: Occasionally wrong",
+            "AI Use Case": "Project help",
+        })
+        # The snackbar shows up once the send has finished
+        self.assertTrue(waits.flutter_wait_for(self.driver, self.finder.by_type("SnackBar"), 5))
 
     def test_incomplete_birth_date_format(self):
         """
@@ -206,13 +291,15 @@ class TestSurveyApp(unittest.TestCase):
         self.find_key("AIUseCaseField").send_keys("Testing incomplete date")
 
         self.find_key("BirthDateField").send_keys("01.01.")
-        self.wait(1)
+        # The app drops the trailing dot until more digits follow
+        self.wait_for_text("BirthDateField", "01.01")
 
         self.assertFalse(
-            self.element_exists("SendSurveyButton", 2),
+            self.element_shown("SendSurveyButton"),
             "SendSurveyButton should NOT appear with incomplete date!"
         )
 
+    @real_login
     def test_relogin_flow_after_logout(self):
         """
         TC6: If we want to test logout -> log in again in the same test
@@ -220,7 +307,7 @@ class TestSurveyApp(unittest.TestCase):
         self.assertTrue(self.element_exists("Survey Form"))
 
         self.find_key("LogoutButton").click()
-        self.wait()
+        self.wait("EmailField")
 
         self.login_with_email()
 
@@ -229,17 +316,17 @@ class TestSurveyApp(unittest.TestCase):
         TC7: Select multiple AI checkboxes => multiple cons fields.
         """
         self.find_key("ChatGPTCheckbox").click()
-        self.wait()
+        self.wait("ChatGPTConsField")
         self.find_key("ChatGPTConsField").send_keys("Hallucinations")
 
         self.find_key("BardCheckbox").click()
-        self.wait()
+        self.wait("BardConsField")
         self.find_key("BardConsField").send_keys("Still developing")
 
         self.find_key("ChatGPTCheckbox").click()
-        self.wait()
+        self.wait("ChatGPTConsField", absent=True)
         self.assertFalse(
-            self.element_exists("ChatGPTConsField"),
+            self.element_shown("ChatGPTConsField"),
             "ChatGPTConsField is still present after unchecking ChatGPT!"
         )
         self.assertTrue(
@@ -247,6 +334,7 @@ class TestSurveyApp(unittest.TestCase):
             "BardConsField is missing after unchecking ChatGPT!"
         )
 
+    @real_login
     def test_invalid_login(self):
         """
         TC8: Attempts to log in with invalid email/password -> 
@@ -257,11 +345,11 @@ class TestSurveyApp(unittest.TestCase):
         self.find_key("PasswordField").send_keys("badpassword")
 
         self.find_key("EmailLoginButton").click()
-        self.wait(1) 
-        self.assertFalse(
-            self.element_exists("Survey Form", wait_seconds=2),
-            "Survey Form should NOT appear after invalid credentials!"
-        )
+        waits.flutter_wait_for(self.driver, self.finder.by_text("Invalid credentials!"), 3)
+        widgets = self.widgets()
+        self.assertNotIn("Survey Form", widgets,
+                         "Survey Form should NOT appear after invalid credentials!")
+        self.assertIn("EmailLoginButton", widgets, "Login screen should stay after invalid credentials!")
 
 if __name__ == '__main__':
-    unittest.main()
+    schedule.main()
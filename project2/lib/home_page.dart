@@ -30,6 +30,19 @@ class _HomePage extends State<HomePage> {
   // We'll store the typed date in this controller
   final TextEditingController _birthDateController = TextEditingController();
 
+  // Test builds point the app at a local SMTP sink (see testkit/smtp_sink.py):
+  //   flutter build apk --debug --dart-define=SMTP_HOST=10.0.2.2 --dart-define=SMTP_PORT=2525
+  static const String _smtpHost = String.fromEnvironment('SMTP_HOST');
+  static const int _smtpPort = int.fromEnvironment('SMTP_PORT', defaultValue: 2525);
+
+  // With the local sink: one SMTP connection for every submission instead of a
+  // new one per send. Gmail keeps one connection per send.
+  PersistentConnection? _smtp;
+
+  SmtpServer get _smtpServer => _smtpHost.isEmpty
+      ? gmail('borahaliloglu03@gmail.com', 'igzl qydy zzgn ckei')
+      : SmtpServer(_smtpHost, port: _smtpPort, allowInsecure: true);
+
   bool get isFormValid =>
       nameSurname != null &&
       birthDate != null &&
@@ -39,10 +52,14 @@ class _HomePage extends State<HomePage> {
       selectedModels.isNotEmpty &&
       aiUseCase != null;
 
-  Future<void> _sendEmail() async {
-    final smtpServer =
-        gmail('borahaliloglu03@gmail.com', 'igzl qydy zzgn ckei');
+  @override
+  void dispose() {
+    _smtp?.close();
+    _birthDateController.dispose();
+    super.dispose();
+  }
 
+  Future<void> _sendEmail() async {
     final message = Message()
       ..from = const Address('borahaliloglu03@yahoo.com', 'cs458')
       ..recipients.add('example@gmail.com')
@@ -59,7 +76,7 @@ class _HomePage extends State<HomePage> {
       """;
 
     try {
-      await send(message, smtpServer);
+      await _deliver(message);
       if (mounted) {
         ScaffoldMessenger.of(context).showSnackBar(
           const SnackBar(content: Text("Survey sent successfully!")),
@@ -74,6 +91,38 @@ class _HomePage extends State<HomePage> {
     }
   }
 
+  Future<void> _deliver(Message message) async {
+    if (_smtpHost.isEmpty) {
+      await send(message, _smtpServer);
+      return;
+    }
+    // A reused connection may have been closed by the server while idle:
+    // retry once on a fresh one before reporting a failure
+    final reused = _smtp != null;
+    try {
+      _smtp ??= PersistentConnection(_smtpServer);
+      await _smtp!.send(message);
+    } catch (_) {
+      await _dropConnection();
+      if (!reused) rethrow;
+      try {
+        _smtp = PersistentConnection(_smtpServer);
+        await _smtp!.send(message);
+      } catch (_) {
+        await _dropConnection();
+        rethrow;
+      }
+    }
+  }
+
+  Future<void> _dropConnection() async {
+    final broken = _smtp;
+    _smtp = null;
+    try {
+      await broken?.close();
+    } catch (_) {}
+  }
+
   void _logout() async {
     try {
       await GoogleSignIn().signOut();
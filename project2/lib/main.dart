@@ -3,11 +3,46 @@ import 'package:firebase_core/firebase_core.dart';
 import 'package:flutter_driver/driver_extension.dart';
 
 import 'firebase_options.dart';
+import 'home_page.dart';
 import 'login_page.dart';
 
+final GlobalKey<NavigatorState> navigatorKey = GlobalKey<NavigatorState>();
+
+/// Test hook: answers flutter:requestData from the Appium suite, and is only
+/// reachable through the Flutter driver extension enabled in main().
+/// "session:home" starts a fresh HomePage the way a successful login does (the
+/// login keeps no other state), "session:login" goes back to a fresh LoginPage.
+/// It opens the page directly instead of replaying a login, so the suite
+/// (testkit/auth_state.AppLogin) compares the page it opens with the widget tree
+/// its one real login landed on and logs in for real when they differ.
+Future<String> driverRequest(String? message) async {
+  final navigator = navigatorKey.currentState;
+  if (navigator == null) return 'error: app not ready';
+  final Widget page;
+  switch (message) {
+    case 'session:home':
+      page = const HomePage();
+      break;
+    case 'session:login':
+      page = const LoginPage();
+      break;
+    default:
+      return 'error: unknown request $message';
+  }
+  navigator.pushAndRemoveUntil(
+    PageRouteBuilder(
+      pageBuilder: (_, __, ___) => page,
+      transitionDuration: Duration.zero,
+      reverseTransitionDuration: Duration.zero,
+    ),
+    (_) => false,
+  );
+  return message!.substring('session:'.length);
+}
+
 void main() async {
   // Enable Flutter Driver extension for integration testing
-  enableFlutterDriverExtension();
+  enableFlutterDriverExtension(handler: driverRequest);
   print("✅ Flutter Driver extension enabled");
   // Required to initialize bindings before Firebase
   WidgetsFlutterBinding.ensureInitialized();
@@ -25,6 +60,7 @@ class MyApp extends StatelessWidget {
   @override
   Widget build(BuildContext context) {
     return MaterialApp(
+      navigatorKey: navigatorKey,
       debugShowCheckedModeBanner: false,
       home: LoginPage(),
     );
@@ -0,0 +1,271 @@
+"""Incremental aggregation of survey responses with NumPy.
+
+    agg = SurveyAggregator(questions)          # questions as decoded by surveycode.py
+    agg.add_batch([{"q0": "A", "q1": ["x", "y"], ...}, ...])
+    agg.update_from_db("responses.sqlite", survey_id)   # rows stored by ingest.py
+    agg.summary()
+
+Each batch is first turned into one NumPy column per question (option
+codes for choice questions, a boolean matrix for checkboxes, ratings as
+small ints, lengths for text). The running totals are then updated with
+bincount / matrix products on those columns, so adding a batch costs time
+proportional to the batch, never to everything seen so far.
+
+    python analytics.py --bench            # 10^6 responses, batch vs naive loops
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+
+class QuestionStats:
+    """Running totals for one question; `add` takes one batch column.
+
+    On its own it only counts answers; subclasses keep per-type totals.
+    """
+
+    def __init__(self, question):
+        self.question = question
+        self.answered = 0
+
+    def add(self, values):
+        self.answered += sum(1 for v in values if v not in (None, "", []))
+
+    def summary(self):
+        return {"text": self.question["text"], "type": self.question["type"],
+                "answered": self.answered}
+
+
+class ChoiceStats(QuestionStats):
+    def __init__(self, question):
+        super().__init__(question)
+        self.options = list(question["options"])
+        self.codes = {opt: i for i, opt in enumerate(self.options)}
+        self.counts = np.zeros(len(self.options), dtype=np.int64)
+
+    def encode(self, values):
+        # -1 = unanswered or not one of the options
+        return np.fromiter((self.codes.get(v, -1) for v in values), dtype=np.int32, count=len(values))
+
+    def add(self, values):
+        codes = self.encode(values)
+        codes = codes[codes >= 0]
+        self.counts += np.bincount(codes, minlength=len(self.options))
+        self.answered += codes.size
+
+    def summary(self):
+        out = super().summary()
+        out["distribution"] = dict(zip(self.options, self.counts.tolist()))
+        return out
+
+
+class RatingStats(QuestionStats):
+    SCALE = np.arange(1, 6)
+
+    def __init__(self, question):
+        super().__init__(question)
+        self.histogram = np.zeros(5, dtype=np.int64)
+
+    def encode(self, values):
+        return np.fromiter((int(v) if v not in (None, "") else 0 for v in values),
+                           dtype=np.int8, count=len(values))
+
+    def add(self, values):
+        ratings = self.encode(values)
+        ratings = ratings[(ratings >= 1) & (ratings <= 5)]
+        self.histogram += np.bincount(ratings - 1, minlength=5)
+        self.answered += ratings.size
+
+    def summary(self):
+        out = super().summary()
+        out["histogram"] = self.histogram.tolist()
+        out["mean"] = float(self.histogram @ self.SCALE / self.answered) if self.answered else None
+        return out
+
+
+class CheckboxStats(QuestionStats):
+    def __init__(self, question):
+        super().__init__(question)
+        self.options = list(question["options"])
+        self.codes = {opt: i for i, opt in enumerate(self.options)}
+        k = len(self.options)
+        # co_occurrence[i, j] = respondents who ticked both i and j; the diagonal is per-option counts
+        self.co_occurrence = np.zeros((k, k), dtype=np.int64)
+
+    def encode(self, values):
+        """0/1 matrix: one row per response, one column per option."""
+        rows, cols = [], []
+        codes = self.codes
+        for r, picked in enumerate(values):
+            if picked:
+                for v in picked:
+                    c = codes.get(v)
+                    if c is not None:
+                        rows.append(r)
+                        cols.append(c)
+        ticked = np.zeros((len(values), len(self.options)), dtype=np.float32)
+        ticked[np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)] = 1
+        return ticked
+
+    def add(self, values):
+        ticked = self.encode(values)
+        # float32 matmul goes through BLAS; exact for counts well beyond one batch
+        self.co_occurrence += (ticked.T @ ticked).astype(np.int64)
+        self.answered += int(np.count_nonzero(ticked.any(axis=1)))
+
+    def summary(self):
+        out = super().summary()
+        out["distribution"] = dict(zip(self.options, np.diag(self.co_occurrence).tolist()))
+        out["co_occurrence"] = self.co_occurrence.tolist()
+        return out
+
+
+class TextStats(QuestionStats):
+    def __init__(self, question):
+        super().__init__(question)
+        self.total_length = 0
+
+    def add(self, values):
+        lengths = np.fromiter((len(v) if v else 0 for v in values), dtype=np.int64, count=len(values))
+        self.answered += int(np.count_nonzero(lengths))
+        self.total_length += int(lengths.sum())
+
+    def summary(self):
+        out = super().summary()
+        out["mean_length"] = self.total_length / self.answered if self.answered else None
+        return out
+
+
+STATS_BY_TYPE = {
+    "multiple-choice": ChoiceStats,
+    "dropdown": ChoiceStats,
+    "rating": RatingStats,
+    "checkboxes": CheckboxStats,
+    "text": TextStats,
+}
+
+
+class SurveyAggregator:
+    """Per-question running aggregates for one survey, fed batch by batch."""
+
+    def __init__(self, questions):
+        self.questions = questions
+        self.stats = [STATS_BY_TYPE[q["type"]](q) for q in questions]
+        self.responses = 0
+        self.last_row_id = 0  # for update_from_db
+
+    def add_batch(self, answers):
+        """Fold a list of {"q0": ..., "qN": ...} dicts into the totals."""
+        if not answers:
+            return
+        for i, stats in enumerate(self.stats):
+            key = f"q{i}"
+            stats.add([a.get(key) for a in answers])
+        self.responses += len(answers)
+
+    def update_from_db(self, db, survey_id, batch_size=50_000):
+        """Read rows ingest.py stored since the last call; returns how many were added."""
+        conn = sqlite3.connect(db) if isinstance(db, str) else db
+        added = 0
+        try:
+            while True:
+                rows = conn.execute(
+                    "SELECT id, answers FROM responses WHERE survey = ? AND id > ? ORDER BY id LIMIT ?",
+                    (survey_id, self.last_row_id, batch_size)).fetchall()
+                if not rows:
+                    return added
+                self.add_batch([json.loads(a) for _, a in rows])
+                self.last_row_id = rows[-1][0]
+                added += len(rows)
+        finally:
+            if conn is not db:
+                conn.close()
+
+    def summary(self):
+        return {"responses": self.responses, "questions": [s.summary() for s in self.stats]}
+
+
+# ------------------------------------------------------------------ benchmark
+
+def naive_summary(questions, answers):
+    """What the reports did before: loop over every raw response in Python."""
+    out = []
+    for i, q in enumerate(questions):
+        key = f"q{i}"
+        counts = {}
+        pairs = {}
+        for a in answers:
+            v = a.get(key)
+            if v in (None, "", []):
+                continue
+            if q["type"] == "checkboxes":
+                for x in v:
+                    counts[x] = counts.get(x, 0) + 1
+                    for y in v:
+                        pairs[x, y] = pairs.get((x, y), 0) + 1
+            else:
+                counts[v] = counts.get(v, 0) + 1
+        out.append((counts, pairs))
+    return out
+
+
+def bench(total=1_000_000, batch=10_000, n_questions=10):
+    from bench_surveycode import make_survey
+    from loadtest_ingest import random_answers
+    import random
+
+    questions = make_survey(n_questions)
+    rnd = random.Random(458)
+    pool = [random_answers(questions, rnd) for _ in range(5_000)]
+    answers = [pool[i % len(pool)] for i in range(total)]
+    print(f"{total} responses, {n_questions} questions, batches of {batch}")
+
+    agg = SurveyAggregator(questions)
+    started = time.perf_counter()
+    for k in range(0, total, batch):
+        agg.add_batch(answers[k:k + batch])
+    elapsed = time.perf_counter() - started
+    print(f"  incremental, all batches     {elapsed:8.2f} s  ({total / elapsed:,.0f} responses/s)")
+
+    started = time.perf_counter()
+    agg.add_batch(answers[:batch])
+    print(f"  one more batch               {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+    started = time.perf_counter()
+    naive_summary(questions, answers)
+    naive = time.perf_counter() - started
+    print(f"  naive rescan of everything   {naive:8.2f} s  (needed again for every new batch)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bench", action="store_true", help="run the 10^6 response benchmark")
+    parser.add_argument("--db", help="responses.sqlite written by ingest.py")
+    parser.add_argument("--survey", help="survey id (see the surveys table)")
+    parser.add_argument("-n", type=int, default=1_000_000, help="responses for --bench")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        bench(args.n)
+        return 0
+    if not (args.db and args.survey):
+        parser.error("--db and --survey are required (or use --bench)")
+    with sqlite3.connect(args.db) as conn:
+        row = conn.execute("SELECT code FROM surveys WHERE id = ?", (args.survey,)).fetchone()
+        if row is None:
+            parser.error(f"no survey {args.survey} in {args.db}")
+        import surveycode
+        agg = SurveyAggregator(surveycode.decode(row[0]))
+        agg.update_from_db(conn, args.survey)
+    json.dump(agg.summary(), sys.stdout, indent=2, ensure_ascii=False)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Compare legacy and v2 survey codes on generated surveys.
+
+    python bench_surveycode.py              # sizes + Python decode time
+    python bench_surveycode.py --browser    # also time SurveyCode.decode in Chrome
+
+Prints, for each survey size, the code length of the legacy Base64 format
+and of v2, and the median time to decode each.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import surveycode
+
+SIZES = (10, 100, 500, 1000, 5000)
+WORDS = ("how", "often", "do", "you", "use", "AI", "tools", "for", "school", "work",
+         "which", "model", "rate", "your", "experience", "with", "the", "city", "daily")
+
+
+def make_survey(n, seed=458):
+    """n questions of every type; about a fifth depend on an earlier choice question."""
+    rnd = random.Random(seed)
+    questions = []
+    for i in range(n):
+        qtype = surveycode.TYPES[i % len(surveycode.TYPES)]
+        options = []
+        if qtype in ("multiple-choice", "dropdown", "checkboxes"):
+            options = [f"Option {k + 1} {rnd.choice(WORDS)}" for k in range(rnd.randint(2, 6))]
+        text = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(4, 12))).capitalize() + "?"
+        q = {"text": f"{i + 1}. {text}", "type": qtype, "options": options, "condition": None}
+        choices = [j for j, p in enumerate(questions) if p["options"]]
+        if choices and rnd.random() < 0.2:
+            j = rnd.choice(choices[-20:])
+            q["condition"] = {"qIdx": str(j), "value": rnd.choice(questions[j]["options"])}
+        questions.append(q)
+    return questions
+
+
+def median_ms(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - started) * 1000)
+    return statistics.median(runs)
+
+
+def browser_decoder():
+    """Return decode(code) -> ms, timing SurveyCode.decode in headless Chrome."""
+    from selenium import webdriver
+    from testkit.server import StaticServer
+
+    server = StaticServer(HERE).start()
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    driver = webdriver.Chrome(options=options)
+    driver.set_script_timeout(60)
+    driver.get(server.url_for("survey-builder.html"))
+
+    def decode(code, repeat=5):
+        return driver.execute_async_script("""
+            const [code, repeat, done] = arguments, runs = [];
+            (async () => {
+              for (let i = 0; i < repeat; i++) {
+                const t = performance.now();
+                await SurveyCode.decode(code);
+                runs.push(performance.now() - t);
+              }
+              runs.sort((a, b) => a - b);
+              done(runs[Math.floor(runs.length / 2)]);
+            })();
+        """, code, repeat)
+
+    def close():
+        driver.quit()
+        server.stop()
+
+    return decode, close
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--browser", action="store_true", help="also decode in headless Chrome")
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    browser, close = browser_decoder() if args.browser else (None, None)
+    header = f"{'questions':>9} {'legacy B':>10} {'v2 B':>9} {'ratio':>6} {'legacy ms':>10} {'v2 ms':>8}"
+    if browser:
+        header += f" {'js legacy':>10} {'js v2':>8}"
+    print(header)
+    try:
+        for n in SIZES:
+            questions = make_survey(n)
+            legacy = surveycode.encode_legacy(questions)
+            v2 = surveycode.encode(questions)
+            assert surveycode.decode(v2) == surveycode.decode(legacy) == questions
+            row = (f"{n:>9} {len(legacy):>10} {len(v2):>9} {len(legacy) / len(v2):>5.1f}x"
+                   f" {median_ms(lambda: surveycode.decode(legacy), args.repeat):>10.2f}"
+                   f" {median_ms(lambda: surveycode.decode(v2), args.repeat):>8.2f}")
+            if browser:
+                row += f" {browser(legacy):>10.2f} {browser(v2):>8.2f}"
+            print(row)
+    finally:
+        if close:
+            close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+// conditions.js
+// Conditional-question engine shared by survey.html and the builder preview.
+//
+// buildIndex() maps every trigger question to the questions that depend on it
+// and sorts the questions so a trigger always comes before its dependants; a
+// circular condition is reported as an error. attach() then installs one
+// delegated `change` listener on the form: a change to question i only
+// re-evaluates the questions reachable from i, in dependency order.
+//
+// The builder calls refresh(i, newIndex) after replacing or appending question
+// i, which re-evaluates i and its dependants without touching the rest.
+//
+// A conditional question is shown when its trigger question is shown and
+// answered with the expected value, so hiding a question also hides
+// everything that depends on it.
+const SurveyConditions = (() => {
+  function buildIndex(questions) {
+    const n = questions.length;
+    const dependants = Array.from({ length: n }, () => []);
+    const triggerOf = new Array(n).fill(-1);
+    const pending = new Array(n).fill(0);
+    questions.forEach((q, i) => {
+      if (!q.condition) return;
+      const t = Number(q.condition.qIdx);
+      if (!Number.isInteger(t) || t < 0 || t >= n) {
+        throw new Error(`Question ${i + 1} depends on a question that does not exist.`);
+      }
+      triggerOf[i] = t;
+      dependants[t].push(i);
+      pending[i] = 1;
+    });
+
+    // Kahn's algorithm: every question has at most one trigger
+    const order = [];
+    for (let i = 0; i < n; i++) if (!pending[i]) order.push(i);
+    for (let k = 0; k < order.length; k++) {
+      dependants[order[k]].forEach(d => { if (--pending[d] === 0) order.push(d); });
+    }
+    if (order.length < n) {
+      // walk up the triggers from any unresolved question until we are on the loop
+      let start = pending.findIndex(p => p > 0);
+      for (let k = 0; k < n; k++) start = triggerOf[start];
+      const cycle = [start];
+      for (let i = triggerOf[start]; i !== start; i = triggerOf[i]) cycle.push(i);
+      if (cycle.length === 1) throw new Error(`Question ${start + 1} depends on itself.`);
+      throw new Error('Circular condition between questions ' +
+                      cycle.reverse().map(i => i + 1).join(' → ') + '.');
+    }
+    const rank = new Array(n);
+    order.forEach((q, r) => { rank[q] = r; });
+    return { dependants, triggerOf, order, rank };
+  }
+
+  function answered(wrap, value) {
+    for (const el of wrap.querySelectorAll('input, select')) {
+      if ((el.type === 'radio' || el.type === 'checkbox') && el.checked && el.value === value) return true;
+      if (el.tagName === 'SELECT' && el.value === value) return true;
+    }
+    return false;
+  }
+
+  // wraps[i] is the element holding question i's label and inputs (named q<i>);
+  // both arrays are read live, so the caller may append to them in place
+  function attach(form, questions, wraps, index = buildIndex(questions)) {
+    const shown = [];
+
+    function evaluate(i) {
+      const t = index.triggerOf[i];
+      if (t < 0) { shown[i] = true; return; }
+      shown[i] = shown[t] !== false && answered(wraps[t], questions[i].condition.value);
+      const display = shown[i] ? '' : 'none';
+      if (wraps[i].style.display !== display) wraps[i].style.display = display;
+    }
+
+    // everything reachable from `from`, evaluated in dependency order
+    function update(from) {
+      const affected = [];
+      const stack = [...index.dependants[from]];
+      while (stack.length) {
+        const d = stack.pop();
+        affected.push(d);
+        stack.push(...index.dependants[d]);
+      }
+      affected.sort((a, b) => index.rank[a] - index.rank[b]).forEach(evaluate);
+    }
+
+    function onChange(e) {
+      const m = /^q(\d+)$/.exec(e.target.name || '');
+      if (m && Number(m[1]) < questions.length) update(Number(m[1]));
+    }
+
+    function refresh(i, newIndex) {
+      if (newIndex) index = newIndex;
+      evaluate(i);
+      update(i);
+    }
+
+    if (form._surveyConditions) form.removeEventListener('change', form._surveyConditions.onChange);
+    form._surveyConditions = { onChange, update, refresh };
+    form.addEventListener('change', onChange);
+    index.order.forEach(evaluate);
+    return form._surveyConditions;
+  }
+
+  return { buildIndex, attach };
+})();
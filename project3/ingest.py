@@ -0,0 +1,321 @@
+"""Local ingestion service for the answers survey.html submits.
+
+    python ingest.py                        # http://localhost:8765, responses.sqlite
+    python ingest.py --port 9000 --db /tmp/responses.sqlite
+
+survey.html POSTs {"code": <survey code>, "answers": {"q0": ..., "qN": ...}}
+to /responses. Each payload is checked against the decoded survey (answer
+keys, option values, rating range, hidden conditional questions) and put
+on a bounded queue; a single writer task drains the queue in batches, one
+SQLite transaction per batch. When the queue is full the service answers
+503 with Retry-After instead of buffering without limit.
+
+GET /health returns the counters as JSON.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+import surveycode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PORT = 8765
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS surveys (
+    id TEXT PRIMARY KEY,
+    code TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    survey TEXT NOT NULL,
+    received REAL NOT NULL,
+    answers TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_survey ON responses (survey);
+"""
+
+MAX_BODY = 1 << 20
+MAX_TEXT = 10_000
+REASONS = {200: "OK", 202: "Accepted", 204: "No Content", 400: "Bad Request",
+           404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           422: "Unprocessable Entity", 503: "Service Unavailable"}
+
+
+class InvalidResponse(ValueError):
+    """The answers do not fit the survey they claim to answer."""
+
+
+# ------------------------------------------------------------------ validation
+
+def visible_questions(questions, answers):
+    """Which questions survey.html would show for these answers (chained conditions)."""
+    shown = [None] * len(questions)
+
+    def is_shown(i, depth=0):
+        if shown[i] is None:
+            cond = questions[i].get("condition")
+            if not cond or depth > len(questions):
+                shown[i] = True
+            else:
+                t = int(cond["qIdx"])
+                given = answers.get(f"q{t}")
+                hit = cond["value"] in given if isinstance(given, list) else given == cond["value"]
+                shown[i] = is_shown(t, depth + 1) and hit
+        return shown[i]
+
+    return [is_shown(i) for i in range(len(questions))]
+
+
+def validate(questions, answers):
+    """Raise InvalidResponse unless `answers` is a submission of `questions`."""
+    if not isinstance(answers, dict):
+        raise InvalidResponse("answers must be an object")
+    expected = {f"q{i}" for i in range(len(questions))}
+    if set(answers) != expected:
+        extra, missing = sorted(set(answers) - expected), sorted(expected - set(answers))
+        raise InvalidResponse(f"unexpected keys {extra}, missing keys {missing}")
+
+    shown = visible_questions(questions, answers)
+    for i, q in enumerate(questions):
+        value = answers[f"q{i}"]
+        empty = value is None or value == "" or value == []
+        if empty:
+            continue
+        if not shown[i]:
+            raise InvalidResponse(f"q{i} is answered but its condition is not met")
+        qtype = q["type"]
+        if qtype == "checkboxes":
+            if not isinstance(value, list) or not set(value) <= set(q["options"]):
+                raise InvalidResponse(f"q{i}: {value!r} is not a subset of the options")
+        elif not isinstance(value, str):
+            raise InvalidResponse(f"q{i}: expected a string, got {type(value).__name__}")
+        elif qtype in ("multiple-choice", "dropdown") and value not in q["options"]:
+            raise InvalidResponse(f"q{i}: {value!r} is not one of the options")
+        elif qtype == "rating" and value not in ("1", "2", "3", "4", "5"):
+            raise InvalidResponse(f"q{i}: rating must be 1-5")
+        elif qtype == "text" and len(value) > MAX_TEXT:
+            raise InvalidResponse(f"q{i}: text longer than {MAX_TEXT} characters")
+
+
+# --------------------------------------------------------------------- service
+
+class IngestService:
+    """Accept, validate and batch-store survey responses."""
+
+    def __init__(self, db_path, host="127.0.0.1", port=DEFAULT_PORT, queue_size=10_000,
+                 batch_size=5000, batch_interval=0.05, survey_cache=256):
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.queue = asyncio.Queue(queue_size)
+        self.surveys = OrderedDict()  # code -> (survey id, questions); LRU
+        self.survey_cache = survey_cache
+        self.stats = {"accepted": 0, "written": 0, "rejected": 0, "overloaded": 0, "batches": 0}
+        self._db = None
+        self._known_surveys = set()
+        self._server = None
+        self._writer = None
+
+    # -------------------------------------------------------------- lifecycle
+
+    async def start(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.executescript("PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;" + SCHEMA)
+        self._known_surveys = {row[0] for row in self._db.execute("SELECT id FROM surveys")}
+        self._writer = asyncio.create_task(self._write_batches())
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  reuse_address=True, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        """Stop accepting connections, flush what is queued, close the database."""
+        self._server.close()
+        await self._server.wait_closed()
+        await self.queue.join()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._db.close()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    # ------------------------------------------------------------- ingestion
+
+    def survey_for(self, code):
+        """(survey id, questions) for a code; decoded once per distinct code."""
+        hit = self.surveys.get(code)
+        if hit is not None:
+            self.surveys.move_to_end(code)
+            return hit
+        questions = surveycode.decode(code)
+        packed = json.dumps(surveycode.pack(questions), separators=(",", ":"))
+        hit = (hashlib.sha1(packed.encode()).hexdigest()[:16], questions)
+        self.surveys[code] = hit
+        if len(self.surveys) > self.survey_cache:
+            self.surveys.popitem(last=False)
+        return hit
+
+    def submit(self, payload):
+        """Validate and enqueue one payload; returns (status, body)."""
+        try:
+            survey_id, questions = self.survey_for(payload["code"])
+            validate(questions, payload["answers"])
+        except (KeyError, TypeError, IndexError, ValueError) as e:
+            self.stats["rejected"] += 1
+            return 422, {"error": str(e) if not isinstance(e, KeyError) else f"missing {e}"}
+        code = payload["code"] if survey_id not in self._known_surveys else None
+        try:
+            self.queue.put_nowait((survey_id, code, time.time(), json.dumps(payload["answers"])))
+        except asyncio.QueueFull:
+            self.stats["overloaded"] += 1
+            return 503, {"error": "ingestion queue is full, retry shortly"}
+        self._known_surveys.add(survey_id)
+        self.stats["accepted"] += 1
+        return 202, {"survey": survey_id}
+
+    async def _write_batches(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + self.batch_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            try:
+                await asyncio.to_thread(self._store, batch)
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _store(self, batch):
+        with self._db:
+            self._db.executemany("INSERT OR IGNORE INTO surveys (id, code) VALUES (?, ?)",
+                                 [(s, c) for s, c, _, _ in batch if c is not None])
+            self._db.executemany("INSERT INTO responses (survey, received, answers) VALUES (?, ?, ?)",
+                                 [(s, t, a) for s, _, t, a in batch])
+
+    # ------------------------------------------------------------------- HTTP
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3:
+                    break
+                method, path = parts[0], parts[1]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = headers.get("content-length", "") or "0"
+                if not (length.isascii() and length.isdigit()):  # "²".isdigit() is True too
+                    self._respond(writer, 400, {"error": "bad Content-Length"}, close=True)
+                    break
+                length = int(length)
+                if length > MAX_BODY:
+                    self._respond(writer, 413, {"error": "body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = self._route(method, path.split("?", 1)[0], body)
+                close = headers.get("connection", "").lower() == "close"
+                self._respond(writer, status, payload, close=close)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method, path, body):
+        if method == "OPTIONS":
+            return 204, None
+        if path == "/health" and method == "GET":
+            return 200, dict(self.stats, queued=self.queue.qsize())
+        if path != "/responses":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.stats["rejected"] += 1
+            return 400, {"error": "body is not JSON"}
+        if not isinstance(payload, dict):
+            self.stats["rejected"] += 1
+            return 400, {"error": "body must be a JSON object"}
+        return self.submit(payload)
+
+    def _respond(self, writer, status, payload, close=False):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            # survey.html is served from another origin (the static server)
+            "Access-Control-Allow-Origin: *",
+            "Access-Control-Allow-Methods: POST, GET, OPTIONS",
+            "Access-Control-Allow-Headers: Content-Type",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        if close:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=os.path.join(HERE, "responses.sqlite"))
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    async def serve():
+        service = await IngestService(args.db, args.host, args.port, args.queue_size,
+                                      args.batch_size).start()
+        print(f"Ingesting survey responses on {service.url}/responses into {args.db}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Simulated respondents for the login -> survey -> submit flow.
+
+    python loadgen.py                          # 2000 sessions, 200 concurrent
+    python loadgen.py -n 10000 -c 1000 --bad-logins 0.1 --think 0.05
+
+Each session does what a respondent's browser does, at the HTTP level:
+
+1. loads index.html (and checks it still carries `mockUserData`);
+2. logs in through testkit.auth_service, posting the same request as the
+   login form, as one of --users generated users or the page's accounts;
+3. loads survey.html?code=... and the scripts it needs;
+4. answers the questions, respecting conditional ones;
+5. posts the answers to ingest.py.
+
+The static server (testkit.server), the auth service and ingest.py are
+started in their own processes on free ports, so everything runs on this
+machine. The static server gives each keep-alive connection its own
+thread, so respondents share --connections sockets to it (like a
+browser's per-host limit). The report gives sessions per second, latency
+percentiles per step and error rates.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import surveycode
+from bench_surveycode import make_survey
+from loadtest_ingest import random_answers, wait_until_up
+from testkit import auth_service, config, impact
+from testkit.asynchttp import ConnectionPool, percentile
+
+CREDENTIALS_RE = re.compile(r'emailOrPhone:\s*"([^"]+)",\s*password:\s*"([^"]+)"')
+SURVEY_SCRIPTS = ("/surveycode.js", "/conditions.js")
+PAGES = ("/index.html", "/survey.html") + SURVEY_SCRIPTS
+STEPS = ("index", "login", "survey page", "submit", "session")
+
+
+class SessionFailed(Exception):
+    def __init__(self, step, reason):
+        super().__init__(f"{step}: {reason}")
+        self.step = step
+
+
+class LoadGenerator:
+    def __init__(self, site_url, ingest_url, auth_url, accounts, code, concurrency, connections=64,
+                 bad_logins=0.0, think=0.0, seed=458):
+        self.site = ConnectionPool(site_url, size=min(connections, concurrency))
+        self.ingest = ConnectionPool(ingest_url, size=concurrency)
+        self.auth = ConnectionPool(auth_url, size=concurrency)
+        self.accounts = accounts  # [(emailOrPhone, password)] the auth service knows
+        self.code = code
+        self.questions = surveycode.decode(code)
+        self.concurrency = concurrency
+        self.bad_logins = bad_logins
+        self.think = think
+        self.rnd = random.Random(seed)
+        self.latencies = {step: [] for step in STEPS}
+        self.outcomes = {}
+
+    async def fetch(self, step, path, expect=200):
+        resp = await self.site.get(path, {"Accept-Encoding": "gzip"})
+        if resp.status != expect:
+            raise SessionFailed(step, f"GET {path} -> {resp.status}")
+        body = resp.body
+        if resp.headers.get("content-encoding") == "gzip":
+            body = gzip.decompress(body)
+        return body.decode("utf-8")
+
+    async def pause(self):
+        if self.think:
+            await asyncio.sleep(self.rnd.uniform(0, 2 * self.think))
+
+    async def session(self):
+        timings = {}
+        started = time.perf_counter()
+
+        t = time.perf_counter()
+        page = await self.fetch("index", "/index.html")
+        if not CREDENTIALS_RE.search(page):
+            raise SessionFailed("index", "no mockUserData in index.html")
+        timings["index"] = time.perf_counter() - t
+        await self.pause()
+
+        t = time.perf_counter()
+        email, password = self.rnd.choice(self.accounts)
+        if self.rnd.random() < self.bad_logins:
+            password += "-wrong"
+        # the request the login form's checkCredentials() sends
+        resp = await self.auth.request(
+            "POST", "/login", json.dumps({"emailOrPhone": email, "password": password}).encode(),
+            {"Content-Type": "text/plain"})
+        timings["login"] = time.perf_counter() - t
+        if resp.status == 401:
+            return "login rejected", timings
+        if resp.status != 200:
+            raise SessionFailed("login", f"POST /login -> {resp.status} {resp.text()}")
+        await self.pause()
+
+        t = time.perf_counter()
+        await self.fetch("survey page", f"/survey.html?code={self.code}")
+        for script in SURVEY_SCRIPTS:
+            await self.fetch("survey page", script)
+        timings["survey page"] = time.perf_counter() - t
+        await self.pause()
+
+        t = time.perf_counter()
+        answers = random_answers(self.questions, self.rnd)
+        resp = await self.ingest.post_json("/responses", {"code": self.code, "answers": answers})
+        timings["submit"] = time.perf_counter() - t
+        if resp.status == 503:
+            return "submit overloaded", timings
+        if resp.status != 202:
+            raise SessionFailed("submit", f"POST /responses -> {resp.status} {resp.text()}")
+
+        timings["session"] = time.perf_counter() - started
+        return "ok", timings
+
+    async def run(self, total):
+        remaining = iter(range(total))
+
+        async def respondent():
+            for _ in remaining:
+                try:
+                    outcome, timings = await self.session()
+                except SessionFailed as e:
+                    outcome, timings = f"error in {e.step}", {}
+                except (OSError, asyncio.IncompleteReadError) as e:
+                    outcome, timings = f"connection error ({type(e).__name__})", {}
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+                for step, seconds in timings.items():
+                    self.latencies[step].append(seconds)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(respondent() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+        await self.site.close()
+        await self.ingest.close()
+        await self.auth.close()
+        return elapsed
+
+    def report(self, total, elapsed, stream=None):
+        stream = stream or sys.stdout
+        ok = self.outcomes.get("ok", 0)
+        errors = sum(n for o, n in self.outcomes.items() if o.startswith(("error", "connection")))
+        stream.write(f"{total} sessions, {self.concurrency} concurrent, {elapsed:.2f}s\n")
+        stream.write(f"  throughput   {ok / elapsed:8.1f} completed sessions/s\n")
+        stream.write(f"  error rate   {errors / total:8.2%}\n")
+        stream.write(f"  outcomes     {dict(sorted(self.outcomes.items()))}\n")
+        stream.write(f"  {'step':<12} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}\n")
+        for step in STEPS:
+            values = sorted(self.latencies[step])
+            if not values:
+                continue
+            row = [percentile(values, p) * 1000 for p in (50, 95, 99)] + [values[-1] * 1000]
+            stream.write(f"  {step:<12} {len(values):>7} " + " ".join(f"{v:9.2f}" for v in row) + "\n")
+        return errors == 0
+
+
+def record_inputs(recorder=None):
+    """Record the files the subprocesses serve and run as inputs of the running test.
+
+    testkit.impact only sees files the in-process static server resolves, so
+    without this --changed-only would skip a test that runs the load generator
+    after survey.html or ingest.py changed.
+    """
+    recorder = recorder or impact.RECORDER
+    for path in PAGES:
+        recorder.note(os.path.join(HERE, path.lstrip("/")))
+    recorder.note(os.path.join(HERE, "ingest.py"))
+
+
+def spawn(args):
+    return subprocess.Popen([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--sessions", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=200)
+    parser.add_argument("--connections", type=int, default=64,
+                        help="keep-alive connections to the static server")
+    parser.add_argument("--questions", type=int, default=20, help="size of the generated survey")
+    parser.add_argument("--code", help="survey code to answer instead of a generated survey")
+    parser.add_argument("--bad-logins", type=float, default=0.0,
+                        help="fraction of sessions that type a wrong password")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="mean pause between steps, in seconds")
+    parser.add_argument("--users", type=int, default=1000,
+                        help="generated users in the auth service (besides the page accounts)")
+    args = parser.parse_args(argv)
+
+    code = args.code or surveycode.encode(make_survey(args.questions))
+    # generated (or read from .cs458-cache) here, so the service only loads it
+    accounts = list(auth_service.SEED_USERS.items()) + [
+        (u["emailOrPhone"], u["password"]) for u in auth_service.fixture(args.users)["users"]]
+    site_port, ingest_port, auth_port = config.free_port(), config.free_port(), config.free_port()
+    tmp = tempfile.TemporaryDirectory()
+    record_inputs()
+    procs = [
+        spawn(["-m", "testkit.server", HERE, "--port", str(site_port),
+               "--workers", str(args.connections)]),
+        spawn([os.path.join(HERE, "ingest.py"), "--port", str(ingest_port),
+               "--db", os.path.join(tmp.name, "responses.sqlite")]),
+        spawn(["-m", "testkit.auth_service", "--port", str(auth_port), "--users", str(args.users)]),
+    ]
+    try:
+        gen = LoadGenerator(f"http://127.0.0.1:{site_port}", f"http://127.0.0.1:{ingest_port}",
+                            f"http://127.0.0.1:{auth_port}", accounts,
+                            code, args.concurrency, args.connections, args.bad_logins, args.think)
+
+        async def go():
+            await wait_until_up(gen.site, "/index.html")
+            await wait_until_up(gen.ingest)
+            await wait_until_up(gen.auth)
+            return await gen.run(args.sessions)
+
+        elapsed = asyncio.run(go())
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+        tmp.cleanup()
+    return 0 if gen.report(args.sessions, elapsed) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
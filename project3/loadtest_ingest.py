@@ -0,0 +1,139 @@
+"""Burst load test for ingest.py.
+
+    python loadtest_ingest.py                          # 20000 submissions, 500 concurrent
+    python loadtest_ingest.py -n 50000 -c 2000 --questions 40
+    python loadtest_ingest.py --url http://localhost:8765   # an already running service
+
+Without --url it starts ingest.py in a subprocess on a free port with a
+throw-away database. Every simulated respondent posts one valid answer
+set; the report gives sustained submissions per second, latency
+percentiles and how many requests were turned away with 503.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import surveycode
+from bench_surveycode import make_survey
+from ingest import visible_questions
+from testkit import config
+from testkit.asynchttp import ConnectionPool, HTTPError, percentile
+
+
+def random_answers(questions, rnd):
+    """Answers a respondent could give: choices from the options, conditions respected."""
+    answers = {}
+    for i, q in enumerate(questions):
+        if q["type"] == "checkboxes":
+            answers[f"q{i}"] = rnd.sample(q["options"], rnd.randint(0, len(q["options"])))
+        elif q["type"] in ("multiple-choice", "dropdown"):
+            answers[f"q{i}"] = rnd.choice(q["options"])
+        elif q["type"] == "rating":
+            answers[f"q{i}"] = str(rnd.randint(1, 5))
+        else:
+            answers[f"q{i}"] = rnd.choice(["", "fine", "could be better", "great tool"])
+    for i, shown in enumerate(visible_questions(questions, answers)):
+        if not shown:
+            answers[f"q{i}"] = None
+    return answers
+
+
+def start_service(db_path):
+    port = config.free_port()
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "ingest.py"),
+                             "--port", str(port), "--db", db_path],
+                            stdout=subprocess.DEVNULL)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_up(pool, path="/health", timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await pool.get(path)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def run(url, total, concurrency, questions, seed):
+    code = surveycode.encode(questions)
+    rnd = random.Random(seed)
+    payloads = [{"code": code, "answers": random_answers(questions, rnd)} for _ in range(min(total, 1000))]
+    pool = ConnectionPool(url, size=concurrency)
+    await wait_until_up(pool)
+
+    latencies, statuses = [], {}
+    next_index = iter(range(total))
+
+    async def respondent():
+        for k in next_index:
+            started = time.perf_counter()
+            try:
+                status = (await pool.post_json("/responses", payloads[k % len(payloads)])).status
+            except (OSError, HTTPError, asyncio.IncompleteReadError) as e:
+                status = f"connection error ({type(e).__name__})"
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(respondent() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    # let the writer drain, then read the final counters
+    health = await pool.get("/health")
+    while health.json()["written"] < health.json()["accepted"]:
+        await asyncio.sleep(0.05)
+        health = await pool.get("/health")
+    await pool.close()
+    return elapsed, sorted(latencies), statuses, health.json()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--submissions", type=int, default=20_000)
+    parser.add_argument("-c", "--concurrency", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--url", help="use a running ingest.py instead of starting one")
+    parser.add_argument("--seed", type=int, default=458)
+    args = parser.parse_args(argv)
+
+    proc = tmp = None
+    url = args.url
+    if url is None:
+        tmp = tempfile.TemporaryDirectory()
+        proc, url = start_service(os.path.join(tmp.name, "responses.sqlite"))
+    try:
+        elapsed, latencies, statuses, health = asyncio.run(
+            run(url, args.submissions, args.concurrency, make_survey(args.questions), args.seed))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+            tmp.cleanup()
+
+    accepted = statuses.get(202, 0)
+    print(f"{args.submissions} submissions from {args.concurrency} concurrent respondents "
+          f"in {elapsed:.2f}s")
+    print(f"  accepted     {accepted / elapsed:10.0f} submissions/s")
+    for p in (50, 95, 99):
+        print(f"  p{p:<2} latency {percentile(latencies, p) * 1000:10.2f} ms")
+    print(f"  max latency  {latencies[-1] * 1000:10.2f} ms")
+    print(f"  statuses     {dict(sorted(statuses.items(), key=str))}")
+    print(f"  stored       {health['written']} rows in {health['batches']} batches")
+    return 0 if accepted + statuses.get(503, 0) == args.submissions else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
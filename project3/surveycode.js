@@ -0,0 +1,92 @@
+// surveycode.js
+// Survey codes shared by survey-builder.html and survey.html.
+//
+//   v2.<base64url>   deflate-raw compressed, packed schema (current)
+//   v2r.<base64url>  same packed schema, uncompressed (browsers without CompressionStream)
+//   <base64>         legacy btoa(JSON.stringify(questions)) codes, still accepted
+//
+// The packed schema is a JSON array with one entry per question:
+//   [text, typeIndex, options?, condition?]
+// where condition is [questionIndex, optionIndex] when the value is one of the
+// referenced question's options, or [questionIndex, "value"] otherwise.
+// Trailing empty fields are dropped. project3/surveycode.py reads and writes
+// the same format.
+const SurveyCode = (() => {
+  const TYPES = ['multiple-choice', 'rating', 'text', 'dropdown', 'checkboxes'];
+  const canCompress = typeof CompressionStream !== 'undefined';
+
+  function pack(questions) {
+    return questions.map(q => {
+      const entry = [q.text, TYPES.indexOf(q.type), q.options || []];
+      if (q.condition) {
+        const ref = questions[Number(q.condition.qIdx)];
+        const opt = ref ? ref.options.indexOf(q.condition.value) : -1;
+        entry.push([Number(q.condition.qIdx), opt >= 0 ? opt : q.condition.value]);
+      } else if (!entry[2].length) {
+        entry.pop();
+      }
+      return entry;
+    });
+  }
+
+  function unpack(packed) {
+    const questions = packed.map(([text, type, options = []]) => {
+      if (!TYPES[type]) throw new Error('Unknown question type ' + type);
+      return { text, type: TYPES[type], options, condition: null };
+    });
+    packed.forEach((entry, i) => {
+      const cond = entry[3];
+      if (!cond) return;
+      const ref = questions[cond[0]];
+      if (!ref) throw new Error('Condition refers to missing question ' + cond[0]);
+      const value = typeof cond[1] === 'number' ? ref.options[cond[1]] : cond[1];
+      // the builder keeps qIdx as the <select> value, i.e. a string
+      questions[i].condition = { qIdx: String(cond[0]), value };
+    });
+    return questions;
+  }
+
+  function toBase64url(bytes) {
+    let bin = '';
+    for (let i = 0; i < bytes.length; i += 0x8000) {
+      bin += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    }
+    return btoa(bin).replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+  }
+
+  function fromBase64url(text) {
+    const b64 = text.replace(/-/g, '+').replace(/_/g, '/');
+    const bin = atob(b64 + '='.repeat((4 - b64.length % 4) % 4));
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return bytes;
+  }
+
+  async function pipe(bytes, stream) {
+    const out = new Response(new Blob([bytes]).stream().pipeThrough(stream));
+    return new Uint8Array(await out.arrayBuffer());
+  }
+
+  async function encode(questions) {
+    const bytes = new TextEncoder().encode(JSON.stringify(pack(questions)));
+    if (!canCompress) return 'v2r.' + toBase64url(bytes);
+    return 'v2.' + toBase64url(await pipe(bytes, new CompressionStream('deflate-raw')));
+  }
+
+  async function decode(code) {
+    code = code.trim();
+    if (code.startsWith('v2.') || code.startsWith('v2r.')) {
+      const dot = code.indexOf('.');
+      let bytes = fromBase64url(code.slice(dot + 1));
+      if (code.startsWith('v2.')) {
+        if (!canCompress) throw new Error('This browser cannot read compressed survey codes.');
+        bytes = await pipe(bytes, new DecompressionStream('deflate-raw'));
+      }
+      return unpack(JSON.parse(new TextDecoder().decode(bytes)));
+    }
+    // legacy: Base64 of the UTF-8 JSON array
+    return JSON.parse(decodeURIComponent(escape(atob(code))));
+  }
+
+  return { encode, decode, pack, unpack };
+})();
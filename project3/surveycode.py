@@ -0,0 +1,96 @@
+"""Python reader/writer for the survey codes made by survey-builder.html.
+
+Mirrors surveycode.js:
+
+    v2.<base64url>   deflate-raw compressed, packed schema
+    v2r.<base64url>  packed schema, uncompressed
+    <base64>         legacy base64 of the plain JSON question list
+
+Questions are the same dicts the builder keeps:
+{"text", "type", "options", "condition": None or {"qIdx": "0", "value": ...}}.
+"""
+
+import base64
+import binascii
+import json
+import zlib
+
+TYPES = ["multiple-choice", "rating", "text", "dropdown", "checkboxes"]
+
+
+class SurveyCodeError(ValueError):
+    """The string is not a survey code this module (or the pages) can read."""
+
+
+def pack(questions):
+    packed = []
+    for q in questions:
+        entry = [q["text"], TYPES.index(q["type"]), list(q.get("options") or [])]
+        cond = q.get("condition")
+        if cond:
+            idx = int(cond["qIdx"])
+            ref = questions[idx]["options"] if 0 <= idx < len(questions) else []
+            value = ref.index(cond["value"]) if cond["value"] in ref else cond["value"]
+            entry.append([idx, value])
+        elif not entry[2]:
+            entry.pop()
+        packed.append(entry)
+    return packed
+
+
+def unpack(packed):
+    questions = []
+    for entry in packed:
+        if not 2 <= len(entry) <= 4 or not 0 <= entry[1] < len(TYPES):
+            raise SurveyCodeError(f"malformed question entry {entry!r}")
+        options = entry[2] if len(entry) > 2 else []
+        questions.append({"text": entry[0], "type": TYPES[entry[1]],
+                          "options": options, "condition": None})
+    for q, entry in zip(questions, packed):
+        if len(entry) < 4:
+            continue
+        idx, value = entry[3]
+        if not 0 <= idx < len(questions):
+            raise SurveyCodeError(f"condition refers to missing question {idx}")
+        if isinstance(value, int):
+            value = questions[idx]["options"][value]
+        q["condition"] = {"qIdx": str(idx), "value": value}
+    return questions
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64url(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def encode(questions, compress=True):
+    data = json.dumps(pack(questions), ensure_ascii=False, separators=(",", ":")).encode()
+    if not compress:
+        return "v2r." + _b64url(data)
+    c = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return "v2." + _b64url(c.compress(data) + c.flush())
+
+
+def encode_legacy(questions):
+    """The pre-v2 format: base64 of the JSON list (what the builder used to emit)."""
+    data = json.dumps(questions, ensure_ascii=False, separators=(",", ":")).encode()
+    return base64.b64encode(data).decode("ascii")
+
+
+def decode(code):
+    code = code.strip()
+    try:
+        if code.startswith("v2.") or code.startswith("v2r."):
+            prefix, _, body = code.partition(".")
+            data = _unb64url(body)
+            if prefix == "v2":
+                data = zlib.decompress(data, -15)
+            return unpack(json.loads(data))
+        return json.loads(base64.b64decode(code, validate=True))
+    except SurveyCodeError:
+        raise
+    except (binascii.Error, zlib.error, ValueError, TypeError, IndexError) as e:
+        raise SurveyCodeError(f"invalid survey code: {e}") from e
@@ -1,62 +1,103 @@
 # tests/test_app_flow.py
 
 import unittest
-import subprocess
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-import shutil
+import asyncio
+import json
+import sqlite3
 import sys
+import os
+import tempfile
+import threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)  # surveycode.py, also when loaded by testkit.parallel
+from testkit import auth_service, browser, cdp, config, profiler, schedule, waits
+from testkit.server import StaticServer
+from testkit.page_reset import PageResetter
+from testkit.pages import LoginPage, SurveyFormPage, BuilderPage, SurveyRunnerPage, CLICK
+from testkit.auth_state import WebLogin
+import surveycode
+import ingest
+from test_surveycode import QUESTIONS
+
 # Shared server & driver for all tests in this module
 server = None
 driver = None
 wait = None
+resetters = {}
+
+# How each page is put back into its initial state without reloading
+PAGE_RESETS = {
+    "index.html": dict(
+        # the page's own default: no auth service unless opened with ?authUrl=
+        reset_js="messageDiv.textContent = ''; authUrl = null;",
+        restore_html=["consContainer"],
+        ready=EC.presence_of_element_located((By.ID, "loginForm")),
+    ),
+    "survey-builder.html": dict(
+        reset_js="questions = []; editIndex = null;"
+                 " resetForm(); renderQuestionList(); renderPreview();",
+        restore_html=["condValue"],
+        assets=["surveycode.js", "conditions.js"],
+        ready=EC.element_to_be_clickable((By.ID, "newQuestionBtn")),
+    ),
+}
+
+
+# Survey tests start logged in: one real login, then the page state it left is replayed
+auth = WebLogin(
+    login=lambda d: LoginPage(d).login("testuser@example.com", "Test1234"),
+    ready=EC.visibility_of_element_located((By.ID, "surveyForm")),
+)
+
+
+def open_page(page):
+    """Bring a page to its initial state, in place when possible (see testkit.page_reset)."""
+    if page not in resetters:
+        resetters[page] = PageResetter(driver, server, page, **PAGE_RESETS[page])
+    return resetters[page].reset()
 
 def setUpModule():
     """Start HTTP server and browser once for all tests."""
     global server, driver, wait
-    server = subprocess.Popen(
-        ["python3", "-m", "http.server", "3000"],
-        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-    )
-
-    options = webdriver.ChromeOptions()
-    # options.add_argument("--headless")  # Uncomment if you want headless testing
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-
-    chromedriver_path = shutil.which("chromedriver")
-    if not chromedriver_path:
-        sys.exit("❌ ChromeDriver not found in PATH. Make sure it is installed and available.")
-
-    service = Service(chromedriver_path)
-    driver = webdriver.Chrome(service=service, options=options)
-    wait = WebDriverWait(driver, 5)
+    # In-process server on an ephemeral port; start() returns once it answers
+    server = StaticServer(HERE).start()
+    # Cold launch, or a fresh context in the pre-warmed Chrome with CS458_BROWSER=daemon;
+    # replaced between tests when it grows too big (see config.recycle_limits)
+    driver = browser.RecyclingDriver(lambda: profiler.attach(browser.chrome(browser.NO_SANDBOX_ARGS)))
+    # Same until() interface as WebDriverWait, but polls adaptively instead of every 0.5 s
+    wait = waits.Waiter(driver, 5)
 
 
 def tearDownModule():
     """Stop browser and HTTP server."""
     global server, driver
+    resetters.clear()
     driver.quit()
-    server.terminate()
+    server.stop()
+    print(auth.summary())
+    print(waits.summary())
+    profiler.finish()
 
 class IndexPageTests(unittest.TestCase):
-    base_url = "http://localhost:3000/index.html"
 
     def setUp(self):
         self.driver = driver
         self.wait = wait
-        self.driver.get(self.base_url)
-        # Ensure login form is present before each test
-        self.wait.until(EC.presence_of_element_located((By.ID, "loginForm")))
+        self.base_url = server.url_for("index.html")
+        # Fresh login form before each test
+        open_page("index.html")
+        self.login = LoginPage(self.driver)
 
     def test_valid_login_with_email_shows_survey(self):
         """Logging in with valid email & password hides login and shows survey."""
-        self.driver.find_element(By.ID, "emailInput").send_keys("testuser@example.com")
-        self.driver.find_element(By.ID, "passwordInput").send_keys("Test1234")
-        self.driver.find_element(By.CLASS_NAME, "btn-login").click()
+        self.login.el("email").send_keys("testuser@example.com")
+        self.login.el("password").send_keys("Test1234")
+        self.login.el("login").click()
 
         survey = self.wait.until(EC.visibility_of_element_located((By.ID, "surveyContainer")))
         self.assertTrue(survey.is_displayed())
@@ -64,74 +105,144 @@ class IndexPageTests(unittest.TestCase):
 
     def test_valid_login_with_phone_shows_survey(self):
         """Logging in with valid phone & password shows the survey form."""
-        self.driver.find_element(By.ID, "emailInput").send_keys("5551234567")
-        self.driver.find_element(By.ID, "passwordInput").send_keys("phonePass")
-        self.driver.find_element(By.CLASS_NAME, "btn-login").click()
+        self.login.el("email").send_keys("5551234567")
+        self.login.el("password").send_keys("phonePass")
+        self.login.el("login").click()
 
         survey = self.wait.until(EC.visibility_of_element_located((By.ID, "surveyContainer")))
         self.assertTrue(survey.is_displayed())
 
     def test_invalid_login_shows_error(self):
         """Incorrect credentials display an error and keep login visible."""
-        self.driver.find_element(By.ID, "emailInput").send_keys("wrong@example.com")
-        self.driver.find_element(By.ID, "passwordInput").send_keys("badpass")
-        self.driver.find_element(By.CLASS_NAME, "btn-login").click()
+        self.login.el("email").send_keys("wrong@example.com")
+        self.login.el("password").send_keys("badpass")
+        self.login.el("login").click()
 
-        msg = self.wait.until(EC.visibility_of_element_located((By.ID, "message")))
+        # the check is asynchronous (auth service first, mockUserData if it is not running)
+        self.wait.until(EC.text_to_be_present_in_element((By.ID, "message"), "Invalid"))
+        msg = self.driver.find_element(By.ID, "message")
         self.assertEqual(msg.text, "Invalid Credentials. Try again!")
         self.assertFalse(self.driver.find_element(By.ID, "surveyContainer").is_displayed())
 
     def test_missing_email_shows_fill_all_message(self):
         """Submitting without email shows the 'fill out all fields' message."""
-        self.driver.find_element(By.ID, "passwordInput").send_keys("Test1234")
-        self.driver.find_element(By.CLASS_NAME, "btn-login").click()
+        self.login.el("password").send_keys("Test1234")
+        self.login.el("login").click()
 
         msg = self.wait.until(EC.visibility_of_element_located((By.ID, "message")))
         self.assertEqual(msg.text, "Please fill out all fields.")
 
     def test_missing_password_shows_fill_all_message(self):
         """Submitting without password shows the 'fill out all fields' message."""
-        self.driver.find_element(By.ID, "emailInput").send_keys("testuser@example.com")
-        self.driver.find_element(By.CLASS_NAME, "btn-login").click()
+        self.login.el("email").send_keys("testuser@example.com")
+        self.login.el("login").click()
 
         msg = self.wait.until(EC.visibility_of_element_located((By.ID, "message")))
         self.assertEqual(msg.text, "Please fill out all fields.")
 
     def test_google_button_shows_survey(self):
         """Clicking the Google button immediately shows the survey."""
-        self.driver.find_element(By.ID, "googleBtn").click()
+        self.login.el("google").click()
         survey = self.wait.until(EC.visibility_of_element_located((By.ID, "surveyContainer")))
         self.assertTrue(survey.is_displayed())
 
     def test_facebook_button_shows_survey(self):
         """Clicking the Facebook button immediately shows the survey."""
-        self.driver.find_element(By.ID, "facebookBtn").click()
+        self.login.el("facebook").click()
         survey = self.wait.until(EC.visibility_of_element_located((By.ID, "surveyContainer")))
         self.assertTrue(survey.is_displayed())
 
     def test_survey_form_fields_present_after_login(self):
         """After a successful login, all expected survey fields are present."""
-        # perform a valid login
-        self.driver.find_element(By.ID, "emailInput").send_keys("testuser@example.com")
-        self.driver.find_element(By.ID, "passwordInput").send_keys("Test1234")
-        self.driver.find_element(By.CLASS_NAME, "btn-login").click()
-        self.wait.until(EC.visibility_of_element_located((By.ID, "surveyForm")))
-
-        # verify key inputs/buttons
-        for field_id in ["fullName", "birthDate", "educationLevel", "city", "useCases", "surveySubmit"]:
-            el = self.driver.find_element(By.ID, field_id)
+        auth.enter(self.driver)
+
+        # verify key inputs/buttons (read in a single call)
+        for field_id, state in SurveyFormPage(self.driver).fields().items():
+            self.assertIsNotNone(state, f"#{field_id} is missing from the survey form")
             # 'surveySubmit' is a button, others should be enabled inputs
-            self.assertTrue(el.is_enabled() or el.tag_name == "button")
+            self.assertTrue(state["enabled"] or state["tag"] == "button", f"#{field_id} is disabled")
+
+
+class SurveyFormTests(unittest.TestCase):
+    """The survey shown after login; every test starts logged in through `auth`."""
+
+    def setUp(self):
+        self.driver = driver
+        open_page("index.html")
+        # the first test logs in through the form, the others replay that login's state
+        auth.enter(self.driver)
+
+    def test_other_model_asks_which_one(self):
+        """Ticking "Other" shows the text field for the model's name."""
+        other_text = self.driver.find_element(By.ID, "otherModelText")
+        self.assertFalse(other_text.is_displayed())
+        self.driver.find_element(By.ID, "otherModelCheckbox").click()
+        wait.until(EC.visibility_of(other_text))
+
+    def test_each_selected_model_gets_a_cons_field(self):
+        """One cons textarea per ticked model, in the order they are listed."""
+        for model in ("ChatGPT", "Claude"):
+            self.driver.find_element(By.CSS_SELECTOR, f"#modelCheckboxes input[value='{model}']").click()
+        textareas = (By.CSS_SELECTOR, "#consContainer textarea")
+        wait.until(lambda d: len(d.find_elements(*textareas)) == 2)
+        names = [f.get_attribute("name") for f in self.driver.find_elements(*textareas)]
+        self.assertEqual(names, ["cons_ChatGPT", "cons_Claude"])
+
+
+class AuthServiceLoginTests(unittest.TestCase):
+    """The login form against testkit.auth_service with a generated user base."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Cheap hashes: these tests are about the page talking to the service
+        cls.users = auth_service.fixture(200, iterations=10)["users"]
+        store = auth_service.CredentialStore.seeded(200, iterations=10)
+        cls.service = auth_service.AuthService(store).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.stop()
+
+    def setUp(self):
+        self.driver = driver
+        open_page("index.html")
+        self.driver.execute_script("authUrl = arguments[0];", f"{self.service.url}/login")
+        self.login = LoginPage(self.driver)
+
+    def test_generated_user_logs_in_through_the_service(self):
+        """A synthetic user the page does not know gets to the survey."""
+        before = self.service.stats["logins"]
+        user = self.users[-1]  # logs in with a phone number
+        self.login.login(user["emailOrPhone"], user["password"])
+
+        wait.until(EC.visibility_of_element_located((By.ID, "surveyContainer")))
+        self.assertEqual(self.service.stats["logins"], before + 1)
+
+    def test_wrong_password_is_rejected_by_the_service(self):
+        """A 401 from the service shows the usual error and keeps the login form."""
+        before = self.service.stats["rejected"]
+        self.login.login(self.users[0]["emailOrPhone"], self.users[0]["password"] + "x")
+
+        wait.until(EC.text_to_be_present_in_element((By.ID, "message"), "Invalid Credentials. Try again!"))
+        self.assertEqual(self.service.stats["rejected"], before + 1)
+        self.assertFalse(self.driver.find_element(By.ID, "surveyContainer").is_displayed())
+
+    def test_falls_back_to_the_page_accounts_when_the_service_is_down(self):
+        """With nothing listening at authUrl the page checks mockUserData itself."""
+        self.driver.execute_script("authUrl = arguments[0];", f"http://127.0.0.1:{config.free_port()}/login")
+        self.login.login("testuser@example.com", "Test1234")
+
+        wait.until(EC.visibility_of_element_located((By.ID, "surveyContainer")))
+
 
 class SurveyBuilderTests(unittest.TestCase):
-    base_url = "http://localhost:3000/survey-builder.html"
 
     def setUp(self):
         self.driver = driver
         self.wait = wait
-        self.driver.get(self.base_url)
-        # Ensure builder is ready
-        self.wait.until(EC.presence_of_element_located((By.ID, "newQuestionBtn")))
+        self.base_url = server.url_for("survey-builder.html")
+        # Empty builder before each test
+        open_page("survey-builder.html")
 
     def test_new_question_button_resets_form(self):
         """Clicking “New Question” clears inputs and keeps Save disabled."""
@@ -141,36 +252,33 @@ class SurveyBuilderTests(unittest.TestCase):
         # reset
         self.driver.find_element(By.ID, "newQuestionBtn").click()
 
-        self.assertEqual(self.driver.find_element(By.ID, "formTitle").text, "Add Question")
-        self.assertEqual(self.driver.find_element(By.ID, "qText").get_attribute("value"), "")
-        self.assertEqual(
-            Select(self.driver.find_element(By.ID, "qType")).first_selected_option.get_attribute("value"),
-            ""
-        )
-        self.assertFalse(self.driver.find_element(By.ID, "saveQuestionBtn").is_enabled())
+        BuilderPage(self.driver).assert_state(self, {
+            "formTitle": {"text": "Add Question"},
+            "qText": {"value": ""},
+            "qType": {"value": ""},
+            "saveQuestionBtn": {"enabled": False},
+        })
 
     def test_saving_multiple_choice_question_updates_list_and_preview(self):
         """Saving an MCQ adds it to the list and renders radio inputs in preview."""
+        builder = BuilderPage(self.driver)
         # fill MCQ
-        self.driver.find_element(By.ID, "qText").send_keys("Favorite color?")
-        Select(self.driver.find_element(By.ID, "qType")).select_by_value("multiple-choice")
-        self.wait.until(EC.visibility_of_element_located((By.ID, "optionsGroup")))
-        self.driver.find_element(By.ID, "qOptions").send_keys("Red\nGreen\nBlue")
-
-        save = self.driver.find_element(By.ID, "saveQuestionBtn")
-        self.assertTrue(save.is_enabled())
-        save.click()
+        builder.add_question("Favorite color?", "multiple-choice", ["Red", "Green", "Blue"], save=False)
+        builder.assert_state(self, {
+            "optionsGroup": {"displayed": True},
+            "saveQuestionBtn": {"enabled": True},
+        })
+        builder.run(("saveQuestionBtn", CLICK))
 
         # list updated
-        items = self.driver.find_elements(By.CLASS_NAME, "q-item")
+        items = builder.question_items()
         self.assertEqual(len(items), 1)
-        self.assertIn("Favorite color? (multiple-choice)", items[0].text)
+        self.assertIn("Favorite color? (multiple-choice)", items[0])
 
         # preview correctness
-        preview_label = self.driver.find_element(By.CSS_SELECTOR, "#previewForm label")
-        self.assertEqual(preview_label.text, "Favorite color?")
-        radios = self.driver.find_elements(By.CSS_SELECTOR, "#previewForm input[type=radio]")
-        self.assertEqual(len(radios), 3)
+        preview = builder.preview()
+        self.assertEqual(preview[0]["label"], "Favorite color?")
+        self.assertEqual(preview[0]["radios"], 3)
 
     def test_conditional_logic_hides_and_shows_dependent_question(self):
         """A dependent question stays hidden until its trigger answer is selected."""
@@ -190,20 +298,18 @@ class SurveyBuilderTests(unittest.TestCase):
         Select(self.driver.find_element(By.ID, "condValue")).select_by_visible_text("A")
         self.driver.find_element(By.ID, "saveQuestionBtn").click()
 
-        wrappers = self.driver.find_elements(By.CSS_SELECTOR, "#previewForm > div")
+        builder = BuilderPage(self.driver)
+        wrappers = builder.els("preview questions")
         self.assertEqual(len(wrappers), 2)
         self.assertFalse(wrappers[1].is_displayed())
 
         # trigger show
-        first_radio = self.driver.find_element(
-            By.XPATH, "//label[contains(., 'A')]/input[@type='radio']"
-        )
-        first_radio.click()
+        builder.el("preview radio", "A").click()
         self.wait.until(lambda d: wrappers[1].is_displayed())
         self.assertTrue(wrappers[1].is_displayed())
 
     def test_export_and_import_survey_code_preserves_questions(self):
-        """Exporting to Base64 and re-importing restores the exact question set."""
+        """Exporting a v2 code and re-importing it restores the exact question set."""
         # add a text question
         self.driver.find_element(By.ID, "qText").send_keys("Q?")
         Select(self.driver.find_element(By.ID, "qType")).select_by_value("text")
@@ -215,8 +321,10 @@ class SurveyBuilderTests(unittest.TestCase):
 
         code_area = self.driver.find_element(By.ID, "surveyCode")
         self.assertTrue(code_area.is_displayed())
-        code = code_area.get_attribute("value")
-        self.assertGreater(len(code), 0)
+        # encoding is async (CompressionStream), so wait for the code to appear
+        code = self.wait.until(lambda d: code_area.get_attribute("value"))
+        self.assertTrue(code.startswith("v2."))
+        self.assertEqual(surveycode.decode(code)[0]["text"], "Q?")
 
         # reload & import
         self.driver.get(self.base_url)
@@ -224,25 +332,27 @@ class SurveyBuilderTests(unittest.TestCase):
         self.driver.find_element(By.ID, "loadSurveyCode").send_keys(code)
         self.driver.find_element(By.ID, "loadSurveyBtn").click()
 
-        items = self.wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "q-item")))
+        builder = BuilderPage(self.driver)
+        items = builder.wait_for("items")
         self.assertEqual(len(items), 1)
         self.assertIn("Q? (text)", items[0].text)
-        preview_label = self.driver.find_element(By.CSS_SELECTOR, "#previewForm label")
-        self.assertEqual(preview_label.text, "Q?")
+        self.assertEqual(builder.els("preview labels")[0].text, "Q?")
 
     def test_import_invalid_survey_code_shows_alert(self):
         """Loading a malformed Base64 code shows an alert and leaves the question list empty."""
         # make sure builder is loaded
         self.wait.until(EC.presence_of_element_located((By.ID, "loadSurveyCode")))
         self.driver.find_element(By.ID, "loadSurveyCode").send_keys("not-base64!!!")
-        # hijack window.alert to capture message
-        self.driver.execute_script("window.alert = msg => window._lastAlert = msg;")
-        self.driver.find_element(By.ID, "loadSurveyBtn").click()
-        alert_text = self.driver.execute_script("return window._lastAlert;")
-        self.assertIn("Invalid survey code", alert_text)
+        # The DevTools connection sees (and accepts) the real alert; over plain WebDriver
+        # arm_dialogs() records alert() calls instead
+        fast = cdp.fast_path(self.driver)
+        fast.arm_dialogs()
+        fast.click("#loadSurveyBtn")
+        dialog = fast.wait_for_dialog(timeout=5)
+        self.assertEqual(dialog["type"], "alert")
+        self.assertIn("Invalid survey code", dialog["message"])
         # no questions should be added
-        items = self.driver.find_elements(By.CLASS_NAME, "q-item")
-        self.assertEqual(len(items), 0)
+        self.assertEqual(BuilderPage(self.driver).els("items"), [])
 
     def test_rapid_new_and_save_does_not_crash(self):
         """Repeated New→Save clicks don’t break the builder, and you can still add a real question."""
@@ -254,7 +364,7 @@ class SurveyBuilderTests(unittest.TestCase):
         self.driver.find_element(By.ID, "qText").send_keys("Stable?")
         Select(self.driver.find_element(By.ID, "qType")).select_by_value("text")
         self.driver.find_element(By.ID, "saveQuestionBtn").click()
-        items = self.driver.find_elements(By.CLASS_NAME, "q-item")
+        items = BuilderPage(self.driver).els("items")
         self.assertTrue(any("Stable? (text)" in itm.text for itm in items))
 
 class SurveyPageErrorTests(unittest.TestCase):
@@ -264,19 +374,75 @@ class SurveyPageErrorTests(unittest.TestCase):
 
     def test_survey_page_no_code_shows_error(self):
         """Visiting survey.html without "?code=" displays the error message."""
-        self.driver.get("http://localhost:3000/survey.html")
-        err = self.wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, "body p")))
+        self.driver.get(server.url_for("survey.html"))
+        err = SurveyRunnerPage(self.driver).wait_for("error")
         self.assertEqual(err.text, "No survey code provided.")
 
 
+class SurveyCodeTests(unittest.TestCase):
+    """survey.html reading survey codes (the Python codec is tested in test_surveycode.py)."""
+
+    QUESTIONS = QUESTIONS
+
+    def setUp(self):
+        self.driver = driver
+        self.wait = wait
+
+    def open_survey(self, code):
+        self.driver.get(server.url_for(f"survey.html?code={code}"))
+        SurveyRunnerPage(self.driver).wait_for("questions")
+        return SurveyRunnerPage(self.driver)
+
+    def test_survey_page_loads_v2_code(self):
+        """A v2 code renders every question and keeps conditional logic working."""
+        page = self.open_survey(surveycode.encode(self.QUESTIONS))
+        questions = page.questions()
+        self.assertEqual([q["label"] for q in questions], ["Pick one", "Why A?", "Şehir?"])
+        self.assertFalse(questions[1]["displayed"])
+        page.answer({0: "A"})
+        self.assertTrue(page.questions()[1]["displayed"])
+
+    def test_survey_page_still_loads_legacy_code(self):
+        """Codes made before the v2 format still open."""
+        page = self.open_survey(surveycode.encode_legacy(self.QUESTIONS))
+        self.assertEqual(len(page.questions()), 3)
+
+    def test_chained_conditions_follow_their_trigger(self):
+        """Q3 depends on Q2 which depends on Q1: un-answering Q1 hides both."""
+        questions = [
+            {"text": "Q1", "type": "dropdown", "options": ["", "yes"], "condition": None},
+            {"text": "Q2", "type": "multiple-choice", "options": ["go"],
+             "condition": {"qIdx": "0", "value": "yes"}},
+            {"text": "Q3", "type": "text", "options": [], "condition": {"qIdx": "1", "value": "go"}},
+        ]
+        page = self.open_survey(surveycode.encode(questions))
+        shown = lambda: [q["displayed"] for q in page.questions()]
+        self.assertEqual(shown(), [True, False, False])
+        page.answer({0: "yes"})
+        self.assertEqual(shown(), [True, True, False])
+        page.answer({1: "go"})
+        self.assertEqual(shown(), [True, True, True])
+        page.answer({0: ""})
+        self.assertEqual(shown(), [True, False, False])
+
+    def test_circular_conditions_are_rejected_on_load(self):
+        """A survey whose conditions form a loop shows an error instead of the form."""
+        questions = [
+            {"text": "Q1", "type": "dropdown", "options": ["a"], "condition": {"qIdx": "1", "value": "b"}},
+            {"text": "Q2", "type": "dropdown", "options": ["b"], "condition": {"qIdx": "0", "value": "a"}},
+        ]
+        self.driver.get(server.url_for(f"survey.html?code={surveycode.encode(questions)}"))
+        err = SurveyRunnerPage(self.driver).wait_for("error")
+        self.assertIn("Circular condition", err.text)
+
+
 class BuilderFeatureTests(unittest.TestCase):
-    base_url = "http://localhost:3000/survey-builder.html"
 
     def setUp(self):
         self.driver = driver
         self.wait = wait
-        self.driver.get(self.base_url)
-        self.wait.until(EC.element_to_be_clickable((By.ID, "newQuestionBtn")))
+        self.base_url = server.url_for("survey-builder.html")
+        open_page("survey-builder.html")
 
     def test_options_group_appears_for_multiple_choice_and_disappears_for_text(self):
         # Select MCQ → options textarea appears
@@ -286,5 +452,115 @@ class BuilderFeatureTests(unittest.TestCase):
         # Switch to text → options hidden
         Select(self.driver.find_element(By.ID, "qType")).select_by_value("text")
         self.assertFalse(self.driver.find_element(By.ID, "optionsGroup").is_displayed())
+
+    def test_editing_a_question_replaces_only_its_nodes(self):
+        """Saving an edit swaps that question's list item and preview; the others stay as they were."""
+        builder = BuilderPage(self.driver)
+        for text in ("One", "Two", "Three"):
+            builder.add_question(text, "text")
+        self.driver.execute_script("""
+            document.querySelectorAll('.q-item, #previewForm > div, #condQuestion option')
+                    .forEach(el => el._kept = true);
+        """)
+        BuilderPage(self.driver).els("items")[1].click()
+        builder.run(("qText", "Two (edited)"), ("saveQuestionBtn", CLICK))
+
+        kept = self.driver.execute_script("""
+            const kept = sel => Array.from(document.querySelectorAll(sel)).map(el => !!el._kept);
+            return [kept('.q-item'), kept('#previewForm > div'), kept('#condQuestion option[value]:not([value=""])')];
+        """)
+        self.assertEqual(kept, [[True, False, True]] * 3)
+        self.assertEqual(builder.question_items()[1], "2. Two (edited) (text)")
+
+
+class IngestPageTests(unittest.TestCase):
+    """survey.html posting to ingest.py (the service on its own is tested in test_ingest.py)."""
+
+    QUESTIONS = QUESTIONS
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "responses.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_survey_page_posts_answers_to_the_service(self):
+        """Submitting survey.html stores the visible answers through the ingest service."""
+        code = surveycode.encode(self.QUESTIONS)
+        loop = asyncio.new_event_loop()
+        service = loop.run_until_complete(ingest.IngestService(self.db, port=0).start())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            driver.get(server.url_for(f"survey.html?code={code}"))
+            runner = SurveyRunnerPage(driver)
+            runner.wait_for("questions")
+            driver.execute_script("ingestUrl = arguments[0];"
+                                  " window.alert = msg => window._lastAlert = msg;",
+                                  f"{service.url}/responses")
+            runner.answer({0: "A", 1: "because"})
+            runner.el("submit").click()
+            self.assertEqual(wait.until(lambda d: d.execute_script("return window._lastAlert;")),
+                             "Thank you for submitting!")
+        finally:
+            asyncio.run_coroutine_threadsafe(service.stop(), loop).result(10)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+        with sqlite3.connect(self.db) as db:
+            stored = json.loads(db.execute("SELECT answers FROM responses").fetchone()[0])
+        self.assertEqual(stored, {"q0": "A", "q1": "because", "q2": "Ankara"})
+
+    def test_survey_page_without_the_service_still_thanks(self):
+        """With nothing listening at ingestUrl the answers are only logged, as before the service."""
+        driver.get(server.url_for(f"survey.html?code={surveycode.encode(self.QUESTIONS)}"))
+        runner = SurveyRunnerPage(driver)
+        runner.wait_for("questions")
+        driver.execute_script("ingestUrl = arguments[0];"
+                              " window.alert = msg => window._lastAlert = msg;",
+                              f"http://127.0.0.1:{config.free_port()}/responses")
+        runner.answer({0: "B"})
+        runner.el("submit").click()
+        self.assertEqual(wait.until(lambda d: d.execute_script("return window._lastAlert;")),
+                         "Thank you for submitting!")
+
+
+@unittest.skipUnless(os.environ.get("CS458_BENCH"), "set CS458_BENCH=1 to run benchmarks")
+class BuilderSaveBenchmark(unittest.TestCase):
+    """Save latency in the builder as the survey grows (CS458_BENCH=1 python test.py BuilderSaveBenchmark)."""
+
+    SIZES = (10, 100, 1000, 3000)
+
+    def setUp(self):
+        self.driver = driver
+        open_page("survey-builder.html")
+
+    def test_save_latency_stays_flat(self):
+        from bench_surveycode import make_survey
+
+        results = {}
+        for n in self.SIZES:
+            # seed n questions, then time saving one more (median of a few saves)
+            self.driver.execute_script(
+                "questions = arguments[0]; renderQuestionList(); renderPreview();",
+                make_survey(n))
+            results[n] = self.driver.execute_script("""
+                const runs = [];
+                for (let k = 0; k < 7; k++) {
+                  qText.value = 'Benchmark ' + k; qType.value = 'multiple-choice';
+                  qOptions.value = 'yes\\nno'; saveQuestionBtn.disabled = false;
+                  const t = performance.now();
+                  saveQuestionBtn.click();
+                  runs.push(performance.now() - t);
+                }
+                runs.sort((a, b) => a - b);
+                return runs[3];
+            """)
+        for n, ms in results.items():
+            print(f"[BENCH] save with {n:>5} questions: {ms:7.2f} ms")
+        # rebuilding everything would make the largest survey ~300x slower than the smallest
+        self.assertLess(results[self.SIZES[-1]], max(10 * results[self.SIZES[0]], 5.0))
+
+
 if __name__ == "__main__":
-    unittest.main()
+    schedule.main()
@@ -0,0 +1,73 @@
+"""Tests for analytics.py (needs numpy; skipped without it)."""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+from testkit import schedule
+import ingest
+try:
+    import analytics
+except ImportError:
+    analytics = None
+
+
+@unittest.skipIf(analytics is None, "analytics.py needs numpy (pip install numpy)")
+class AnalyticsTests(unittest.TestCase):
+    QUESTIONS = [
+        {"text": "Pick", "type": "multiple-choice", "options": ["A", "B"], "condition": None},
+        {"text": "Rate", "type": "rating", "options": [], "condition": None},
+        {"text": "Tools", "type": "checkboxes", "options": ["x", "y", "z"], "condition": None},
+        {"text": "Why?", "type": "text", "options": [], "condition": None},
+    ]
+    ANSWERS = [
+        {"q0": "A", "q1": "5", "q2": ["x", "y"], "q3": "good"},
+        {"q0": "B", "q1": "3", "q2": ["y"], "q3": ""},
+        {"q0": None, "q1": "4", "q2": [], "q3": "ok"},
+        {"q0": "A", "q1": None, "q2": ["x", "y", "z"], "q3": None},
+    ]
+
+    def test_summary_matches_hand_counts(self):
+        """Distributions, rating mean/histogram and checkbox co-occurrence."""
+        agg = analytics.SurveyAggregator(self.QUESTIONS)
+        agg.add_batch(self.ANSWERS)
+        pick, rate, tools, why = agg.summary()["questions"]
+        self.assertEqual(pick["distribution"], {"A": 2, "B": 1})
+        self.assertEqual(rate["histogram"], [0, 0, 1, 1, 1])
+        self.assertAlmostEqual(rate["mean"], 4.0)
+        self.assertEqual(tools["distribution"], {"x": 2, "y": 3, "z": 1})
+        self.assertEqual(tools["co_occurrence"], [[2, 2, 1], [2, 3, 1], [1, 1, 1]])
+        self.assertEqual((tools["answered"], why["answered"], why["mean_length"]), (3, 2, 3.0))
+
+    def test_batches_add_up_to_one_pass(self):
+        """Feeding the answers in batches gives the same totals as one batch."""
+        whole = analytics.SurveyAggregator(self.QUESTIONS)
+        whole.add_batch(self.ANSWERS * 3)
+        parts = analytics.SurveyAggregator(self.QUESTIONS)
+        for answer in self.ANSWERS * 3:
+            parts.add_batch([answer])
+        self.assertEqual(parts.summary(), whole.summary())
+
+    def test_update_from_db_reads_only_new_rows(self):
+        """Rows written by ingest.py are picked up once each."""
+        with tempfile.TemporaryDirectory() as tmp, \
+                sqlite3.connect(os.path.join(tmp, "responses.sqlite")) as db:
+            db.executescript(ingest.SCHEMA)
+            insert = "INSERT INTO responses (survey, received, answers) VALUES ('s', 0, ?)"
+            db.executemany(insert, [(json.dumps(a),) for a in self.ANSWERS[:2]])
+            agg = analytics.SurveyAggregator(self.QUESTIONS)
+            self.assertEqual(agg.update_from_db(db, "s"), 2)
+            db.executemany(insert, [(json.dumps(a),) for a in self.ANSWERS[2:]])
+            self.assertEqual(agg.update_from_db(db, "s"), 2)
+            self.assertEqual(agg.update_from_db(db, "s"), 0)
+            self.assertEqual(agg.summary()["responses"], 4)
+
+
+if __name__ == "__main__":
+    schedule.main()
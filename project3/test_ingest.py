@@ -0,0 +1,98 @@
+"""Tests for ingest.py that need no browser (survey.html posting to it is tested in test.py)."""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+from testkit import schedule
+from testkit.asynchttp import Connection
+import ingest
+import surveycode
+from test_surveycode import QUESTIONS
+
+
+class IngestServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "responses.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_validation_follows_the_survey_definition(self):
+        """Options, keys and conditions are checked against the decoded survey."""
+        ok = {"q0": "A", "q1": "because", "q2": "Ankara"}
+        ingest.validate(QUESTIONS, ok)
+        ingest.validate(QUESTIONS, {"q0": "B", "q1": None, "q2": ""})
+        for bad in ({"q0": "C", "q1": None, "q2": ""},          # not an option
+                    {"q0": "B", "q1": "hidden", "q2": ""},      # condition not met
+                    {"q0": "A", "q1": "x"}):                    # missing key
+            with self.assertRaises(ingest.InvalidResponse):
+                ingest.validate(QUESTIONS, bad)
+
+    def test_responses_are_batched_into_sqlite(self):
+        """Valid posts get 202 and end up in the database; invalid ones get 422."""
+        code = surveycode.encode(QUESTIONS)
+
+        async def scenario():
+            service = await ingest.IngestService(self.db, port=0).start()
+            conn = Connection("127.0.0.1", service.port)
+            statuses = []
+            for answers in ({"q0": "A", "q1": "x", "q2": "Ankara"}, {"q0": "B", "q1": None, "q2": ""},
+                            {"q0": "nope", "q1": None, "q2": ""}):
+                resp = await conn.post_json("/responses", {"code": code, "answers": answers})
+                statuses.append(resp.status)
+            await conn.close()
+            await service.stop()
+            return statuses
+
+        self.assertEqual(asyncio.run(scenario()), [202, 202, 422])
+        with sqlite3.connect(self.db) as db:
+            self.assertEqual(db.execute("SELECT COUNT(*) FROM responses").fetchone()[0], 2)
+            self.assertEqual(db.execute("SELECT COUNT(*) FROM surveys").fetchone()[0], 1)
+
+    def test_malformed_content_length_answers_400(self):
+        """A Content-Length that is not a number gets a 400, not a silently closed socket."""
+        async def scenario():
+            service = await ingest.IngestService(self.db, port=0).start()
+            conn = Connection("127.0.0.1", service.port)
+            # sent after the client's own Content-Length, so the service sees this one
+            resp = await conn.request("POST", "/responses", b"{}", {"Content-Length": "12abc"})
+            await conn.close()
+            await service.stop()
+            return resp.status, resp.json()
+
+        self.assertEqual(asyncio.run(scenario()), (400, {"error": "bad Content-Length"}))
+
+    def test_non_ascii_digit_content_length_answers_400(self):
+        """A superscript digit passes str.isdigit() but is no length either."""
+        async def scenario():
+            service = await ingest.IngestService(self.db, port=0).start()
+            reader, writer = await asyncio.open_connection("127.0.0.1", service.port)
+            writer.write("POST /responses HTTP/1.1\r\nContent-Length: \u00b2\r\n\r\n".encode("latin-1"))
+            status = await reader.readline()
+            writer.close()
+            await service.stop()
+            return status
+
+        self.assertIn(b" 400 ", asyncio.run(scenario()))
+
+    def test_full_queue_answers_503(self):
+        """With the queue full the service pushes back instead of buffering."""
+        async def scenario():
+            service = ingest.IngestService(self.db, queue_size=1)  # writer not started
+            payload = {"code": surveycode.encode(QUESTIONS),
+                       "answers": {"q0": "B", "q1": None, "q2": ""}}
+            return [service.submit(payload)[0] for _ in range(2)]
+
+        self.assertEqual(asyncio.run(scenario()), [202, 503])
+
+
+if __name__ == "__main__":
+    schedule.main()
@@ -0,0 +1,36 @@
+"""Tests for loadgen.py; it starts its own servers in subprocesses, no browser."""
+
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+from testkit import impact, schedule
+import loadgen
+
+
+class LoadGeneratorTests(unittest.TestCase):
+    def test_small_run_completes_every_session(self):
+        """A short run against the real static server and ingest service has no errors."""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = loadgen.main(["-n", "30", "-c", "5", "--bad-logins", "0.2"])
+        self.assertEqual(status, 0, out.getvalue())
+        self.assertIn("error rate      0.00%", out.getvalue())
+
+    def test_pages_served_by_the_subprocesses_are_impact_inputs(self):
+        """--changed-only re-runs load tests when a page they fetch or ingest.py changes."""
+        recorder = impact.Recorder()
+        recorder.start()
+        loadgen.record_inputs(recorder)
+        inputs = recorder.stop()
+        for rel in ("index.html", "survey.html", "surveycode.js", "conditions.js", "ingest.py"):
+            self.assertIn(os.path.join("project3", rel), inputs)
+
+
+if __name__ == "__main__":
+    schedule.main()
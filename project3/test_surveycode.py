@@ -0,0 +1,34 @@
+"""Tests for surveycode.py that need no browser (survey.html's decoder is tested in test.py)."""
+
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+from testkit import schedule
+import surveycode
+
+# A conditional question and non-ASCII text; shared with the browser and ingest tests
+QUESTIONS = [
+    {"text": "Pick one", "type": "multiple-choice", "options": ["A", "B"], "condition": None},
+    {"text": "Why A?", "type": "text", "options": [], "condition": {"qIdx": "0", "value": "A"}},
+    {"text": "Şehir?", "type": "dropdown", "options": ["Ankara", "İzmir"], "condition": None},
+]
+
+
+class SurveyCodecTests(unittest.TestCase):
+    def test_python_codec_round_trips_v2_and_legacy(self):
+        """surveycode.py reads back what it writes, and v2 is shorter than the legacy code."""
+        v2 = surveycode.encode(QUESTIONS)
+        legacy = surveycode.encode_legacy(QUESTIONS)
+        self.assertEqual(surveycode.decode(v2), QUESTIONS)
+        self.assertEqual(surveycode.decode(legacy), QUESTIONS)
+        self.assertLess(len(v2), len(legacy))
+        with self.assertRaises(surveycode.SurveyCodeError):
+            surveycode.decode("v2.not-deflate")
+
+
+if __name__ == "__main__":
+    schedule.main()
@@ -0,0 +1 @@
+"""Shared helpers for the project1, project2 and project3 test suites."""
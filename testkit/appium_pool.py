@@ -0,0 +1,127 @@
+"""Keep one Appium session alive across the TestSurveyApp tests.
+
+Creating a session installs the APK and cold-starts the app, which is the
+slowest step of the mobile suite. `SessionPool` creates the session once,
+hands the same driver to every test and runs a caller-supplied reset hook
+in between to put the app back into a known state. The APK is only
+reinstalled when its content hash differs from the one recorded by the
+last successful install on the same device (the `udid` capability; without
+one Appium may pick any device, so every session installs).
+"""
+
+import hashlib
+import json
+import os
+
+from testkit import config
+
+
+def apk_digest(path):
+    """SHA-256 of the APK contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def remote_session(server_url, capabilities):
+    """Default session factory: a real Appium driver."""
+    from appium import webdriver
+    from appium.options.common import AppiumOptions
+
+    options = AppiumOptions()
+    for name, value in capabilities.items():
+        options.set_capability(name, value)
+    return webdriver.Remote(server_url, options=options)
+
+
+class SessionPool:
+    """Lazily creates one session and reuses it until it breaks."""
+
+    def __init__(self, server_url, capabilities, apk_path, reset=None,
+                 create=remote_session, state_file=None):
+        self.server_url = server_url
+        self.capabilities = dict(capabilities)
+        self.apk_path = apk_path
+        self.reset = reset
+        self.create = create
+        self.state_file = state_file or os.path.join(config.cache_dir(), "installed_apk.json")
+        self.driver = None
+        self.sessions_created = 0
+        self.installs = 0
+
+    @property
+    def udid(self):
+        return self.capabilities.get("udid") or self.capabilities.get("appium:udid")
+
+    def _load_state(self):
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _installed_digest(self):
+        if not self.udid:
+            return None
+        installed = self._load_state().get(self.udid)
+        return installed.get(self.apk_path) if isinstance(installed, dict) else None
+
+    def _remember_digest(self, digest):
+        if not self.udid:
+            return
+        state = self._load_state()
+        installed = state.get(self.udid)
+        if not isinstance(installed, dict):
+            installed = state[self.udid] = {}
+        installed[self.apk_path] = digest
+        with open(self.state_file, "w") as f:
+            json.dump(state, f, indent=2)
+
+    def session_capabilities(self):
+        """Capabilities for a new session and whether they force an install."""
+        caps = dict(self.capabilities)
+        caps["app"] = self.apk_path
+        digest = apk_digest(self.apk_path)
+        changed = digest != self._installed_digest()
+        if changed:
+            caps["enforceAppInstall"] = True
+            caps["noReset"] = False
+        else:
+            # Same build as last time: keep the installed app and its data
+            caps["enforceAppInstall"] = False
+            caps["noReset"] = True
+        return caps, changed, digest
+
+    def acquire(self):
+        """Return a live driver in the known state, creating a session if needed."""
+        if self.driver is not None:
+            try:
+                if self.reset:
+                    self.reset(self.driver)
+                return self.driver
+            except Exception as e:
+                print(f"[POOL] in-app reset failed ({e!r}); starting a new session")
+                self.discard()
+
+        caps, changed, digest = self.session_capabilities()
+        self.driver = self.create(self.server_url, caps)
+        self.sessions_created += 1
+        if changed:
+            self.installs += 1
+            self._remember_digest(digest)
+        return self.driver
+
+    def discard(self):
+        """Drop the current session (e.g. after it crashed)."""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+
+    def close(self):
+        self.discard()
@@ -0,0 +1,135 @@
+"""Small asyncio HTTP/1.1 client for load tests against the local services.
+
+Only what the load tools need: keep-alive connections, Content-Length
+bodies and JSON. One `Connection` is one socket; `ConnectionPool` hands
+them out to many concurrent tasks so a burst of thousands of simulated
+respondents does not open thousands of sockets.
+"""
+
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+
+class HTTPError(Exception):
+    """The server closed the connection or sent something we cannot parse."""
+
+
+class Response:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+    def text(self):
+        return self.body.decode("utf-8", "replace")
+
+
+class Connection:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self.writer = None
+
+    async def request(self, method, path, body=b"", headers=None):
+        if self.writer is None:
+            await self.open()
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            await self.close()
+            raise HTTPError("connection closed by server")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise HTTPError(f"bad status line {status_line!r}") from None
+        resp_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            resp_headers[name.strip().lower()] = value.strip()
+        length = int(resp_headers.get("content-length", 0))
+        data = await self.reader.readexactly(length) if length else b""
+        if resp_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return Response(status, resp_headers, data)
+
+    async def get(self, path, headers=None):
+        return await self.request("GET", path, headers=headers)
+
+    async def post_json(self, path, payload, headers=None):
+        headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        return await self.request("POST", path, json.dumps(payload).encode(), headers)
+
+
+class ConnectionPool:
+    """Up to `size` keep-alive connections to one origin, shared by many tasks."""
+
+    def __init__(self, url, size=64):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.size = size
+        self._idle = asyncio.LifoQueue()
+        self._slots = asyncio.Semaphore(size)
+        self._all = []
+
+    async def request(self, method, path, body=b"", headers=None):
+        async with self._slots:
+            conn = self._idle.get_nowait() if not self._idle.empty() else None
+            if conn is None:
+                conn = Connection(self.host, self.port)
+                self._all.append(conn)
+            try:
+                resp = await conn.request(method, path, body, headers)
+            except (ConnectionError, OSError, asyncio.IncompleteReadError, HTTPError):
+                await conn.close()
+                raise
+            self._idle.put_nowait(conn)
+            return resp
+
+    async def get(self, path, headers=None):
+        return await self.request("GET", path, headers=headers)
+
+    async def post_json(self, path, payload, headers=None):
+        headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        return await self.request("POST", path, json.dumps(payload).encode(), headers)
+
+    async def close(self):
+        for conn in self._all:
+            await conn.close()
+        self._all.clear()
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list (p in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
@@ -0,0 +1,427 @@
+"""Local stand-in for a login backend: salted password hashes behind an index.
+
+    python -m testkit.auth_service                         # 20000 users on :8766
+    python -m testkit.auth_service --users 100000 --port 9000
+    python -m testkit.auth_service --fixture users.json -n 500
+    python -m testkit.auth_service --bench -n 20000 -c 64  # latency and logins/s
+
+The login forms of project1/index.html and project3/index.html post
+`{emailOrPhone, password}` to `authUrl` when the page is opened with
+`?authUrl=http://localhost:8766/login` (DEFAULT_PORT), and fall back to the
+`mockUsers` / `mockUserData` arrays in the page when it is not set or
+nothing answers there. This service answers instead of a real backend:
+
+* every account is kept as a PBKDF2-SHA256 hash with its own salt and
+  iteration count, in a dict keyed by the identifier the page sends, so a
+  login is one lookup and one hash whatever the number of users;
+* unknown identifiers are checked against a dummy hash, so they cost the
+  same as a wrong password;
+* it is seeded with the accounts hard-coded in both pages (SEED_USERS) plus
+  `--users` synthetic ones from a fixed seed.
+
+Synthetic users come from `fixture(n)`: email and phone identifiers with
+random passwords, hashed once and kept in .cs458-cache, so a large user
+base is generated only the first time. `--fixture PATH` writes one for tests
+that want known credentials (the plain passwords are in it; they are made up).
+
+`--bench` starts the service in a subprocess and sends logins from many
+concurrent clients (some with wrong passwords), then prints logins/s and
+p50/p95/p99 latency, plus the cost of the lookup alone for the index and
+for the linear scan the pages do.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import string
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from testkit import config
+from testkit.server import content_length
+
+DEFAULT_PORT = 8766
+DEFAULT_USERS = 20_000
+# Cost of one hash. Far below what a production backend would use (raise it
+# with --iterations to model one); records keep their own count either way.
+ITERATIONS = 1000
+FIXTURE_VERSION = 1
+MAX_BODY = 4096
+
+# Accounts the pages check without a backend (project1 mockUsers, project3 mockUserData)
+SEED_USERS = {
+    "john@example.com": "12345",
+    "test@@example.comñ": "12345",
+    "testuser@example.com": "Test1234",
+    "5551234567": "phonePass",
+}
+
+
+# ------------------------------------------------------------------ hashing
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def hash_password(password, iterations=ITERATIONS, salt=None):
+    """'pbkdf2_sha256$<iterations>$<salt>$<hash>' for a password."""
+    salt = salt if salt is not None else os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def verify(record, password):
+    """True when `password` matches a hash_password() record (constant-time compare)."""
+    _, iterations, salt, digest = record.split("$")
+    attempt = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"),
+                                  base64.b64decode(salt), int(iterations))
+    return hmac.compare_digest(attempt, base64.b64decode(digest))
+
+
+# ------------------------------------------------------------------- users
+
+def synthetic_users(n, seed=458):
+    """[(identifier, password)] of n made-up users; every fourth one logs in by phone."""
+    rnd = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits
+    users = []
+    for i in range(n):
+        identifier = f"556{i:07d}" if i % 4 == 3 else f"user{i:06d}@example.org"
+        users.append((identifier, "".join(rnd.choice(alphabet) for _ in range(12))))
+    return users
+
+
+def fixture_path(n, seed=458, iterations=ITERATIONS):
+    return os.path.join(config.cache_dir(), f"auth-users-{n}-{seed}-{iterations}.json")
+
+
+def make_fixture(n, seed=458, iterations=ITERATIONS):
+    """{"version", "users": [{"emailOrPhone", "password", "hash"}]}, hashed on a thread pool."""
+    users = synthetic_users(n, seed)
+    rnd = random.Random(seed)
+    salts = [rnd.randbytes(16) for _ in users]
+    # pbkdf2_hmac releases the GIL, so this scales with the cores
+    with ThreadPoolExecutor(os.cpu_count() or 1) as pool:
+        hashes = list(pool.map(lambda u, s: hash_password(u[1], iterations, s), users, salts))
+    return {"version": FIXTURE_VERSION, "users": [
+        {"emailOrPhone": identifier, "password": password, "hash": record}
+        for (identifier, password), record in zip(users, hashes)]}
+
+
+def fixture(n, seed=458, iterations=ITERATIONS, path=None):
+    """make_fixture(), generated once and then read back from .cs458-cache (or `path`)."""
+    path = path or fixture_path(n, seed, iterations)
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == FIXTURE_VERSION and len(data["users"]) == n:
+            return data
+    except (OSError, ValueError, KeyError):
+        pass
+    data = make_fixture(n, seed, iterations)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+    return data
+
+
+class CredentialStore:
+    """Password hashes indexed by the identifier the login form sends."""
+
+    def __init__(self, iterations=ITERATIONS):
+        self.iterations = iterations
+        self.records = {}
+        self._dummy = hash_password("", iterations)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, identifier):
+        return identifier.strip() in self.records
+
+    def add(self, identifier, password):
+        self.records[identifier.strip()] = hash_password(password, self.iterations)
+
+    def add_hashed(self, identifier, record):
+        self.records[identifier.strip()] = record
+
+    def load(self, data):
+        """Add every user of a fixture() document."""
+        for user in data["users"]:
+            self.add_hashed(user["emailOrPhone"], user["hash"])
+        return self
+
+    def check(self, identifier, password):
+        """True for a known identifier with its password; a miss costs as much as a hit."""
+        record = self.records.get(identifier.strip())
+        ok = verify(record or self._dummy, password)
+        return ok and record is not None
+
+    @classmethod
+    def seeded(cls, users=0, seed=458, iterations=ITERATIONS):
+        """The page accounts plus `users` synthetic ones."""
+        store = cls(iterations)
+        for identifier, password in SEED_USERS.items():
+            store.add(identifier, password)
+        if users:
+            store.load(fixture(users, seed, iterations))
+        return store
+
+
+# ------------------------------------------------------------------ service
+
+class _AuthHTTPServer(ThreadingHTTPServer):
+    # the default backlog of 5 drops SYNs when a burst of clients connects at once
+    request_queue_size = 1024
+
+
+class AuthService:
+    """POST /login and GET /health over a CredentialStore, on a local port."""
+
+    def __init__(self, store, host="127.0.0.1", port=0):
+        self.store = store
+        self.latency = 0.0
+        self.stats = {"logins": 0, "rejected": 0}
+        self._lock = threading.Lock()
+        self._httpd = _AuthHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self.url = f"http://{host}:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        kwargs={"poll_interval": 0.05}, name="auth-service", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def configure(self, latency=0.0):
+        """Delay every login by `latency` seconds (a slow backend)."""
+        self.latency = latency
+        return self
+
+    def login(self, body):
+        """(status, payload) for one login request body."""
+        identifier, password = body.get("emailOrPhone"), body.get("password")
+        if not isinstance(identifier, str) or not isinstance(password, str):
+            return 400, {"error": "emailOrPhone and password are required"}
+        if self.latency:
+            time.sleep(self.latency)
+        ok = self.store.check(identifier, password)
+        with self._lock:
+            self.stats["logins" if ok else "rejected"] += 1
+        return (200, {"ok": True}) if ok else (401, {"ok": False, "error": "invalid credentials"})
+
+    def _handler(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, for the benchmark's connection pool
+            # headers and body are separate writes: without this every response after
+            # the first on a connection waits ~40 ms for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, value):
+                body = json.dumps(value).encode() if value is not None else b""
+                self.send_response(status)
+                # the pages are served from another origin (the static server)
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Access-Control-Allow-Methods", "POST, GET, OPTIONS")
+                self.send_header("Access-Control-Allow-Headers", "Content-Type")
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_OPTIONS(self):
+                self._json(204, None)
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/health":
+                    return self._json(404, {"error": "not found"})
+                self._json(200, dict(service.stats, users=len(service.store)))
+
+            def do_POST(self):
+                length = content_length(self.headers)
+                if length is None:
+                    self.close_connection = True
+                    return self._json(400, {"error": "bad Content-Length"})
+                if length > MAX_BODY:
+                    self.close_connection = True
+                    return self._json(413, {"error": "body too large"})
+                data = self.rfile.read(length)
+                if self.path.split("?", 1)[0] != "/login":
+                    return self._json(404, {"error": "not found"})
+                try:
+                    body = json.loads(data or b"{}")
+                except ValueError:
+                    return self._json(400, {"error": "body is not JSON"})
+                if not isinstance(body, dict):
+                    return self._json(400, {"error": "body must be a JSON object"})
+                self._json(*service.login(body))
+
+        return Handler
+
+
+# ---------------------------------------------------------------- benchmark
+
+def start_process(users, seed, iterations):
+    """The service in its own process on a free port: (process, url)."""
+    port = config.free_port()
+    proc = subprocess.Popen([sys.executable, "-m", "testkit.auth_service", "--port", str(port),
+                             "--users", str(users), "--seed", str(seed),
+                             "--iterations", str(iterations)],
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            stdout=subprocess.DEVNULL)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def drive(url, credentials, total, concurrency, timeout=120):
+    """Send `total` logins from `concurrency` clients: (elapsed, sorted latencies, statuses)."""
+    from testkit.asynchttp import ConnectionPool
+
+    pool = ConnectionPool(url, size=concurrency)
+    deadline = time.monotonic() + timeout
+    while True:  # seeding a large user base takes a moment the first time
+        try:
+            await pool.get("/health")
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+    latencies, statuses = [], {}
+    next_index = iter(range(total))
+
+    async def client():
+        for k in next_index:
+            identifier, password = credentials[k % len(credentials)]
+            started = time.perf_counter()
+            try:
+                status = (await pool.post_json("/login", {"emailOrPhone": identifier,
+                                                          "password": password})).status
+            except OSError:
+                status = "connection error"
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await pool.close()
+    return elapsed, sorted(latencies), statuses
+
+
+def lookup_cost(users, probes=200, seed=458):
+    """Mean seconds to find a user by identifier: (dict index, linear scan like the pages)."""
+    rnd = random.Random(seed)
+    rows = [{"emailOrPhone": i, "password": p} for i, p in users]
+    index = {row["emailOrPhone"]: row for row in rows}
+    wanted = [rnd.choice(users) for _ in range(probes)]
+
+    started = time.perf_counter()
+    for identifier, password in wanted:
+        row = index.get(identifier)
+        assert row is not None and row["password"] == password
+    indexed = (time.perf_counter() - started) / probes
+
+    started = time.perf_counter()
+    for identifier, password in wanted:
+        row = next(r for r in rows if r["emailOrPhone"] == identifier and r["password"] == password)
+    scanned = (time.perf_counter() - started) / probes
+    return indexed, scanned
+
+
+def bench(users, total, concurrency, bad=0.1, seed=458, iterations=ITERATIONS):
+    from testkit.asynchttp import percentile
+
+    started = time.perf_counter()
+    data = fixture(users, seed, iterations)
+    print(f"{users} synthetic users ready in {time.perf_counter() - started:.2f}s")
+    rnd = random.Random(seed)
+    credentials, wrong = [], set()
+    for k, user in enumerate(rnd.sample(data["users"], min(users, 5000))):
+        if rnd.random() < bad:
+            wrong.add(k)
+        credentials.append((user["emailOrPhone"], user["password"] + ("x" if k in wrong else "")))
+    expected_ok = sum(1 for k in range(total) if k % len(credentials) not in wrong)
+
+    proc, url = start_process(users, seed, iterations)
+    try:
+        elapsed, latencies, statuses = asyncio.run(drive(url, credentials, total, concurrency))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print(f"{total} logins from {concurrency} concurrent clients against {users + len(SEED_USERS)} users "
+          f"({iterations} PBKDF2 iterations) in {elapsed:.2f}s")
+    print(f"  throughput   {total / elapsed:10.0f} logins/s")
+    for p in (50, 95, 99):
+        print(f"  p{p:<2} latency {percentile(latencies, p) * 1000:10.2f} ms")
+    print(f"  max latency  {latencies[-1] * 1000:10.2f} ms")
+    print(f"  statuses     {dict(sorted(statuses.items(), key=str))}")
+    indexed, scanned = lookup_cost([(u["emailOrPhone"], u["password"]) for u in data["users"]])
+    print(f"  lookup only  {indexed * 1e6:10.2f} us indexed, {scanned * 1e6:.2f} us linear scan")
+    return 0 if statuses.get(200, 0) == expected_ok and statuses.get(401, 0) == total - expected_ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local login backend with hashed, indexed credentials.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS, help="synthetic users besides the page accounts")
+    parser.add_argument("--seed", type=int, default=458)
+    parser.add_argument("--iterations", type=int, default=ITERATIONS, help="PBKDF2 iterations per hash")
+    parser.add_argument("--fixture", metavar="PATH", help="write -n synthetic users with their passwords and exit")
+    parser.add_argument("--bench", action="store_true", help="measure login latency and throughput")
+    parser.add_argument("-n", type=int, default=20_000, help="logins sent by --bench, users written by --fixture")
+    parser.add_argument("-c", "--concurrency", type=int, default=64)
+    parser.add_argument("--bad", type=float, default=0.1, help="share of --bench logins with a wrong password")
+    args = parser.parse_args(argv)
+
+    if args.fixture:
+        fixture(args.n, args.seed, args.iterations, path=args.fixture)
+        print(f"{args.n} users written to {args.fixture}")
+        return 0
+    if args.bench:
+        return bench(args.users, args.n, args.concurrency, args.bad, args.seed, args.iterations)
+
+    store = CredentialStore.seeded(args.users, args.seed, args.iterations)
+    service = AuthService(store, args.host, args.port).start()
+    print(f"Checking logins for {len(store)} users on {service.url}/login"
+          f" (open the login pages with ?authUrl={service.url}/login)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
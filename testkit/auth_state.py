@@ -0,0 +1,142 @@
+"""Start tests logged in: one real login per session, replayed afterwards.
+
+Most survey tests only need to be past the login screen. A fixture logs in
+through the UI the first time it is asked and keeps what that login left
+behind; later tests start from that state directly:
+
+* `WebLogin`: the style changes the login made to the page (login form
+  hidden, `surveyContainer` shown) plus cookies and web storage, re-applied
+  to the freshly reset page in one script call;
+* `AppLogin`: the Flutter page the login lands on, reopened fresh through
+  a test hook in the app's entrypoint (the `flutter:requestData` handler,
+  "session:home", see project2/lib/main.dart). The hook does not replay
+  anything itself, so the page it opens is compared with the widget tree
+  the real login landed on.
+
+Both check that the replayed state matches the real login's (a `ready`
+condition, or every widget key of the landing page) and fall back to the
+real login when it does not. Tests about logging in are marked
+`@real_login` and always go through the UI.
+"""
+
+from testkit import waits
+from testkit.flutter_snapshot import snapshot
+
+_STATE_JS = """
+const styles = {};
+document.querySelectorAll('[id]').forEach(el => { styles[el.id] = el.getAttribute('style'); });
+const dump = store => Object.fromEntries(Object.keys(store).map(k => [k, store.getItem(k)]));
+return {styles, local: dump(localStorage), session: dump(sessionStorage)};
+"""
+
+_APPLY_JS = """
+const state = arguments[0];
+for (const [id, style] of Object.entries(state.styles)) {
+  const el = document.getElementById(id);
+  if (!el) return false;
+  if (style === null) el.removeAttribute('style'); else el.setAttribute('style', style);
+}
+Object.entries(state.local).forEach(([k, v]) => localStorage.setItem(k, v));
+Object.entries(state.session).forEach(([k, v]) => sessionStorage.setItem(k, v));
+return true;
+"""
+
+
+def real_login(test):
+    """Mark a test that must log in through the UI itself."""
+    test.real_login = True
+    return test
+
+
+def wants_real_login(testcase):
+    return getattr(getattr(testcase, testcase._testMethodName), "real_login", False)
+
+
+class WebLogin:
+    """Logged-in page state, captured from one real login and re-applied."""
+
+    def __init__(self, login, ready):
+        self.login = login      # login(driver): the UI login
+        self.ready = ready      # condition that holds once logged in
+        self.state = None
+        self.cookies = []
+        self.real_logins = 0
+        self.restored = 0
+
+    def summary(self):
+        return f"[LOGIN] {self.real_logins} real logins, {self.restored} restored"
+
+    def _real(self, driver):
+        before = driver.execute_script(_STATE_JS)
+        self.login(driver)
+        waits.Waiter(driver, 5).until(self.ready, label="logged in")
+        after = driver.execute_script(_STATE_JS)
+        self.state = {
+            "styles": {k: v for k, v in after["styles"].items() if k not in before["styles"] or before["styles"][k] != v},
+            "local": after["local"], "session": after["session"],
+        }
+        self.cookies = driver.get_cookies()
+        self.real_logins += 1
+        return "login"
+
+    def enter(self, driver, real=False):
+        """Log the page in; "login" when done through the UI, "restored" when replayed."""
+        if real or self.state is None:
+            return self._real(driver)
+        for cookie in self.cookies:
+            driver.add_cookie(cookie)
+        if driver.execute_script(_APPLY_JS, self.state) and self.ready(driver):
+            self.restored += 1
+            return "restored"
+        return self._real(driver)  # the page changed under the captured state
+
+
+class AppLogin:
+    """Logged-in app state: the page the real login lands on, reopened fresh."""
+
+    def __init__(self, login, root, logged_in_key, page="home"):
+        self.login = login              # login(driver): the UI login
+        self.root = root                # finder for the snapshot root (MaterialApp)
+        self.key = logged_in_key        # ValueKey only the logged-in page has
+        self.page = page
+        self.landing = None             # key -> count on the page the real login landed on
+        self.mismatch = None            # (missing, unexpected) keys of the last rejected restore
+        self.real_logins = 0
+        self.restored = 0
+
+    @property
+    def captured(self):
+        return self.landing is not None
+
+    def _real(self, driver):
+        self.login(driver)
+        tree = snapshot(driver, self.root)
+        self.landing = dict(tree.keys) if self.key in tree else None
+        self.real_logins += 1
+        return "login"
+
+    def enter(self, driver, real=False):
+        if real or not self.captured:
+            return self._real(driver)
+        reply = request(driver, f"session:{self.page}")
+        if reply == self.page:
+            keys = snapshot(driver, self.root).keys
+            if keys == self.landing:
+                self.restored += 1
+                return "restored"
+            self.mismatch = (sorted(set(self.landing) - set(keys)), sorted(set(keys) - set(self.landing)))
+        if reply is not None:  # it landed somewhere else: start over from the login page
+            request(driver, "session:login")
+        return self._real(driver)
+
+    def summary(self):
+        return f"[LOGIN] {self.real_logins} real logins, {self.restored} restored"
+
+
+def request(driver, message):
+    """The app's answer to flutter:requestData, or None when it has no handler for it."""
+    try:
+        reply = driver.execute_script("flutter:requestData", message)
+    except Exception:
+        return None
+    return None if reply is None or str(reply).startswith("error") else reply
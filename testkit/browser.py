@@ -0,0 +1,457 @@
+"""Chrome for the Selenium suites: one set of options, cold or pre-warmed.
+
+    driver = browser.chrome()          # what setUpClass / setUpModule call
+
+By default this launches Chrome through chromedriver, as the suites always
+did. With CS458_BROWSER=daemon it attaches instead to a Chrome and a
+chromedriver that keep running between test runs:
+
+* the first run starts both as detached processes (profile directory and
+  ports kept in .cs458-cache), later runs find them through the state file;
+* every driver gets a fresh browser context (its own cookies, storage and
+  cache) in a new tab, and `quit()` throws that context away, so a test run
+  never sees what the previous one left behind;
+* both processes are health-checked before attaching and respawned when
+  one of them died or stopped answering.
+
+Each parallel worker gets its own daemon. To manage them by hand:
+
+    python -m testkit.browser start [--suite project1] | status | stop
+
+A driver shared by many tests goes through `RecyclingDriver`, which stands
+in for it and replaces the browser between two tests once it has grown too
+big (memory of chromedriver, Chrome and its renderers read from /proc, open
+windows and tabs, or tests run; see config.recycle_limits). Everything that
+holds the shared driver keeps working; each recycle is logged with its cause.
+The check between tests comes from testkit.schedule's result hooks, so it
+only happens under `schedule.main()` (what the suites' `python test.py`
+runs) and testkit.parallel; under plain unittest or pytest the browser is
+never replaced, and `quit()` logs that.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+import weakref
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+from selenium.webdriver.common.driver_finder import DriverFinder
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+
+from testkit import config, schedule
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent first starts are not serialised
+    fcntl = None
+
+# Flags every suite gets
+CHROME_ARGS = (
+    "--disable-gpu",
+    "--lang=en-US",
+)
+# Opt-in, per suite: these switch off browser protections. project1's Google popup
+# needs POPUP_ARGS; project3 passes NO_SANDBOX_ARGS only, so CORS stays enforced
+# and the services' CORS handling is exercised.
+POPUP_ARGS = (
+    "--disable-popup-blocking",
+    "--allow-file-access-from-files",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-web-security",
+)
+NO_SANDBOX_ARGS = ("--no-sandbox",)
+CHROME_NAMES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+
+def chrome_args(extra_args=()):
+    return (("--headless=new",) if config.headless() else ()) + CHROME_ARGS + tuple(extra_args)
+
+
+def chrome_options(extra_args=()):
+    options = webdriver.ChromeOptions()
+    for arg in chrome_args(extra_args):
+        options.add_argument(arg)
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    return options
+
+
+def chromedriver_path():
+    """chromedriver from PATH, else whatever Selenium Manager resolves."""
+    return shutil.which("chromedriver") or DriverFinder(Service(), chrome_options()).get_driver_path()
+
+
+def chrome_binary():
+    for name in (os.environ.get("CS458_CHROME"),) + CHROME_NAMES:
+        path = name and shutil.which(name)
+        if path:
+            return path
+    return DriverFinder(Service(), chrome_options()).get_browser_path()
+
+
+def chrome(extra_args=()):
+    """A WebDriver for the suites, with CHROME_ARGS plus `extra_args` (e.g. POPUP_ARGS).
+
+    `startup_ms` says how long getting it took.
+    """
+    started = time.perf_counter()
+    if config.browser_daemon():
+        driver = BrowserDaemon(chrome_args(extra_args)).attach()
+    else:
+        driver = webdriver.Chrome(service=Service(chromedriver_path()),
+                                  options=chrome_options(extra_args))
+    driver.startup_ms = (time.perf_counter() - started) * 1000
+    return driver
+
+
+# ----------------------------------------------------------------- recycling
+
+def browser_pid(driver):
+    """Root of the driver's browser process tree (chromedriver, or the daemon's Chrome)."""
+    pid = getattr(driver, "browser_pid", None)
+    if pid is None:
+        process = getattr(getattr(driver, "service", None), "process", None)
+        pid = getattr(process, "pid", None)
+    return pid
+
+
+def _children():
+    kids = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        kids.setdefault(ppid, []).append(int(entry))
+    return kids
+
+
+def tree_rss(pid):
+    """Resident bytes of a process and all its descendants; None without /proc."""
+    if not pid or not os.path.isdir("/proc"):
+        return None
+    kids, page = _children(), os.sysconf("SC_PAGE_SIZE")
+    total, stack = 0, [pid]
+    while stack:
+        pid = stack.pop()
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page
+        except (OSError, IndexError, ValueError):
+            continue
+        stack.extend(kids.get(pid, ()))
+    return total
+
+
+_LIVE = weakref.WeakSet()
+
+
+def _checkpoint(event, test):
+    """Give every live RecyclingDriver a checkpoint before each test starts."""
+    if event == "start":
+        for driver in list(_LIVE):
+            driver.checkpoint()
+
+
+def _watch_tests():
+    if _checkpoint not in schedule.listeners:
+        schedule.listeners.append(_checkpoint)
+
+
+class RecyclingDriver:
+    """Stands in for a shared WebDriver; swaps in a fresh browser when limits are crossed."""
+
+    _OWN = ("_factory", "_driver", "_setup", "limits", "tests", "generation", "recycles", "log")
+
+    def __init__(self, factory, limits=None, log=print):
+        for name, value in (("_factory", factory), ("_driver", None), ("_setup", []),
+                            ("limits", dict(config.recycle_limits(), **(limits or {}))),
+                            ("tests", 0), ("generation", 0), ("recycles", []), ("log", log)):
+            object.__setattr__(self, name, value)
+        self._start()
+        _LIVE.add(self)
+        _watch_tests()
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+    def __setattr__(self, name, value):
+        if name in self._OWN:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._driver, name, value)
+
+    def _start(self):
+        self._driver = self._factory()
+        self.generation += 1
+        self.tests = 0
+        for setup in self._setup:
+            setup(self)
+
+    def on_start(self, setup):
+        """Run `setup(driver)` now and again on every fresh browser (CDP hooks, timeouts)."""
+        self._setup.append(setup)
+        setup(self)
+        return self
+
+    def usage(self):
+        rss = tree_rss(browser_pid(self._driver))
+        try:
+            windows = len(self._driver.window_handles)
+        except WebDriverException:
+            windows = None  # the browser is gone: recycle
+        return {"rss_mb": None if rss is None else rss / (1 << 20), "windows": windows}
+
+    def over_limit(self, usage):
+        """Why the browser should be replaced, or None."""
+        limits = self.limits
+        if usage["windows"] is None:
+            return "browser stopped responding"
+        if limits["rss_mb"] and usage["rss_mb"] is not None and usage["rss_mb"] > limits["rss_mb"]:
+            return f"rss {usage['rss_mb']:.0f} MB > {limits['rss_mb']} MB"
+        if limits["windows"] and usage["windows"] > limits["windows"]:
+            return f"{usage['windows']} windows > {limits['windows']}"
+        if limits["tests"] and self.tests >= limits["tests"]:
+            return f"{self.tests} tests run"
+        return None
+
+    def checkpoint(self):
+        """Called between tests: recycle the browser if it crossed a limit."""
+        if self._driver is None:
+            return None
+        self.tests += 1
+        if self.tests == 1:
+            return None
+        cause = self.over_limit(self.usage())
+        if cause:
+            self.recycle(cause)
+        return cause
+
+    def recycle(self, cause):
+        started = time.perf_counter()
+        old, tests = self._driver, self.tests
+        try:
+            old.quit()
+        except Exception:
+            pass  # it may be the browser that died
+        daemon = getattr(old, "daemon", None)
+        if daemon is not None and cause.startswith(("rss", "browser")):
+            daemon.stop()  # a new context would not give the memory back
+        self._start()
+        self.tests = 1  # the test about to start
+        seconds = time.perf_counter() - started
+        self.recycles.append({"generation": self.generation, "after_tests": tests - 1,
+                              "cause": cause, "seconds": seconds})
+        self.log(f"[RECYCLE] browser #{self.generation} after {tests - 1} tests "
+                 f"({cause}), {seconds * 1000:.0f} ms")
+
+    def quit(self):
+        _LIVE.discard(self)
+        if self._driver is not None and self.generation == 1 and self.tests == 0:
+            self.log("[RECYCLE] no checkpoint ran: browser recycling needs the schedule runner "
+                     "(python test.py or testkit.parallel), not plain unittest or pytest")
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            driver.quit()
+
+
+# ------------------------------------------------------------------ attached
+
+class AttachedChrome(RemoteWebDriver):
+    """Session on a daemon's chromedriver, working in a browser context of its own."""
+
+    def __init__(self, driver_url, debugger_address):
+        options = webdriver.ChromeOptions()
+        options.debugger_address = debugger_address
+        connection = ChromiumRemoteConnection(driver_url, vendor_prefix="goog", browser_name="chrome")
+        super().__init__(command_executor=connection, options=options)
+        self.context_id = None
+
+    def execute_cdp_cmd(self, cmd, cmd_args=None):
+        return self.execute("executeCdpCommand", {"cmd": cmd, "params": cmd_args or {}})["value"]
+
+    def open_context(self):
+        self.context_id = self.execute_cdp_cmd(
+            "Target.createBrowserContext", {"disposeOnDetach": True})["browserContextId"]
+        target = self.execute_cdp_cmd(
+            "Target.createTarget", {"url": "about:blank", "browserContextId": self.context_id})
+        handle = next(h for h in self.window_handles if h.endswith(target["targetId"]))
+        self.switch_to.window(handle)
+        self._close_default_tabs()
+        return self
+
+    def _close_default_tabs(self):
+        """Close tabs outside any created context (the daemon's initial about:blank).
+
+        Otherwise window_handles starts with more than one entry, and tests that
+        wait for a popup by counting windows see one at once.
+        """
+        contexts = set(self.execute_cdp_cmd("Target.getBrowserContexts", {})["browserContextIds"])
+        for info in self.execute_cdp_cmd("Target.getTargets", {})["targetInfos"]:
+            if info["type"] == "page" and info.get("browserContextId") not in contexts:
+                try:
+                    self.execute_cdp_cmd("Target.closeTarget", {"targetId": info["targetId"]})
+                except WebDriverException:
+                    pass
+
+    def quit(self):
+        # The daemon's Chrome stays up; only this run's context and tabs go away
+        try:
+            if self.context_id:
+                self.execute_cdp_cmd("Target.disposeBrowserContext",
+                                     {"browserContextId": self.context_id})
+        except WebDriverException:
+            pass
+        finally:
+            super().quit()
+
+
+class BrowserDaemon:
+    """A detached Chrome + chromedriver pair, shared by runs with the same flags."""
+
+    def __init__(self, args, worker=None):
+        self.args = tuple(args)
+        key = hashlib.sha1(" ".join(self.args).encode()).hexdigest()[:8]
+        worker = config.worker_id() if worker is None else worker
+        name = f"browser-{key}.w{worker}"
+        self.state_path = os.path.join(config.cache_dir(), name + ".json")
+        self.profile_dir = os.path.join(config.cache_dir(), "chrome-profile-" + name)
+
+    def state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def healthy(state, timeout=1):
+        if not state:
+            return False
+        for url in (f"http://127.0.0.1:{state['chrome_port']}/json/version",
+                    f"http://127.0.0.1:{state['driver_port']}/status"):
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as resp:
+                    if resp.status != 200:
+                        return False
+            except OSError:
+                return False
+        return True
+
+    def ensure(self, timeout=30):
+        """State of a healthy daemon, starting (or restarting) it if needed."""
+        with open(self.state_path + ".lock", "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            state = self.state()
+            if self.healthy(state):
+                return state
+            self._kill(state)
+            return self._spawn(timeout)
+
+    def _spawn(self, timeout):
+        chrome_port, driver_port = config.free_port(), config.free_port()
+        detached = dict(stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                        stdin=subprocess.DEVNULL, start_new_session=True)
+        chrome_proc = subprocess.Popen(
+            [chrome_binary(), *self.args, f"--remote-debugging-port={chrome_port}",
+             f"--user-data-dir={self.profile_dir}", "--no-first-run",
+             "--no-default-browser-check", "about:blank"], **detached)
+        driver_proc = subprocess.Popen([chromedriver_path(), f"--port={driver_port}"], **detached)
+        state = {"chrome_pid": chrome_proc.pid, "chrome_port": chrome_port,
+                 "driver_pid": driver_proc.pid, "driver_port": driver_port,
+                 "args": list(self.args), "started": time.time()}
+        deadline = time.monotonic() + timeout
+        while not self.healthy(state, timeout=0.5):
+            if time.monotonic() > deadline or chrome_proc.poll() is not None \
+                    or driver_proc.poll() is not None:
+                self._kill(state)
+                raise RuntimeError(f"browser daemon did not come up (state {state})")
+            time.sleep(0.05)
+        with open(self.state_path, "w") as f:
+            json.dump(state, f)
+        return state
+
+    @staticmethod
+    def _kill(state):
+        for pid in (state or {}).get("chrome_pid"), (state or {}).get("driver_pid"):
+            if pid:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+    def stop(self):
+        with open(self.state_path + ".lock", "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._kill(self.state())
+            try:
+                os.remove(self.state_path)
+            except OSError:
+                pass
+
+    def attach(self):
+        state = self.ensure()
+        try:
+            driver = AttachedChrome(f"http://127.0.0.1:{state['driver_port']}",
+                                    f"127.0.0.1:{state['chrome_port']}")
+        except WebDriverException:
+            # Answered the health check but cannot take a session: start over once
+            self.stop()
+            state = self.ensure()
+            driver = AttachedChrome(f"http://127.0.0.1:{state['driver_port']}",
+                                    f"127.0.0.1:{state['chrome_port']}")
+        driver.daemon = self
+        driver.browser_pid = state["chrome_pid"]
+        return driver.open_context()
+
+
+def all_daemons():
+    for path in sorted(glob.glob(os.path.join(config.cache_dir(), "browser-*.w*.json"))):
+        with open(path) as f:
+            state = json.load(f)
+        daemon = BrowserDaemon(state["args"], int(path.rsplit(".w", 1)[1].split(".")[0]))
+        yield daemon, state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the pre-warmed Chrome daemons.")
+    parser.add_argument("command", choices=("start", "status", "stop"))
+    parser.add_argument("--suite", choices=("project1", "project3"), default="project3",
+                        help="start the daemon with this suite's flags")
+    args = parser.parse_args(argv)
+
+    if args.command == "start":
+        extra = POPUP_ARGS if args.suite == "project1" else NO_SANDBOX_ARGS
+        state = BrowserDaemon(chrome_args(extra)).ensure()
+        print(f"Chrome on port {state['chrome_port']}, chromedriver on port {state['driver_port']}")
+        return 0
+    for daemon, state in all_daemons():
+        if args.command == "stop":
+            daemon.stop()
+            print(f"stopped {os.path.basename(daemon.state_path)}")
+        else:
+            up = "up" if BrowserDaemon.healthy(state) else "not responding"
+            age = (time.time() - state["started"]) / 60
+            print(f"{os.path.basename(daemon.state_path)}: {up}, chrome pid {state['chrome_pid']} "
+                  f"port {state['chrome_port']}, started {age:.0f} min ago")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
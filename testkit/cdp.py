@@ -0,0 +1,347 @@
+"""Hot-path browser commands over a persistent DevTools websocket.
+
+    fast = cdp.fast_path(driver)
+    fast.evaluate("return document.title")
+    fast.click("#loadSurveyBtn")
+    message = fast.wait_for_dialog()["message"]
+
+Every WebDriver command is an HTTP request to chromedriver, which turns it
+into one or more DevTools calls. `fast_path()` opens a websocket straight
+to the page the driver is on (found through the debuggerAddress chromedriver
+reports) and sends script evaluation, selector queries and input events as
+single DevTools messages. A background reader takes the events as they
+come: console messages are kept in `console`, and JavaScript dialogs are
+recorded in `dialogs` and accepted at once, so a test no longer has to
+replace window.alert to see what an alert said.
+
+When there is no DevTools endpoint (another browser, a remote grid) or
+CS458_CDP=off, `fast_path()` returns a WebDriverPath with the same methods
+on plain WebDriver commands. Switching windows drops the websocket; the next
+`fast_path()` call connects to the new window.
+
+Selenium's bundled `selenium.webdriver.common.devtools` bindings need trio
+and are pinned to particular Chrome versions, so messages are written by hand
+here; the handful of methods used are stable across versions.
+
+    python -m testkit.cdp -n 300     # per-command latency, WebDriver vs DevTools
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import websocket
+from selenium.common.exceptions import JavascriptException, NoSuchElementException
+
+from testkit import waits
+
+# WebDriver commands after which the websocket may point at the wrong page
+_WINDOW_COMMANDS = frozenset({"switchToWindow", "newWindow", "close"})
+
+_CENTER_JS = """
+const el = document.querySelector(arguments[0]);
+if (!el) return null;
+el.scrollIntoView({block: 'center', inline: 'center'});
+const r = el.getBoundingClientRect();
+return [r.left + r.width / 2, r.top + r.height / 2];
+"""
+_FOCUS_JS = "const el = document.querySelector(arguments[0]); if (el) el.focus(); return !!el;"
+_COUNT_JS = "return document.querySelectorAll(arguments[0]).length;"
+_TEXTS_JS = "return Array.from(document.querySelectorAll(arguments[0]), el => el.textContent);"
+_CAPTURE_DIALOGS_JS = """
+window.__cs458Dialogs = window.__cs458Dialogs || [];
+const keep = (type, ret) => msg => { window.__cs458Dialogs.push({type, message: String(msg)}); return ret; };
+window.alert = keep('alert');
+window.confirm = keep('confirm', true);
+window.prompt = keep('prompt', '');
+"""
+
+
+def enabled():
+    return os.environ.get("CS458_CDP", "") not in ("off", "0")
+
+
+class CdpError(Exception):
+    """The browser answered a DevTools call with an error."""
+
+
+class _Path:
+    """Operations shared by both transports, built on evaluate()."""
+
+    def count(self, selector):
+        return self.evaluate(_COUNT_JS, selector)
+
+    def texts(self, selector):
+        return self.evaluate(_TEXTS_JS, selector)
+
+
+class WebDriverPath(_Path):
+    """The same operations as plain WebDriver commands."""
+
+    kind = "webdriver"
+    stale = False
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.console = []  # not available over WebDriver
+
+    def evaluate(self, script, *args):
+        return self.driver.execute_script(script, *args)
+
+    def click(self, selector):
+        self.driver.find_element("css selector", selector).click()
+
+    def type(self, selector, text):
+        self.driver.find_element("css selector", selector).send_keys(text)
+
+    def arm_dialogs(self):
+        """Record alert/confirm/prompt on the current page (DevTools sees them without this)."""
+        self.driver.execute_script(_CAPTURE_DIALOGS_JS)
+
+    def wait_for_dialog(self, timeout=5):
+        return waits.Waiter(self.driver, timeout).until(
+            lambda d: d.execute_script("return (window.__cs458Dialogs || []).shift() || null;"),
+            label="dialog")
+
+    def close(self):
+        pass
+
+
+class CdpPath(_Path):
+    """One page's DevTools websocket, with a reader thread for replies and events."""
+
+    kind = "cdp"
+
+    def __init__(self, ws_url, timeout=10):
+        # No Origin header: Chrome refuses websocket origins it was not told about
+        self.ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True,
+                                              enable_multithread=True)
+        self.ws.settimeout(None)
+        self.timeout = timeout
+        self.stale = False
+        self.dialogs = []         # {"type", "message"} of every dialog, accepted as it opened
+        self.console = []         # {"type", "text"} of every console call
+        self._dialogs_seen = 0
+        self._ids = itertools.count(1)
+        self._replies = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read, name="cdp-reader", daemon=True)
+        self._reader.start()
+        self.send("Runtime.enable")
+        self.send("Page.enable")
+
+    # --------------------------------------------------------------- protocol
+
+    def _read(self):
+        while True:
+            try:
+                message = json.loads(self.ws.recv())
+            except Exception:
+                break
+            if "id" in message:
+                with self._cond:
+                    self._replies[message["id"]] = message
+                    self._cond.notify_all()
+            else:
+                self._event(message.get("method"), message.get("params") or {})
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _event(self, method, params):
+        if method == "Page.javascriptDialogOpening":
+            with self._cond:
+                self.dialogs.append({"type": params.get("type"), "message": params.get("message")})
+                self._cond.notify_all()
+            # Not waited for: the reply comes to this very thread
+            self._post("Page.handleJavaScriptDialog", {"accept": True})
+        elif method == "Runtime.consoleAPICalled":
+            text = " ".join(str(arg.get("value", arg.get("description", "")))
+                            for arg in params.get("args", ()))
+            self.console.append({"type": params.get("type"), "text": text})
+
+    def _post(self, method, params=None):
+        message_id = next(self._ids)
+        self.ws.send(json.dumps({"id": message_id, "method": method, "params": params or {}}))
+        return message_id
+
+    def send(self, method, params=None):
+        """Call a DevTools method and return its result."""
+        message_id = self._post(method, params)
+        with self._cond:
+            if not self._cond.wait_for(lambda: message_id in self._replies or self._closed, self.timeout):
+                raise TimeoutError(f"{method}: no reply within {self.timeout}s")
+            if message_id not in self._replies:
+                raise CdpError(f"{method}: websocket closed")
+            reply = self._replies.pop(message_id)
+        if "error" in reply:
+            raise CdpError(f"{method}: {reply['error'].get('message')}")
+        return reply.get("result", {})
+
+    def close(self):
+        self.stale = True
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------- operations
+
+    def evaluate(self, script, *args):
+        """Like execute_script: `script` is a function body, args must be JSON values."""
+        result = self.send("Runtime.evaluate", {
+            "expression": f"(function () {{ {script}\n}}).apply(null, {json.dumps(list(args))})",
+            "returnByValue": True, "awaitPromise": True, "userGesture": True,
+        })
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise JavascriptException(
+                (details.get("exception") or {}).get("description") or details.get("text"))
+        return result.get("result", {}).get("value")
+
+    def click(self, selector):
+        """A real (trusted) mouse click in the middle of the element."""
+        center = self.evaluate(_CENTER_JS, selector)
+        if center is None:
+            raise NoSuchElementException(f"no element matches {selector!r}")
+        x, y = center
+        for kind in ("mouseMoved", "mousePressed", "mouseReleased"):
+            self.send("Input.dispatchMouseEvent",
+                      {"type": kind, "x": x, "y": y, "button": "left", "clickCount": 1})
+
+    def type(self, selector, text):
+        if not self.evaluate(_FOCUS_JS, selector):
+            raise NoSuchElementException(f"no element matches {selector!r}")
+        self.send("Input.insertText", {"text": text})
+
+    def arm_dialogs(self):
+        pass  # Page.javascriptDialogOpening already reports every dialog
+
+    def wait_for_dialog(self, timeout=5):
+        """The next dialog not returned yet (already accepted); AssertionError on timeout."""
+        started = time.perf_counter()
+        with self._cond:
+            ok = self._cond.wait_for(lambda: len(self.dialogs) > self._dialogs_seen, timeout)
+            waits._record("dialog", started, 1, ok)
+            if not ok:
+                raise AssertionError(f"no dialog opened within {timeout}s")
+            self._dialogs_seen += 1
+            return self.dialogs[self._dialogs_seen - 1]
+
+
+# ------------------------------------------------------------------ connect
+
+def page_ws_url(debugger_address, handle):
+    """websocket URL of the page target behind a WebDriver window handle."""
+    with urllib.request.urlopen(f"http://{debugger_address}/json/list", timeout=2) as resp:
+        targets = json.load(resp)
+    for target in targets:
+        if target.get("type") == "page" and handle.endswith(target["id"]):
+            return target["webSocketDebuggerUrl"]
+    return None
+
+
+def _track_windows(driver):
+    """Drop the websocket whenever the driver changes windows (wraps execute once)."""
+    if getattr(driver, "_cdp_tracked", False):
+        return
+    execute = driver.execute
+
+    def tracked(driver_command, params=None):
+        try:
+            return execute(driver_command, params)
+        finally:
+            path = getattr(driver, "_fast_path", None)
+            if driver_command in _WINDOW_COMMANDS and path is not None:
+                path.close()
+
+    driver.execute = tracked
+    driver._cdp_tracked = True
+
+
+def connect(driver):
+    """A CdpPath to the driver's current window, or None when DevTools is out of reach."""
+    address = (driver.capabilities.get("goog:chromeOptions") or {}).get("debuggerAddress")
+    if not address or not enabled():
+        return None
+    try:
+        url = page_ws_url(address, driver.current_window_handle)
+        return CdpPath(url) if url else None
+    except (OSError, websocket.WebSocketException, CdpError):
+        return None
+
+
+def fast_path(driver):
+    """The driver's fast path: DevTools when reachable, WebDriver otherwise. Cached per window."""
+    path = getattr(driver, "_fast_path", None)
+    if path is not None and not path.stale:
+        return path
+    _track_windows(driver)
+    path = connect(driver) or WebDriverPath(driver)
+    driver._fast_path = path
+    return path
+
+
+# ---------------------------------------------------------------- benchmark
+
+_BENCH_PAGE = ("data:text/html,<title>bench</title><input id=i><button id=b "
+               "onclick=\"this.dataset.n=(+this.dataset.n||0)+1\">b</button>"
+               + "<p class=row>row</p>" * 50)
+
+
+def bench(driver, n):
+    from testkit.asynchttp import percentile
+
+    driver.get(_BENCH_PAGE)
+    fast = fast_path(driver)
+    if fast.kind != "cdp":
+        raise SystemExit("no DevTools endpoint: is this Chrome?")
+    slow = WebDriverPath(driver)
+    ops = {
+        "evaluate": lambda p: p.evaluate("return 1 + 1;"),
+        "count": lambda p: p.count("p.row"),
+        "texts": lambda p: p.texts("p.row"),
+        "click": lambda p: p.click("#b"),
+        "type": lambda p: p.type("#i", "x"),
+    }
+    print(f"{n} runs per command")
+    print(f"  {'command':<10} {'path':<10} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for name, op in ops.items():
+        medians = {}
+        for path in (slow, fast):
+            op(path)  # warm up
+            runs = []
+            for _ in range(n):
+                started = time.perf_counter()
+                op(path)
+                runs.append((time.perf_counter() - started) * 1000)
+            runs.sort()
+            medians[path.kind] = percentile(runs, 50)
+            print(f"  {name:<10} {path.kind:<10} {percentile(runs, 50):8.2f} "
+                  f"{percentile(runs, 95):8.2f} {sum(runs) / n:8.2f}")
+        print(f"  {name:<10} {'speedup':<10} {medians['webdriver'] / medians['cdp']:7.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-command latency: WebDriver vs DevTools websocket.")
+    parser.add_argument("-n", type=int, default=200, help="runs per command and path")
+    args = parser.parse_args(argv)
+
+    from testkit import browser
+
+    driver = browser.chrome(browser.NO_SANDBOX_ARGS)
+    try:
+        bench(driver, args.n)
+    finally:
+        driver.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
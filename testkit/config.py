@@ -0,0 +1,48 @@
+"""Environment switches shared by the suites and the parallel runner."""
+
+import os
+import socket
+
+
+def worker_id():
+    """Index of the parallel worker running this process (0 when run directly)."""
+    return int(os.environ.get("CS458_WORKER", "0"))
+
+
+def headless():
+    """True when the browser should start without a window (always true for workers)."""
+    return os.environ.get("CS458_HEADLESS", "") not in ("", "0", "false")
+
+
+def browser_daemon():
+    """True when suites should attach to the pre-warmed Chrome (CS458_BROWSER=daemon)."""
+    return os.environ.get("CS458_BROWSER", "") == "daemon"
+
+
+def recycle_limits():
+    """When the shared browser is replaced between tests (0 turns a limit off).
+
+    CS458_RECYCLE_RSS_MB: resident memory of chromedriver + Chrome + renderers,
+    CS458_RECYCLE_WINDOWS: open windows and tabs,
+    CS458_RECYCLE_TESTS: tests run in one browser.
+    """
+    return {
+        "rss_mb": int(os.environ.get("CS458_RECYCLE_RSS_MB", "1536")),
+        "windows": int(os.environ.get("CS458_RECYCLE_WINDOWS", "4")),
+        "tests": int(os.environ.get("CS458_RECYCLE_TESTS", "0")),
+    }
+
+
+def free_port():
+    """Ask the OS for a TCP port nobody is listening on."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def cache_dir():
+    """Directory for state that should survive between runs (APK hashes, timings, ...)."""
+    path = os.environ.get("CS458_CACHE") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cs458-cache")
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,109 @@
+"""A tiny stand-in for an Appium server, for exercising SessionPool offline.
+
+It speaks just enough of the W3C WebDriver protocol to create, use and
+delete sessions, and records what it was asked to do.
+"""
+
+import json
+import threading
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeAppium:
+    def __init__(self):
+        self.sessions = {}        # session id -> capabilities
+        self.created = []         # capabilities of every session ever created
+        self.deleted = []
+        self.scripts = []         # (session id, script, args)
+        self.script_results = {}  # script -> value to reply with
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, value, status=200):
+                body = json.dumps({"value": value}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                if self.path == "/status":
+                    return self._reply({"ready": True})
+                self._reply({"error": "unknown command"}, 404)
+
+            def do_POST(self):
+                parts = self.path.strip("/").split("/")
+                body = self._body()
+                if parts == ["session"]:
+                    caps = body.get("capabilities", {}).get("alwaysMatch", {})
+                    sid = uuid.uuid4().hex
+                    fake.sessions[sid] = caps
+                    fake.created.append(caps)
+                    return self._reply({"sessionId": sid, "capabilities": caps})
+                if len(parts) >= 2 and parts[1] not in fake.sessions:
+                    return self._reply({"error": "invalid session id"}, 404)
+                if parts[2:] == ["execute", "sync"]:
+                    fake.scripts.append((parts[1], body.get("script"), body.get("args")))
+                    return self._reply(fake.script_results.get(body.get("script")))
+                self._reply(None)
+
+            def do_DELETE(self):
+                parts = self.path.strip("/").split("/")
+                if len(parts) == 2 and fake.sessions.pop(parts[1], None) is not None:
+                    fake.deleted.append(parts[1])
+                    return self._reply(None)
+                self._reply({"error": "invalid session id"}, 404)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class W3CSession:
+    """Minimal WebDriver client; enough to stand in for appium.webdriver.Remote."""
+
+    def __init__(self, server_url, capabilities):
+        self.server_url = server_url
+        value = self._call("POST", "/session", {"capabilities": {"alwaysMatch": capabilities}})
+        self.session_id = value["sessionId"]
+
+    def _call(self, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.server_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read())["value"]
+
+    def execute(self, driver_command, params=None):
+        """Like RemoteWebDriver.execute: every command goes through here."""
+        if driver_command == "executeScript":
+            return self._call("POST", f"/session/{self.session_id}/execute/sync", params)
+        if driver_command == "quit":
+            return self._call("DELETE", f"/session/{self.session_id}")
+        raise ValueError(f"unsupported command {driver_command}")
+
+    def execute_script(self, script, *args):
+        return self.execute("executeScript", {"script": script, "args": list(args)})
+
+    def quit(self):
+        self.execute("quit")
@@ -0,0 +1,130 @@
+"""One-call snapshots of the Flutter widget tree, indexed by ValueKey.
+
+`flutter:waitFor` / `waitForAbsent` answer one question per round trip and
+a negative answer costs the whole timeout: `waitFor("SendSurveyButton", 2)`
+on a form that is not complete yet always takes 2 s. A snapshot fetches the
+whole tree below MaterialApp with one `flutter:getWidgetDiagnostics` call
+(falling back to `flutter:getRenderTree` on drivers without it) and indexes
+every `ValueKey` string in it, so any number of presence and absence checks
+are answered locally:
+
+    tree = snapshot(driver, finder.by_type("MaterialApp"))
+    assert "BardConsField" in tree and "ChatGPTConsField" not in tree
+
+The Flutter driver synchronises its commands with the frame scheduler, so
+the tree is the settled state after the last interaction. A snapshot is
+kept per driver until the next command goes through the driver (a tap,
+text entry, another wait...), after which `snapshot()` fetches a new one.
+"""
+
+import re
+import time
+
+from testkit import waits
+
+# Widgets show their key as `TextField-[<'EmailField'>]` in diagnostics and render tree dumps
+_KEY = re.compile(r"-\[<'((?:[^'\\]|\\.)*)'>\]")
+DIAGNOSTICS = "flutter:getWidgetDiagnostics"
+RENDER_TREE = "flutter:getRenderTree"
+
+
+class WidgetSnapshot:
+    """The ValueKeys present in the widget tree at one moment."""
+
+    def __init__(self, keys, widgets, source, seconds):
+        self.keys = keys          # key -> number of widgets carrying it
+        self.widgets = widgets    # key -> description of the first one, e.g. "ElevatedButton"
+        self.source = source
+        self.seconds = seconds
+
+    @classmethod
+    def parse(cls, tree, source="diagnostics", seconds=0.0):
+        keys, widgets = {}, {}
+        for description in _descriptions(tree):
+            for match in _KEY.finditer(description):
+                key = match.group(1)
+                keys[key] = keys.get(key, 0) + 1
+                widgets.setdefault(key, description[:match.start()].rsplit(" ", 1)[-1])
+        return cls(keys, widgets, source, seconds)
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def count(self, key):
+        return self.keys.get(key, 0)
+
+    def missing(self, keys):
+        return [k for k in keys if k not in self.keys]
+
+    def __repr__(self):
+        return f"<WidgetSnapshot {len(self.keys)} keys from {self.source} in {self.seconds * 1000:.0f} ms>"
+
+
+def _descriptions(tree):
+    """Every description line of a diagnostics node tree (or a render tree dump)."""
+    if isinstance(tree, str):
+        yield from tree.splitlines()
+        return
+    if isinstance(tree, dict) and "tree" in tree and "description" not in tree:
+        yield from _descriptions(tree["tree"])
+        return
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        yield node.get("description") or ""
+        stack.extend(reversed(node.get("children") or ()))
+
+
+class _Cache:
+    def __init__(self):
+        self.current = None
+        self.fetching = False
+        self.fetches = 0
+        self.hits = 0
+
+
+def _cache_for(driver):
+    """The driver's snapshot cache; wraps driver.execute once so any command drops it."""
+    cache = driver.__dict__.get("_widget_snapshot")
+    if cache is not None:
+        return cache
+    cache = driver._widget_snapshot = _Cache()
+    execute = driver.execute
+
+    def tracked(driver_command, params=None):
+        try:
+            return execute(driver_command, params)
+        finally:
+            if not cache.fetching:
+                cache.current = None
+
+    driver.execute = tracked
+    return cache
+
+
+def snapshot(driver, root, depth=1000):
+    """The current WidgetSnapshot below the `root` finder, fetched only if something ran since."""
+    cache = _cache_for(driver)
+    if cache.current is not None:
+        cache.hits += 1
+        return cache.current
+    started = time.perf_counter()
+    cache.fetching = True
+    try:
+        try:
+            tree, source = driver.execute_script(
+                DIAGNOSTICS, root, {"subtreeDepth": depth, "includeProperties": False}), "diagnostics"
+        except Exception:
+            tree, source = driver.execute_script(RENDER_TREE), "render tree"
+    finally:
+        cache.fetching = False
+    cache.fetches += 1
+    cache.current = WidgetSnapshot.parse(tree, source, time.perf_counter() - started)
+    waits._record("widget snapshot", started, 1, True)
+    return cache.current
+
+
+def invalidate(driver):
+    _cache_for(driver).current = None
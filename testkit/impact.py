@@ -0,0 +1,171 @@
+"""Change-aware test selection for the parallel runner.
+
+    python -m testkit.parallel project1/test.py project3/test.py --changed-only
+
+While a test runs, every file the static server resolves for it (pages,
+scripts, and the assets PageResetter checks before an in-place reset) is
+recorded, together with the repository's Python modules the suite
+imported and the CS458_* switches that change what tests do. Files served
+or run by a subprocess (like project3/loadgen.py's servers) are invisible
+to the recorder; code that starts one notes them with `RECORDER.note()`. Passing
+tests are stored in .cs458-cache/impact.json with the SHA-1 of each of
+those inputs.
+
+With --changed-only a test is re-run unless it passed before and every one
+of its inputs still has the same content; editing survey.html re-runs the
+tests that loaded survey.html and nothing else. A plain run (without
+--changed-only) runs everything and refreshes the store.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+
+from testkit import config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_VERSION = 1
+# Set per process by the runner itself; they do not change what a test does
+IGNORED_ENV = ("CS458_WORKER", "CS458_HEADLESS", "CS458_PROFILE", "CS458_CACHE", "CS458_BROWSER",
+               "CS458_RECYCLE_RSS_MB", "CS458_RECYCLE_WINDOWS", "CS458_RECYCLE_TESTS", "CS458_CDP")
+
+
+def store_path():
+    return os.path.join(config.cache_dir(), "impact.json")
+
+
+def load_store(path=None):
+    try:
+        with open(path or store_path(), encoding="utf-8") as f:
+            store = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return store.get("tests", {}) if store.get("version") == STORE_VERSION else {}
+
+
+def save_store(tests, path=None):
+    path = path or store_path()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": STORE_VERSION, "tests": tests}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+class FileHasher:
+    """SHA-1 of repository files, recomputed only when mtime or size changes."""
+
+    def __init__(self):
+        self._memo = {}
+
+    def __call__(self, rel):
+        full = os.path.join(ROOT, rel)
+        try:
+            st = os.stat(full)
+        except OSError:
+            return None  # a missing file is an input too (404 now, maybe not later)
+        stamp = (st.st_mtime_ns, st.st_size)
+        hit = self._memo.get(full)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        with open(full, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        self._memo[full] = (stamp, digest)
+        return digest
+
+
+def env_inputs():
+    return {f"${k}": v for k, v in sorted(os.environ.items())
+            if k.startswith("CS458_") and k not in IGNORED_ENV}
+
+
+def python_inputs():
+    """Repository .py files currently imported (suite, testkit, project helpers)."""
+    found = set()
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if not path or not path.endswith(".py"):
+            continue
+        path = os.path.abspath(path)
+        if path.startswith(ROOT + os.sep) and "site-packages" not in path:
+            found.add(os.path.relpath(path, ROOT))
+    return found
+
+
+class Recorder:
+    """Collects the files the static server resolves while a test is running."""
+
+    def __init__(self):
+        self.enabled = False
+        self.current = None
+        self._lock = threading.Lock()
+
+    def enable(self):
+        if self.enabled:
+            return self
+        from testkit.server import StaticServer
+
+        original = StaticServer.asset
+        recorder = self
+
+        def asset(server, url_path):
+            recorder.note(server._fs_path(url_path.split("?", 1)[0]))
+            return original(server, url_path)
+
+        StaticServer.asset = asset
+        self.enabled = True
+        return self
+
+    def start(self):
+        with self._lock:
+            self.current = set()
+
+    def note(self, full_path):
+        with self._lock:
+            if self.current is not None:
+                self.current.add(os.path.relpath(full_path, ROOT))
+
+    def stop(self):
+        with self._lock:
+            served, self.current = self.current or set(), None
+        return served
+
+
+RECORDER = Recorder()
+
+
+def fingerprint(files, hasher):
+    inputs = {rel: hasher(rel) for rel in sorted(files)}
+    inputs.update(env_inputs())
+    return inputs
+
+
+def unchanged(inputs, hasher):
+    env = env_inputs()
+    if {k: v for k, v in inputs.items() if k.startswith("$")} != env:
+        return False
+    return all(hasher(rel) == digest for rel, digest in inputs.items() if not rel.startswith("$"))
+
+
+def select(tests, test_id, store, hasher=None):
+    """Split tests into (to_run, cached): cached ones passed with identical inputs."""
+    hasher = hasher or FileHasher()
+    to_run, cached = [], []
+    for test in tests:
+        entry = store.get(test_id(test))
+        if entry and entry["outcome"] == "ok" and unchanged(entry["inputs"], hasher):
+            cached.append((test, entry))
+        else:
+            to_run.append(test)
+    return to_run, cached
+
+
+def update(store, records):
+    """Keep passing records (with their inputs) in the store, drop everything else."""
+    for r in records:
+        if r["outcome"] == "ok" and r.get("inputs"):
+            store[r["id"]] = {"outcome": "ok", "duration": r["duration"], "inputs": r["inputs"]}
+        else:
+            store.pop(r["id"], None)
+    return store
@@ -0,0 +1,193 @@
+"""Declared locators, resolved in bulk and cached per page version.
+
+Each page object in testkit.pages declares its elements once:
+
+    LOCATORS = {
+        "email": (By.ID, "emailInput"),
+        "items": (By.CSS_SELECTOR, ".q-item", MANY),
+        "radio": (By.XPATH, "//label[normalize-space()='{}']/input[@type='radio']"),
+    }
+
+and tests ask for them by name (`page.el("email")`, `page.els("items")`,
+`page.el("radio", "A")`). Asking for several names at once with
+`page.resolve(...)` looks all of them up in one script call.
+
+Resolved handles are kept until the DOM may have changed: the driver is
+wrapped (like the profiler does) so every command that can change the page
+(navigation, clicks, typing, scripts, window switches) starts a new page
+version and empties the cache. Lookups that do not match fail at once with
+a LocatorError naming the page, the locator and how many elements matched,
+instead of stalling on an implicit wait. Absolute XPaths are rejected when
+a locator is declared.
+"""
+
+from selenium.webdriver.common.by import By
+
+from testkit import waits
+
+MANY = "many"
+
+# WebDriver commands after which previously resolved elements may be gone
+MUTATING = frozenset({
+    "get", "refresh", "goBack", "goForward", "newWindow", "close", "switchToWindow",
+    "switchToFrame", "switchToParentFrame", "clickElement", "sendKeysToElement", "clearElement",
+    "w3cExecuteScript", "w3cExecuteScriptAsync", "w3cActions", "w3cAcceptAlert",
+    "w3cDismissAlert", "w3cSetAlertValue", "deleteAllCookies", "addCookie",
+})
+
+_RESOLVE_JS = """
+const found = {};
+for (const [key, by, value] of arguments[0]) {
+  let els;
+  if (by === 'id') { const el = document.getElementById(value); els = el ? [el] : []; }
+  else if (by === 'class name') els = Array.from(document.getElementsByClassName(value));
+  else if (by === 'name') els = Array.from(document.getElementsByName(value));
+  else if (by === 'tag name') els = Array.from(document.getElementsByTagName(value));
+  else if (by === 'xpath') {
+    const snap = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    els = [];
+    for (let i = 0; i < snap.snapshotLength; i++) els.push(snap.snapshotItem(i));
+  } else els = Array.from(document.querySelectorAll(value));
+  found[key] = els;
+}
+return found;
+"""
+
+_JS_STRATEGIES = {By.ID: "id", By.CLASS_NAME: "class name", By.NAME: "name",
+                  By.TAG_NAME: "tag name", By.XPATH: "xpath", By.CSS_SELECTOR: "css"}
+
+
+class LocatorError(AssertionError):
+    """A declared locator matched nothing, or more than one element where one was expected."""
+
+
+class Locator:
+    __slots__ = ("page", "name", "by", "value", "many")
+
+    def __init__(self, page, name, by, value, many=False):
+        if by not in _JS_STRATEGIES:
+            raise ValueError(f"{page}.{name}: unsupported strategy {by!r}")
+        if by == By.XPATH and value.startswith("/html"):
+            raise ValueError(f"{page}.{name}: absolute XPath {value!r} breaks on any layout change")
+        self.page = page
+        self.name = name
+        self.by = by
+        self.value = value
+        self.many = many
+
+    @classmethod
+    def declare(cls, page, name, spec):
+        by, value, *flags = spec
+        return cls(page, name, by, value, many=MANY in flags)
+
+    def bind(self, args):
+        return self.value.format(*args) if args else self.value
+
+    def __repr__(self):
+        return f"{self.page}.{self.name} ({self.by}={self.value!r})"
+
+
+class _Cache:
+    """Resolved elements for one driver, valid for the current page version."""
+
+    def __init__(self):
+        self.version = 0
+        self.elements = {}   # (page, name, args) -> [WebElement]
+        self.hits = 0
+        self.lookups = 0
+
+    def invalidate(self):
+        self.version += 1
+        self.elements.clear()
+
+
+def cache_for(driver):
+    """The driver's locator cache; wraps driver.execute once to track page versions."""
+    cache = getattr(driver, "_locator_cache", None)
+    if cache is not None:
+        return cache
+    cache = driver._locator_cache = _Cache()
+    execute = driver.execute
+
+    def tracked(driver_command, params=None):
+        try:
+            return execute(driver_command, params)
+        finally:
+            if driver_command in MUTATING:
+                cache.invalidate()
+
+    driver.execute = tracked
+    return cache
+
+
+def resolve(driver, requests, allow_empty=False):
+    """{(name, args): [elements]} for (Locator, args) pairs, one script call for the misses."""
+    cache = cache_for(driver)
+    out, missing = {}, []
+    for loc, args in requests:
+        key = (loc.page, loc.name, args)
+        hit = cache.elements.get(key)
+        if hit is not None:
+            cache.hits += 1
+            out[loc.name, args] = hit
+        else:
+            missing.append((loc, args))
+    if missing:
+        cache.lookups += 1
+        found = driver.execute_script(
+            _RESOLVE_JS, [[str(i), _JS_STRATEGIES[loc.by], loc.bind(args)]
+                          for i, (loc, args) in enumerate(missing)])
+        # our own lookup script does not change the page; store under the new version
+        for i, (loc, args) in enumerate(missing):
+            elements = found[str(i)]
+            cache.elements[loc.page, loc.name, args] = elements
+            out[loc.name, args] = elements
+    problems = []
+    for loc, args in requests:
+        count = len(out[loc.name, args])
+        where = f"{loc!r}" + (f" with {args}" if args else "")
+        if count == 0 and not allow_empty:
+            problems.append(f"{where} matches nothing")
+        elif count > 1 and not loc.many:
+            problems.append(f"{where} is ambiguous: {count} elements match")
+    if problems:
+        raise LocatorError("; ".join(problems))
+    return out
+
+
+class Locators:
+    """The declared locators of one page, bound to a driver."""
+
+    def __init__(self, driver, page, specs):
+        self.driver = driver
+        self.page = page
+        self.locators = {name: Locator.declare(page, name, spec) for name, spec in specs.items()}
+
+    def _locator(self, name):
+        try:
+            return self.locators[name]
+        except KeyError:
+            raise LocatorError(f"{self.page} declares no locator {name!r}") from None
+
+    def resolve(self, *names):
+        """{name: element (or list for MANY locators)} for several names in one call."""
+        found = resolve(self.driver, [(self._locator(n), ()) for n in names])
+        return {n: els if self.locators[n].many else els[0] for (n, _), els in found.items()}
+
+    def el(self, name, *args):
+        loc = self._locator(name)
+        return resolve(self.driver, [(loc, args)])[name, args][0]
+
+    def els(self, name, *args):
+        """Every match of a locator; an empty list rather than an error."""
+        loc = self._locator(name)
+        return resolve(self.driver, [(loc, args)], allow_empty=True)[name, args]
+
+    def wait(self, name, *args, timeout=5):
+        """Poll until the locator matches (explicit wait; implicit waits stay at 0)."""
+        def present(driver):
+            cache_for(driver).invalidate()
+            return self.els(name, *args)
+
+        found = waits.Waiter(self.driver, timeout).until(present, label=f"{self.page}.{name}")
+        return found if self.locators[name].many else found[0]
@@ -0,0 +1,304 @@
+"""Offline stand-in for Google and Facebook sign-in.
+
+    stub = OAuthStub().start()
+    stub.install(driver)        # before the page is loaded
+
+`install()` blocks the real providers in the browser (Network.setBlockedURLs)
+and adds a script to every new document (Page.addScriptToEvaluateOnNewDocument)
+that plays the part of their client libraries:
+
+* Google Identity Services: reads `#g_id_onload`, renders a sign-in button
+  into every `.g_id_signin`, and hands the ID token to the page's
+  `data-callback` function;
+* the Facebook SDK: `FB.init`, `FB.login(callback)`, `FB.getLoginStatus`.
+
+Their buttons open popups on this server, which serves Google- and
+Facebook-style sign-in pages (`identifier` / `Passwd`, `email` / `pass`)
+and issues unsigned tokens for the accounts it was given. Nothing leaves
+the machine.
+
+`configure(latency=..., failure=...)` slows every response down or makes
+sign-in fail: "server_error" (500 pages), "access_denied" (the user
+declines; the popup reports an error and closes).
+"""
+
+import base64
+import json
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from testkit.server import content_length
+
+ACCOUNTS = {"tester@gmail.com": "cs458-pass"}
+BLOCKED_URLS = ["*://accounts.google.com/*", "*://apis.google.com/*",
+                "*://connect.facebook.net/*", "*://www.facebook.com/*"]
+FAILURES = (None, "server_error", "access_denied")
+
+CLIENT_JS = r"""
+(() => {
+  const STUB = %(origin)s;
+  if (location.origin === STUB) return;
+
+  const popup = (path, params) => window.open(
+    STUB + path + '?' + new URLSearchParams(Object.assign({origin: location.origin}, params)),
+    'cs458-oauth', 'width=480,height=600');
+
+  // --- Google Identity Services
+  let gsi = null;
+  const gsiConfig = () => {
+    if (gsi) return gsi;
+    const el = document.getElementById('g_id_onload');
+    return el ? {client_id: el.dataset.client_id, callback: window[el.dataset.callback]} : null;
+  };
+  const renderButton = (parent) => {
+    const button = document.createElement('div');
+    button.setAttribute('role', 'button');
+    button.tabIndex = 0;
+    button.className = 'cs458-gsi-button';
+    button.textContent = 'Sign in with Google';
+    button.style.cssText = 'display:inline-block;padding:10px 16px;border:1px solid #dadce0;' +
+      'border-radius:4px;cursor:pointer;font:14px sans-serif;background:#fff;color:#3c4043';
+    button.addEventListener('click', () => popup('/o/oauth2/v2/auth', {client_id: (gsiConfig() || {}).client_id || ''}));
+    parent.appendChild(button);
+  };
+  window.google = {accounts: {id: {
+    initialize: (config) => { gsi = config; },
+    renderButton: (parent) => renderButton(parent),
+    prompt: () => {},
+    disableAutoSelect: () => {},
+  }}};
+
+  // --- Facebook SDK
+  let fbCallback = null, fbAppId = '';
+  window.FB = {
+    init: (config) => { fbAppId = (config && config.appId) || ''; },
+    login: (callback) => { fbCallback = callback; popup('/dialog/oauth', {client_id: fbAppId}); },
+    getLoginStatus: (callback) => callback({status: 'unknown'}),
+    logout: (callback) => callback && callback({status: 'unknown'}),
+  };
+
+  window.addEventListener('message', (e) => {
+    if (e.origin !== STUB || !e.data) return;
+    if (e.data.provider === 'google' && e.data.credential) {
+      const config = gsiConfig();
+      if (config && typeof config.callback === 'function') {
+        config.callback({credential: e.data.credential, select_by: 'btn'});
+      }
+    } else if (e.data.provider === 'facebook' && fbCallback) {
+      fbCallback(e.data.accessToken
+        ? {status: 'connected', authResponse: {accessToken: e.data.accessToken, userID: e.data.userID}}
+        : {status: 'not_authorized'});
+    }
+  });
+
+  document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('.g_id_signin').forEach(renderButton);
+    if (typeof window.fbAsyncInit === 'function') window.fbAsyncInit();
+  });
+})();
+"""
+
+_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="UTF-8"><title>%(title)s</title>
+<style>body{font-family:sans-serif;max-width:360px;margin:40px auto}
+input{display:block;width:100%%;margin:8px 0;padding:8px}[hidden]{display:none}
+#error{color:#d93025}</style></head>
+<body>
+%(body)s
+<div id="error" role="alert" hidden></div>
+<script>
+const params = new URLSearchParams(location.search);
+const error = document.getElementById('error');
+const fail = (text) => { error.textContent = text; error.hidden = false; };
+const finish = (provider, fields) => fetch('/token', {
+  method: 'POST', headers: {'Content-Type': 'application/json'},
+  body: JSON.stringify(Object.assign({provider, client_id: params.get('client_id')}, fields)),
+}).then(r => r.json().then(data => {
+  if (r.status === 401) return fail(data.error);
+  if (window.opener) window.opener.postMessage(Object.assign({provider}, data), params.get('origin'));
+  window.close();
+})).catch(() => fail('Something went wrong. Try again.'));
+%(script)s
+</script>
+</body>
+</html>
+"""
+
+GOOGLE_PAGE = _PAGE % {
+    "title": "Sign in - Google Accounts",
+    "body": """<h1 id="headingText">Sign in</h1>
+<div id="identifierStep">
+  <input type="email" name="identifier" id="identifierId" autocomplete="username" placeholder="Email or phone">
+  <div id="identifierNext"><button type="button">Next</button></div>
+</div>
+<div id="passwordStep" hidden>
+  <input type="password" name="Passwd" autocomplete="current-password" placeholder="Enter your password">
+  <div id="passwordNext"><button type="button">Next</button></div>
+</div>""",
+    "script": """const email = document.getElementById('identifierId');
+document.querySelector('#identifierNext button').addEventListener('click', () => {
+  fetch('/lookup?' + new URLSearchParams({email: email.value.trim()})).then(r => {
+    if (r.status !== 200) return fail("Couldn't find your Google Account");
+    error.hidden = true;
+    document.getElementById('identifierStep').hidden = true;
+    document.getElementById('passwordStep').hidden = false;
+    document.getElementById('headingText').textContent = 'Welcome';
+  });
+});
+document.querySelector('#passwordNext button').addEventListener('click', () => finish('google', {
+  email: email.value.trim(), password: document.querySelector('[name=Passwd]').value,
+}));""",
+}
+
+FACEBOOK_PAGE = _PAGE % {
+    "title": "Log in to Facebook",
+    "body": """<h1>Log in to Facebook</h1>
+<input type="text" name="email" id="email" placeholder="Email address or phone number">
+<input type="password" name="pass" id="pass" placeholder="Password">
+<button type="button" name="login" id="loginbutton">Log In</button>""",
+    "script": """document.getElementById('loginbutton').addEventListener('click', () => finish('facebook', {
+  email: document.getElementById('email').value.trim(),
+  password: document.getElementById('pass').value,
+}));""",
+}
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def id_token(email, client_id, issuer="https://accounts.google.com"):
+    """Unsigned JWT with the claims a page reads from a Google ID token."""
+    now = int(time.time())
+    claims = {"iss": issuer, "aud": client_id, "sub": str(uuid.uuid5(uuid.NAMESPACE_URL, email).int)[:21],
+              "email": email, "email_verified": True, "name": email.split("@")[0].title(),
+              "iat": now, "exp": now + 3600}
+    header = {"alg": "none", "typ": "JWT"}
+    return ".".join(_b64url(json.dumps(part).encode()) for part in (header, claims)) + "."
+
+
+class OAuthStub:
+    """Google/Facebook sign-in pages and token endpoint on a local port."""
+
+    def __init__(self, accounts=None, host="127.0.0.1", port=0):
+        self.accounts = dict(ACCOUNTS if accounts is None else accounts)
+        self.latency = 0.0
+        self.failure = None
+        self.requests = []        # (method, path) of everything served
+        self.issued = []          # (provider, email) of every token handed out
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self.url = f"http://{host}:{self._httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        kwargs={"poll_interval": 0.05}, name="oauth-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def configure(self, latency=0.0, failure=None):
+        """Delay every response by `latency` seconds and/or make sign-in fail."""
+        if failure not in FAILURES:
+            raise ValueError(f"failure must be one of {FAILURES}")
+        self.latency = latency
+        self.failure = failure
+        return self
+
+    def client_js(self):
+        return CLIENT_JS % {"origin": json.dumps(self.url)}
+
+    def install(self, driver):
+        """Route the page's sign-in libraries to this stub from the next page load on."""
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": self.client_js()})
+        return self
+
+    # ------------------------------------------------------------------ HTTP
+
+    def _token(self, body):
+        provider, email = body.get("provider"), body.get("email", "")
+        if self.failure == "access_denied":
+            return 200, {"error": "access_denied"}
+        if self.accounts.get(email) is None or self.accounts[email] != body.get("password"):
+            text = ("Wrong password. Try again or click Forgot password to reset it."
+                    if provider == "google" else "The password that you've entered is incorrect.")
+            return 401, {"error": text}
+        self.issued.append((provider, email))
+        if provider == "google":
+            return 200, {"credential": id_token(email, body.get("client_id") or "")}
+        return 200, {"accessToken": uuid.uuid4().hex, "userID": str(uuid.uuid5(uuid.NAMESPACE_URL, "fb:" + email).int)[:15]}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, status, value):
+                self._send(status, json.dumps(value), "application/json")
+
+            def _begin(self):
+                stub.requests.append((self.command, self.path))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub.failure == "server_error":
+                    self._send(500, "<h1>500. That's an error.</h1>", "text/html; charset=utf-8")
+                    return False
+                return True
+
+            def do_GET(self):
+                if not self._begin():
+                    return
+                url = urllib.parse.urlsplit(self.path)
+                if url.path == "/o/oauth2/v2/auth":
+                    return self._send(200, GOOGLE_PAGE, "text/html; charset=utf-8")
+                if url.path == "/dialog/oauth":
+                    return self._send(200, FACEBOOK_PAGE, "text/html; charset=utf-8")
+                if url.path == "/lookup":
+                    email = urllib.parse.parse_qs(url.query).get("email", [""])[0]
+                    return self._json(200 if email in stub.accounts else 404, {})
+                self._json(404, {"error": "not found"})
+
+            def do_POST(self):
+                if not self._begin():
+                    return
+                if self.path != "/token":
+                    return self._json(404, {"error": "not found"})
+                length = content_length(self.headers)
+                if length is None:
+                    self.close_connection = True
+                    return self._json(400, {"error": "bad Content-Length"})
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    return self._json(400, {"error": "body is not JSON"})
+                self._json(*stub._token(body))
+
+        return Handler
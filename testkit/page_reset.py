@@ -0,0 +1,128 @@
+"""Put a page back into its just-loaded state without navigating.
+
+`PageResetter.reset()` replaces the `driver.get(url)` + wait that every
+setUp used to do. The first call loads the page for real and captures a
+snapshot: a fingerprint of the DOM and form state, the style attribute of
+every element with an id, the markup of containers the page rebuilds, and
+the page's own alert/confirm functions. Later calls run the page's reset
+routine and restore that snapshot in a single script call, then compare
+fingerprints.
+
+It falls back to a real reload whenever the shortcut cannot be trusted:
+
+* the page file (or one of its assets) changed on the static server;
+* the browser is on another document (navigation, redirect, new load);
+* the restored DOM does not match the captured fingerprint.
+
+Set CS458_RESET=reload to always navigate.
+"""
+
+import os
+import uuid
+
+from testkit import waits
+
+_FINGERPRINT_JS = """
+const fingerprint = () => {
+  let text = document.body ? document.body.innerHTML : '';
+  document.querySelectorAll('input, select, textarea').forEach(el => {
+    text += '|' + el.value + (el.checked ? '*' : '');
+  });
+  let h = 2166136261;
+  for (let i = 0; i < text.length; i++) { h ^= text.charCodeAt(i); h = Math.imul(h, 16777619); }
+  return (h >>> 0).toString(16) + ':' + text.length;
+};
+"""
+
+_CAPTURE_JS = _FINGERPRINT_JS + """
+const state = {token: arguments[0], alert: window.alert, confirm: window.confirm,
+               styles: {}, html: {}};
+document.querySelectorAll('[id]').forEach(el => { state.styles[el.id] = el.getAttribute('style'); });
+arguments[1].forEach(id => { const el = document.getElementById(id); if (el) state.html[id] = el.innerHTML; });
+window.__cs458Reset = state;
+return fingerprint();
+"""
+
+_RESTORE_JS = _FINGERPRINT_JS + """
+const state = window.__cs458Reset;
+if (!state || state.token !== arguments[0] || location.pathname + location.search !== arguments[1]) {
+  return null;
+}
+window.alert = state.alert;
+window.confirm = state.confirm;
+(function () { %s })();
+document.querySelectorAll('input, textarea').forEach(el => {
+  el.value = el.defaultValue; el.checked = el.defaultChecked;
+});
+document.querySelectorAll('option').forEach(o => { o.selected = o.defaultSelected; });
+Object.entries(state.html).forEach(([id, html]) => {
+  const el = document.getElementById(id); if (el) el.innerHTML = html;
+});
+Object.entries(state.styles).forEach(([id, style]) => {
+  const el = document.getElementById(id);
+  if (!el) return;
+  if (style === null) el.removeAttribute('style'); else el.setAttribute('style', style);
+});
+if (document.activeElement) document.activeElement.blur();
+window.scrollTo(0, 0);
+return fingerprint();
+"""
+
+
+class PageResetter:
+    """Reset one page of a StaticServer in place, reloading only when needed."""
+
+    def __init__(self, driver, server, page, reset_js="", ready=None,
+                 restore_html=(), assets=(), settle=False):
+        self.driver = driver
+        self.server = server
+        self.page = page
+        self.url = server.url_for(page)
+        self.reset_js = reset_js
+        self.ready = ready
+        self.restore_html = list(restore_html)
+        self.assets = [page.split("?", 1)[0]] + list(assets)
+        self.settle = settle
+        self.reloads = 0
+        self.in_place = 0
+        self.last_reload_reason = None
+        self._token = None
+        self._etags = None
+        self._fingerprint = None
+
+    def _current_etags(self):
+        return [self.server.etag(a) for a in self.assets]
+
+    def load(self, reason="first load"):
+        """Navigate for real and capture the initial-state snapshot."""
+        self.reloads += 1
+        self.last_reload_reason = reason
+        self.driver.get(self.url)
+        waits.page_ready(self.driver)
+        if self.ready:
+            waits.Waiter(self.driver, 5).until(self.ready, label=f"{self.page} ready")
+        if self.settle:
+            # Pages that keep building themselves after load (third-party widgets)
+            waits.dom_settled(self.driver, quiet=0.2, timeout=5)
+        self._token = uuid.uuid4().hex
+        self._etags = self._current_etags()
+        self._fingerprint = self.driver.execute_script(_CAPTURE_JS, self._token, self.restore_html)
+
+    def reset(self):
+        """Bring the page back to its initial state; returns "in-place" or "reload"."""
+        if self._token is None or os.environ.get("CS458_RESET") == "reload":
+            self.load()
+            return "reload"
+        if self._current_etags() != self._etags:
+            self.load("page source changed")
+            return "reload"
+        path = "/" + self.page.lstrip("/")
+        fingerprint = self.driver.execute_script(_RESTORE_JS % self.reset_js, self._token, path)
+        if fingerprint is None:
+            self.load("browser left the page")
+            return "reload"
+        if fingerprint != self._fingerprint:
+            self.load("state did not match snapshot")
+            return "reload"
+        self.in_place += 1
+        return "in-place"
@@ -0,0 +1,283 @@
+"""Page objects that batch WebDriver work into single in-browser calls.
+
+Each `find_element` / `send_keys` / `get_attribute` / `is_displayed` is an
+HTTP round-trip to chromedriver. The methods here instead ship one script
+that does all the work inside the page and returns plain data, so filling
+a form or reading twenty properties costs one round-trip.
+
+Writes dispatch the same `input` / `change` events a user would trigger,
+so the pages' handlers run exactly as with send_keys / Select.
+
+Every page also declares its elements once in LOCATORS; `el()`, `els()`,
+`resolve()` and `wait_for()` look them up through testkit.locators.
+"""
+
+from selenium.webdriver.common.by import By
+
+from testkit.locators import MANY, Locators
+
+_HELPERS_JS = """
+const byId = id => document.getElementById(id);
+const visible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)
+                      && getComputedStyle(el).visibility !== 'hidden';
+const fire = (el, type) => el.dispatchEvent(new Event(type, {bubbles: true}));
+const setValue = (el, value) => {
+  if (el.type === 'checkbox' || el.type === 'radio') {
+    if (el.checked !== !!value) { el.checked = !!value; fire(el, 'input'); fire(el, 'change'); }
+    return;
+  }
+  if (el.tagName === 'SELECT') {
+    const opt = Array.from(el.options).find(o => o.value === String(value))
+             || Array.from(el.options).find(o => o.text.trim() === String(value));
+    if (!opt) throw new Error('no option ' + JSON.stringify(value) + ' in #' + el.id);
+    el.value = opt.value;
+  } else {
+    el.focus();
+    el.value = String(value);
+  }
+  fire(el, 'input'); fire(el, 'change');
+};
+const describe = el => el === null ? null : ({
+  tag: el.tagName.toLowerCase(),
+  value: 'value' in el ? el.value : null,
+  checked: 'checked' in el ? el.checked : null,
+  text: el.innerText,
+  displayed: visible(el),
+  enabled: !el.disabled,
+});
+"""
+
+_FILL_JS = _HELPERS_JS + """
+const steps = arguments[0], missing = [];
+for (const [id, value] of steps) {
+  const el = byId(id);
+  if (el === null) { missing.push(id); continue; }
+  if (value === '__click__') el.click(); else setValue(el, value);
+}
+return missing;
+"""
+
+_READ_JS = _HELPERS_JS + """
+const out = {};
+arguments[0].forEach(id => { out[id] = describe(byId(id)); });
+return out;
+"""
+
+_QUERY_JS = _HELPERS_JS + """
+return Array.from(document.querySelectorAll(arguments[0])).map(describe);
+"""
+
+CLICK = "__click__"
+
+
+class PageError(AssertionError):
+    """A page object could not find what it was asked to touch."""
+
+
+class Page:
+    """Base class: bulk fill / read / query against the current document."""
+
+    name = "page"
+    LOCATORS = {}
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.locators = Locators(driver, self.name, self.LOCATORS)
+
+    def el(self, name, *args):
+        """The one element a declared locator matches (LocatorError otherwise)."""
+        return self.locators.el(name, *args)
+
+    def els(self, name, *args):
+        return self.locators.els(name, *args)
+
+    def resolve(self, *names):
+        return self.locators.resolve(*names)
+
+    def wait_for(self, name, *args, timeout=5):
+        return self.locators.wait(name, *args, timeout=timeout)
+
+    def run(self, *steps):
+        """Apply (id, value) steps in order in one call; value CLICK clicks the element."""
+        missing = self.driver.execute_script(_FILL_JS, [list(s) for s in steps])
+        if missing:
+            raise PageError(f"{self.name}: no element with id {', '.join(map(repr, missing))}")
+
+    def fill(self, values):
+        """Set several fields at once, e.g. fill({"emailInput": "a@b.c", "passwordInput": "x"})."""
+        self.run(*values.items())
+
+    def read(self, *ids):
+        """{id: {tag, value, checked, text, displayed, enabled}} for each id (None if missing)."""
+        return self.driver.execute_script(_READ_JS, list(ids))
+
+    def query(self, selector):
+        """Descriptions of every element matching a CSS selector."""
+        return self.driver.execute_script(_QUERY_JS, selector)
+
+    def texts(self, selector):
+        return [d["text"] for d in self.query(selector)]
+
+    def assert_state(self, testcase, expected):
+        """Check many properties in one read; the failure lists every mismatch.
+
+        expected = {"qText": {"value": ""}, "saveQuestionBtn": {"enabled": False}}
+        """
+        actual = self.read(*expected)
+        problems = []
+        for el_id, props in expected.items():
+            state = actual.get(el_id)
+            if state is None:
+                problems.append(f"#{el_id} is missing")
+                continue
+            for prop, want in props.items():
+                if state[prop] != want:
+                    problems.append(f"#{el_id}.{prop} is {state[prop]!r}, expected {want!r}")
+        if problems:
+            testcase.fail(f"{self.name}: " + "; ".join(problems))
+        return actual
+
+
+class LoginPage(Page):
+    """The login form shared by project1/index.html and project3/index.html."""
+
+    name = "login page"
+    FIELDS = ("emailInput", "passwordInput")
+    LOCATORS = {
+        "email": (By.ID, "emailInput"),
+        "password": (By.ID, "passwordInput"),
+        "login": (By.CLASS_NAME, "btn-login"),
+        "message": (By.ID, "message"),
+        # project1 renders a Google Identity button, project3 has its own
+        "google": (By.CSS_SELECTOR, ".g_id_signin [role=button], #googleBtn"),
+        "facebook": (By.CLASS_NAME, "btn-facebook"),
+    }
+
+    def login(self, email="", password=""):
+        """Fill both fields and press Login in a single call."""
+        self.driver.execute_script(_HELPERS_JS + """
+            setValue(byId('emailInput'), arguments[0]);
+            setValue(byId('passwordInput'), arguments[1]);
+            document.querySelector('.btn-login').click();
+        """, email, password)
+
+    def message(self):
+        return self.read("message")["message"]
+
+
+class SurveyFormPage(Page):
+    """The fixed survey shown after login on project3/index.html."""
+
+    name = "survey form"
+    FIELDS = ("fullName", "birthDate", "educationLevel", "city", "useCases", "surveySubmit")
+
+    def fields(self):
+        return self.read(*self.FIELDS)
+
+
+class BuilderPage(Page):
+    """project3/survey-builder.html."""
+
+    name = "survey builder"
+    LOCATORS = {
+        "text": (By.ID, "qText"),
+        "type": (By.ID, "qType"),
+        "options": (By.ID, "qOptions"),
+        "options group": (By.ID, "optionsGroup"),
+        "condition": (By.ID, "enableCond"),
+        "condition question": (By.ID, "condQuestion"),
+        "condition value": (By.ID, "condValue"),
+        "new": (By.ID, "newQuestionBtn"),
+        "save": (By.ID, "saveQuestionBtn"),
+        "create": (By.ID, "createSurveyBtn"),
+        "code": (By.ID, "surveyCode"),
+        "load code": (By.ID, "loadSurveyCode"),
+        "load": (By.ID, "loadSurveyBtn"),
+        "items": (By.CLASS_NAME, "q-item", MANY),
+        "preview questions": (By.CSS_SELECTOR, "#previewForm > div", MANY),
+        "preview labels": (By.CSS_SELECTOR, "#previewForm label", MANY),
+        "preview radio": (By.CSS_SELECTOR, "#previewForm input[type=radio][value=\"{}\"]"),
+    }
+
+    def add_question(self, text, qtype, options=(), condition=None, save=True):
+        """Fill the builder form (and optionally save) in one call.
+
+        condition is (question_index, answer) for conditional questions.
+        """
+        steps = [("qText", text), ("qType", qtype)]
+        if options:
+            steps.append(("qOptions", "\n".join(options)))
+        if condition is not None:
+            steps += [("enableCond", True), ("condQuestion", str(condition[0])),
+                      ("condValue", condition[1])]
+        if save:
+            steps.append(("saveQuestionBtn", CLICK))
+        self.run(*steps)
+
+    def question_items(self):
+        return self.texts(".q-item")
+
+    def preview(self):
+        """Labels of the preview questions and how many inputs of each kind they have."""
+        return self.driver.execute_script("""
+            const form = document.getElementById('previewForm');
+            return Array.from(form.children).map(w => ({
+              label: w.querySelector('label') ? w.querySelector('label').innerText : null,
+              displayed: w.style.display !== 'none',
+              radios: w.querySelectorAll('input[type=radio]').length,
+              checkboxes: w.querySelectorAll('input[type=checkbox]').length,
+              selects: w.querySelectorAll('select').length,
+              textareas: w.querySelectorAll('textarea').length,
+            }));
+        """)
+
+
+class SurveyRunnerPage(Page):
+    """project3/survey.html?code=..."""
+
+    name = "survey"
+    LOCATORS = {
+        "questions": (By.CSS_SELECTOR, "#surveyForm .q-wrap", MANY),
+        "submit": (By.CSS_SELECTOR, "#surveyForm button[type=submit]"),
+        "error": (By.CSS_SELECTOR, "body > p"),
+    }
+
+    def questions(self):
+        return self.driver.execute_script(_HELPERS_JS + """
+            return Array.from(document.querySelectorAll('#surveyForm .q-wrap')).map(w => ({
+              index: Number(w.dataset.idx),
+              label: w.querySelector('label').innerText,
+              displayed: visible(w),
+            }));
+        """)
+
+    def answer(self, answers):
+        """Answer several questions at once: {index: value or [values] for checkboxes}."""
+        missing = self.driver.execute_script(_HELPERS_JS + """
+            const missing = [];
+            for (const [idx, value] of Object.entries(arguments[0])) {
+              const inputs = document.querySelectorAll(`[name="q${idx}"]`);
+              if (!inputs.length) { missing.push(idx); continue; }
+              const wanted = Array.isArray(value) ? value.map(String) : [String(value)];
+              inputs.forEach(el => {
+                if (el.type === 'radio' || el.type === 'checkbox') setValue(el, wanted.includes(el.value));
+                else setValue(el, wanted[0]);
+              });
+            }
+            return missing;
+        """, {str(k): v for k, v in answers.items()})
+        if missing:
+            raise PageError(f"{self.name}: no question {', '.join(missing)} to answer")
+
+
+class GoogleSignInPage(Page):
+    """The sign-in popup served by testkit.oauth_stub."""
+
+    name = "Google sign-in"
+    LOCATORS = {
+        "identifier": (By.NAME, "identifier"),
+        "identifier next": (By.CSS_SELECTOR, "#identifierNext button"),
+        "password": (By.NAME, "Passwd"),
+        "password next": (By.CSS_SELECTOR, "#passwordNext button"),
+        "error": (By.CSS_SELECTOR, "[role=alert]"),
+    }
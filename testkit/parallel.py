@@ -0,0 +1,270 @@
+"""Run a Selenium suite sharded across worker processes.
+
+Usage (from the repository root):
+
+    python -m testkit.parallel project3/test.py -n 4
+    python -m testkit.parallel project1/test.py project3/test.py -n 8
+    python -m testkit.parallel project3/test.py --changed-only
+
+Every worker imports the suite on its own, so it starts its own static
+server on a free port and its own headless Chrome. Tests are dealt out
+longest-first from their recorded durations, recently failing ones first
+(see testkit.schedule; --schedule round-robin for the old dealing). The
+outcomes of all workers are merged into a single unittest-style report,
+followed by the predicted and actual time of every worker. With
+--changed-only, tests that passed before and whose pages, scripts and
+Python modules are unchanged are not run again (see testkit.impact).
+"""
+
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+import unittest
+
+from testkit import impact, schedule
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def module_name(path):
+    """Stable import name for a suite file, e.g. project3/test.py -> project3_test."""
+    rel = os.path.relpath(os.path.abspath(path), ROOT)
+    return os.path.splitext(rel)[0].replace(os.sep, "_").replace("-", "_")
+
+
+def load_suite_module(path):
+    path = os.path.abspath(path)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location(module_name(path), path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def iter_tests(suite):
+    for item in suite:
+        if isinstance(item, unittest.TestSuite):
+            yield from iter_tests(item)
+        else:
+            yield item
+
+
+def collect(paths):
+    """Return (path, "Class.test_method") pairs for every test in the given files."""
+    found = []
+    for path in paths:
+        module = load_suite_module(path)
+        suite = unittest.defaultTestLoader.loadTestsFromModule(module)
+        for test in iter_tests(suite):
+            found.append((path, f"{type(test).__name__}.{test._testMethodName}"))
+    return found
+
+
+def shard(tests, workers):
+    """Deal tests round-robin into at most `workers` non-empty shards."""
+    shards = [[] for _ in range(workers)]
+    for i, test in enumerate(tests):
+        shards[i % workers].append(test)
+    return [s for s in shards if s]
+
+
+class RecordingResult(schedule.ListeningResult):
+    """TestResult that keeps picklable outcome records instead of exc_info tuples."""
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = True
+        self.records = []
+        self._started = {}
+
+    def startTest(self, test):
+        super().startTest(test)
+        impact.RECORDER.start()
+        self._started[test.id()] = time.perf_counter()
+
+    def _record(self, test, outcome, details=""):
+        started = self._started.pop(test.id(), None)
+        duration = time.perf_counter() - started if started is not None else 0.0
+        self.records.append({
+            "id": test.id(),
+            "description": str(test),
+            "outcome": outcome,
+            "details": details,
+            "duration": duration,
+            "served": sorted(impact.RECORDER.stop()),
+        })
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._record(test, "ok")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._record(test, "fail", self.failures[-1][1])
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._record(test, "error", self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._record(test, "skip", reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._record(test, "ok")
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._record(test, "fail", "unexpected success")
+
+
+def run_shard(job):
+    """Worker entry point: run one shard; returns its outcome records and timings."""
+    worker, tests = job
+    os.environ["CS458_WORKER"] = str(worker)
+    os.environ["CS458_HEADLESS"] = "1"
+    impact.RECORDER.enable()
+    hasher = impact.FileHasher()
+    records = []
+    setup = {}
+    shard_started = time.perf_counter()
+    by_path = {}
+    for path, name in tests:
+        by_path.setdefault(path, []).append(name)
+    for path, names in by_path.items():
+        try:
+            started = time.perf_counter()
+            module = load_suite_module(path)
+            suite = unittest.defaultTestLoader.loadTestsFromNames(names, module)
+            result = RecordingResult()
+            suite.run(result)
+            # Import, setUpModule/setUpClass and teardown: everything but the tests
+            setup[module_name(path)] = time.perf_counter() - started - sum(
+                r["duration"] for r in result.records)
+            modules = impact.python_inputs()
+            for r in result.records:
+                r["inputs"] = impact.fingerprint(modules.union(r.pop("served")), hasher)
+            records.extend(result.records)
+        except Exception:
+            records.append({
+                "id": f"{module_name(path)} (worker {worker})",
+                "description": path,
+                "outcome": "error",
+                "details": traceback.format_exc(),
+                "duration": 0.0,
+            })
+    return {"worker": worker, "records": records, "setup": setup,
+            "wall": time.perf_counter() - shard_started}
+
+
+def schedule_report(plan, outcomes, bound, elapsed, stream=sys.stderr):
+    """Predicted against actual time, per worker and for the whole run."""
+    predicted = max((load for load, _ in plan), default=0.0)
+    stream.write(f"[SCHEDULE] {len(plan)} workers: predicted {predicted:.1f}s "
+                 f"(lower bound {bound:.1f}s), actual {elapsed:.1f}s\n")
+    for (load, tests), out in zip(plan, outcomes):
+        stream.write(f"[SCHEDULE]   worker {out['worker']}: {len(tests):3d} tests, "
+                     f"predicted {load:6.1f}s, actual {out['wall']:6.1f}s\n")
+    stream.flush()
+
+
+def report(records, elapsed, stream=sys.stderr):
+    """Print the merged records the way unittest.TextTestRunner would."""
+    failures = [r for r in records if r["outcome"] == "fail"]
+    errors = [r for r in records if r["outcome"] == "error"]
+    skipped = [r for r in records if r["outcome"] == "skip"]
+
+    stream.write("".join({"ok": ".", "fail": "F", "error": "E", "skip": "s"}[r["outcome"]]
+                         for r in records) + "\n")
+    for label, items in (("ERROR", errors), ("FAIL", failures)):
+        for r in items:
+            stream.write("=" * 70 + "\n")
+            stream.write(f"{label}: {r['description']}\n")
+            stream.write("-" * 70 + "\n")
+            stream.write(r["details"] + "\n")
+    stream.write("-" * 70 + "\n")
+    stream.write(f"Ran {len(records)} tests in {elapsed:.3f}s\n\n")
+    if failures or errors:
+        parts = [f"failures={len(failures)}"] if failures else []
+        parts += [f"errors={len(errors)}"] if errors else []
+        parts += [f"skipped={len(skipped)}"] if skipped else []
+        stream.write(f"FAILED ({', '.join(parts)})\n")
+    else:
+        stream.write(f"OK (skipped={len(skipped)})\n" if skipped else "OK\n")
+    stream.flush()
+    return not (failures or errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("suites", nargs="+", help="test.py files to run")
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="skip tests that passed before with identical inputs")
+    parser.add_argument("--schedule", choices=("lpt", "round-robin"), default="lpt",
+                        help="deal tests longest-first from history (default) or round-robin")
+    args = parser.parse_args(argv)
+
+    def test_id(test):
+        return f"{module_name(test[0])}.{test[1]}"
+
+    tests = collect(args.suites)
+    store = impact.load_store()
+    cached = []
+    if args.changed_only:
+        tests, cached = impact.select(tests, test_id, store)
+    history = schedule.load_history()
+    estimates = schedule.Estimates(history)
+    workers = max(1, args.workers)
+    module_of = lambda test: module_name(test[0])
+    if args.schedule == "lpt":
+        plan = schedule.lpt(tests, workers, test_id, estimates, module_of)
+    else:
+        plan = [(sum(estimates.duration(test_id(t)) for t in s)
+                 + sum(estimates.setup(m) for m in {module_of(t) for t in s}), s)
+                for s in shard(tests, workers)]
+    from testkit import profiler
+    profile = profiler.report_path()
+    if profile:
+        profiler.remove_worker_reports(profile)
+    started = time.perf_counter()
+    outcomes = []
+    if plan:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes=len(plan)) as pool:
+            outcomes = pool.map(run_shard, list(enumerate(s for _, s in plan)))
+    elapsed = time.perf_counter() - started
+    records = [r for out in outcomes for r in out["records"]]
+    impact.save_store(impact.update(store, records))
+    schedule.record(history, [r for r in records if "inputs" in r])  # not worker crashes
+    for module in {m for out in outcomes for m in out["setup"]}:
+        seconds = [out["setup"][module] for out in outcomes if module in out["setup"]]
+        schedule.record_setup(history, module, sum(seconds) / len(seconds))
+    schedule.save_history(history)
+    if cached:
+        sys.stderr.write(f"{len(cached)} unchanged tests not re-run "
+                         f"(saved {sum(e['duration'] for _, e in cached):.1f}s); "
+                         f"drop --changed-only to run them\n")
+    records += [{"id": f"{module_name(path)}.{name}", "description": name, "outcome": "ok",
+                 "details": "cached", "duration": 0.0} for (path, name), _ in cached]
+    ok = report(records, elapsed)
+    if plan:
+        schedule_report(plan, outcomes, schedule.lower_bound(tests, workers, test_id, estimates, module_of),
+                        elapsed)
+
+    if profile:
+        profiler.merge([profiler.worker_report(profile, out["worker"]) for out in outcomes], profile)
+        sys.stderr.write(f"Profile written to {profile}\n")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
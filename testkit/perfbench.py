@@ -0,0 +1,229 @@
+"""Page load benchmark for the web pages, with baselines and regression checks.
+
+    python -m testkit.perfbench                    # compare with the baseline
+    python -m testkit.perfbench --update-baseline  # record a new baseline
+    python -m testkit.perfbench --threshold 0.5 --sizes 10,100,1000
+
+Loads project1/index.html, project3/index.html, survey-builder.html and
+survey.html with generated surveys of several sizes in headless Chrome
+(cache disabled, sign-in providers served by testkit.oauth_stub), and takes
+the median of --repeat loads of:
+
+* navigation timing: DOMContentLoaded and load, from navigation start;
+* DevTools Performance.getMetrics: script and task time, layouts, style
+  recalculations, JS heap in use once the page has settled;
+* long tasks (over 50 ms), from a PerformanceObserver installed before any
+  page script runs.
+
+Results are compared with the baseline in .cs458-cache/perf-baseline.json
+(--baseline to keep it elsewhere). A metric regresses when it is worse by
+more than its relative threshold *and* by more than a small absolute slack,
+so noise on tiny numbers does not fail the run. The exit status is 1 on any
+regression, so the benchmark can gate CI like a test suite.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+
+from testkit import config, waits
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_VERSION = 1
+SIZES = (10, 100, 500)
+
+# metric -> (relative threshold, absolute slack below which a change is noise)
+THRESHOLDS = {
+    "dom_content_loaded_ms": (0.25, 20.0),
+    "load_ms": (0.25, 20.0),
+    "script_ms": (0.25, 10.0),
+    "task_ms": (0.25, 20.0),
+    "long_tasks": (0.0, 1),
+    "long_task_ms": (0.25, 50.0),
+    "layouts": (0.25, 2),
+    "style_recalcs": (0.25, 2),
+    "heap_mb": (0.25, 0.5),
+}
+
+_LONG_TASKS_JS = """
+window.__cs458LongTasks = [];
+try {
+  new PerformanceObserver(list => {
+    for (const e of list.getEntries()) window.__cs458LongTasks.push(e.duration);
+  }).observe({type: 'longtask', buffered: true});
+} catch (e) {}
+"""
+
+_PAGE_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const tasks = window.__cs458LongTasks || [];
+return {
+  dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+  load_ms: nav ? nav.loadEventEnd : null,
+  long_tasks: tasks.length,
+  long_task_ms: tasks.reduce((a, b) => a + b, 0),
+};
+"""
+
+
+def baseline_path():
+    return os.path.join(config.cache_dir(), "perf-baseline.json")
+
+
+def load_baseline(path=None):
+    try:
+        with open(path or baseline_path(), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get("scenarios", {}) if data.get("version") == BASELINE_VERSION else {}
+
+
+def save_baseline(scenarios, path=None):
+    with open(path or baseline_path(), "w", encoding="utf-8") as f:
+        json.dump({"version": BASELINE_VERSION, "scenarios": scenarios}, f, indent=1, sort_keys=True)
+
+
+def compare(baseline, current, thresholds=THRESHOLDS, scale=1.0):
+    """[(scenario, metric, baseline, current, change)] of every regression past its threshold."""
+    regressions = []
+    for scenario, metrics in sorted(current.items()):
+        for metric, value in sorted(metrics.items()):
+            before = baseline.get(scenario, {}).get(metric)
+            if before is None or value is None or metric not in thresholds:
+                continue
+            relative, slack = thresholds[metric]
+            if value - before > slack and value > before * (1 + relative * scale):
+                change = (value - before) / before if before else float("inf")
+                regressions.append((scenario, metric, before, value, change))
+    return regressions
+
+
+def scenarios(sizes):
+    """(name, site, path) of every page to load; site is "project1" or "project3"."""
+    sys.path.insert(0, os.path.join(ROOT, "project3"))
+    import surveycode
+    from bench_surveycode import make_survey
+
+    found = [("project1 index", "project1", "index.html"),
+             ("project3 index", "project3", "index.html"),
+             ("survey builder", "project3", "survey-builder.html")]
+    for n in sizes:
+        found.append((f"survey {n} questions", "project3",
+                      f"survey.html?code={surveycode.encode(make_survey(n))}"))
+    return found
+
+
+class PageBench:
+    """Loads pages in one browser and reads their metrics."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+        driver.execute_cdp_cmd("Performance.enable", {"timeDomain": "threadTicks"})
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _LONG_TASKS_JS})
+
+    def _metrics(self):
+        result = self.driver.execute_cdp_cmd("Performance.getMetrics", {})
+        return {m["name"]: m["value"] for m in result["metrics"]}
+
+    def load(self, url):
+        self.driver.get("about:blank")
+        before = self._metrics()
+        self.driver.get(url)
+        waits.dom_settled(self.driver, quiet=0.2, timeout=10)
+        after = self._metrics()
+        delta = lambda name: max(0.0, after.get(name, 0.0) - before.get(name, 0.0))
+        metrics = self.driver.execute_script(_PAGE_JS)
+        metrics.update({
+            "script_ms": delta("ScriptDuration") * 1000,
+            "task_ms": delta("TaskDuration") * 1000,
+            "layouts": delta("LayoutCount"),
+            "style_recalcs": delta("RecalcStyleCount"),
+            "heap_mb": after.get("JSHeapUsedSize", 0.0) / (1 << 20),
+        })
+        return metrics
+
+    def measure(self, url, repeat):
+        runs = [self.load(url) for _ in range(repeat)]
+        return {metric: statistics.median(r[metric] for r in runs)
+                if all(r[metric] is not None for r in runs) else None
+                for metric in runs[0]}
+
+
+def run(sizes=SIZES, repeat=5, stream=sys.stdout):
+    from testkit import browser
+    from testkit.oauth_stub import OAuthStub
+    from testkit.server import StaticServer
+
+    os.environ["CS458_HEADLESS"] = "1"
+    servers = {site: StaticServer(os.path.join(ROOT, site)).start() for site in ("project1", "project3")}
+    oauth = OAuthStub().start()
+    driver = browser.chrome(browser.NO_SANDBOX_ARGS)
+    try:
+        oauth.install(driver)
+        bench = PageBench(driver)
+        results = {}
+        for name, site, path in scenarios(sizes):
+            results[name] = bench.measure(servers[site].url_for(path), repeat)
+            stream.write(f"  measured {name}\n")
+            stream.flush()
+        return results
+    finally:
+        driver.quit()
+        oauth.stop()
+        for server in servers.values():
+            server.stop()
+
+
+def report(baseline, current, regressions, stream=sys.stdout):
+    bad = {(s, m) for s, m, *_ in regressions}
+    for scenario, metrics in sorted(current.items()):
+        stream.write(f"{scenario}\n")
+        for metric, value in sorted(metrics.items()):
+            before = baseline.get(scenario, {}).get(metric)
+            shown = "-" if value is None else f"{value:.2f}"
+            line = f"  {metric:<22} {shown:>10}"
+            if before is not None and value is not None:
+                line += f"  baseline {before:10.2f}"
+                if before:
+                    line += f"  {(value - before) / before:+7.1%}"
+                if (scenario, metric) in bad:
+                    line += "  REGRESSION"
+            stream.write(line + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Page load benchmark with regression thresholds.")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="survey sizes (questions) for survey.html, comma separated")
+    parser.add_argument("--repeat", type=int, default=5, help="loads per page (median is kept)")
+    parser.add_argument("--threshold", type=float, default=1.0,
+                        help="scale every relative threshold (2 allows twice the usual slowdown)")
+    parser.add_argument("--baseline", help=f"baseline file (default {baseline_path()})")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store this run as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    current = run([int(n) for n in args.sizes.split(",") if n], args.repeat)
+    baseline = load_baseline(args.baseline)
+    if args.update_baseline or not baseline:
+        merged = dict(baseline, **current)
+        save_baseline(merged, args.baseline)
+        report({}, current, [])
+        print(f"baseline written to {args.baseline or baseline_path()}")
+        return 0
+    regressions = compare(baseline, current, scale=args.threshold)
+    report(baseline, current, regressions)
+    if regressions:
+        print(f"{len(regressions)} metrics regressed past their thresholds")
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
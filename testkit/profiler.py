@@ -0,0 +1,194 @@
+"""Per-command latency profiler for the Selenium and Appium suites.
+
+Enable it with CS458_PROFILE=<report.json> (or CS458_PROFILE=1 for
+.cs458-cache/profile.json). When enabled:
+
+* `attach(driver)` times every WebDriver/Appium command the driver sends;
+* every testkit.waits wait and every `profiler.sleep()` is recorded as well;
+* each record is tagged with the test that was running (through
+  testkit.schedule's result hooks, so under `schedule.main()` and
+  testkit.parallel).
+
+`finish()` writes a JSON report with totals, a per-test breakdown and the
+slowest individual commands. Recording is one perf_counter pair and a
+tuple append per command, so it can stay on in CI. When disabled,
+`attach()` returns the driver untouched.
+"""
+
+import glob
+import json
+import os
+import time
+
+from testkit import config, schedule, waits
+
+
+def report_path():
+    """Where this process writes its report, or None when profiling is off."""
+    value = os.environ.get("CS458_PROFILE", "")
+    if value in ("", "0"):
+        return None
+    path = os.path.join(config.cache_dir(), "profile.json") if value == "1" else value
+    if "CS458_WORKER" in os.environ:
+        path = worker_report(path, config.worker_id())
+    return path
+
+
+def worker_report(path, worker):
+    """Where parallel worker `worker` writes its part of the report at `path`."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.w{worker}{ext}"
+
+
+def remove_worker_reports(path):
+    """Delete the worker parts left next to `path` by earlier runs."""
+    for stale in glob.glob(worker_report(glob.escape(path), "*")):
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+
+
+def _describe(command, params):
+    if not params:
+        return command
+    if "using" in params and "value" in params:
+        return f"{command} {params['using']}={params['value']}"
+    if "script" in params:
+        script = " ".join(str(params["script"]).split())
+        return f"{command} {script[:60]}"
+    if "url" in params:
+        return f"{command} {params['url']}"
+    return command
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.current_test = None
+        self.events = []        # (test, kind, name, seconds, params)
+        self.tests = {}         # test id -> wall seconds
+        self._test_started = None
+
+    # ------------------------------------------------------------- hooks
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        waits.listeners.append(self._on_wait)
+        schedule.listeners.append(self._on_test)
+
+    def attach(self, driver):
+        """Time every command `driver` sends; returns the same driver."""
+        if not self.enabled:
+            return driver
+        execute = driver.execute
+        events = self.events
+
+        def timed_execute(driver_command, params=None):
+            started = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                events.append((self.current_test, "command", driver_command,
+                               time.perf_counter() - started, params))
+
+        driver.execute = timed_execute
+        return driver
+
+    def _on_wait(self, record):
+        self.events.append((self.current_test, "wait", record.label, record.seconds, None))
+
+    def _on_test(self, event, test):
+        if event == "start":
+            self.start_test(test.id())
+        else:
+            self.stop_test()
+
+    def sleep(self, seconds):
+        """time.sleep() that shows up in the report (for deliberate pauses in tests)."""
+        started = time.perf_counter()
+        time.sleep(seconds)
+        if self.enabled:
+            self.events.append((self.current_test, "sleep", f"sleep({seconds})",
+                                time.perf_counter() - started, None))
+
+    def start_test(self, test_id):
+        self.current_test = test_id
+        self._test_started = time.perf_counter()
+
+    def stop_test(self):
+        if self.current_test is not None and self._test_started is not None:
+            self.tests[self.current_test] = time.perf_counter() - self._test_started
+        self.current_test = None
+        self._test_started = None
+
+    # ------------------------------------------------------------ report
+
+    def report(self, top=20):
+        per_test = {}
+        totals = {"command": 0.0, "wait": 0.0, "sleep": 0.0}
+        counts = {"command": 0, "wait": 0, "sleep": 0}
+        for test, kind, name, seconds, _ in self.events:
+            totals[kind] += seconds
+            counts[kind] += 1
+            entry = per_test.setdefault(test or "(fixtures)", {
+                "wall": self.tests.get(test),
+                "command_time": 0.0, "wait_time": 0.0, "sleep_time": 0.0,
+                "commands": 0, "by_command": {},
+            })
+            entry[f"{kind}_time"] += seconds
+            if kind == "command":
+                entry["commands"] += 1
+                stat = entry["by_command"].setdefault(name, {"count": 0, "seconds": 0.0})
+                stat["count"] += 1
+                stat["seconds"] += seconds
+        slowest = sorted(self.events, key=lambda e: e[3], reverse=True)[:top]
+        return {
+            "totals": {k: {"count": counts[k], "seconds": totals[k]} for k in totals},
+            "tests": per_test,
+            "slowest": [
+                {"test": t, "kind": k, "name": _describe(n, p), "seconds": s}
+                for t, k, n, s, p in slowest
+            ],
+        }
+
+    def finish(self, top=20):
+        """Write the report if profiling is on; returns its path."""
+        path = report_path()
+        if not self.enabled or path is None:
+            return None
+        with open(path, "w") as f:
+            json.dump(self.report(top), f, indent=2)
+        return path
+
+
+def merge(paths, out_path, top=20):
+    """Combine worker reports (as written by finish()) into one file."""
+    merged = {"totals": {}, "tests": {}, "slowest": []}
+    for path in paths:
+        try:
+            with open(path) as f:
+                part = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for kind, stat in part["totals"].items():
+            acc = merged["totals"].setdefault(kind, {"count": 0, "seconds": 0.0})
+            acc["count"] += stat["count"]
+            acc["seconds"] += stat["seconds"]
+        merged["tests"].update(part["tests"])
+        merged["slowest"].extend(part["slowest"])
+    merged["slowest"] = sorted(merged["slowest"], key=lambda e: e["seconds"], reverse=True)[:top]
+    with open(out_path, "w") as f:
+        json.dump(merged, f, indent=2)
+    return out_path
+
+
+PROFILER = Profiler()
+if report_path() is not None:
+    PROFILER.enable()
+
+attach = PROFILER.attach
+finish = PROFILER.finish
+sleep = PROFILER.sleep
@@ -0,0 +1,249 @@
+"""Test order from history: recent failures first, then longest first.
+
+Every run of the three suites (`python test.py` through `schedule.main()`,
+or testkit.parallel) adds to .cs458-cache/history.json, per test:
+
+* `duration`: exponentially weighted mean of its run time;
+* `fail_rate`: the same over outcomes (1 for fail/error, 0 for pass);
+* `last`: the last outcome.
+
+And per suite module, `setup`: how long its module and class fixtures took
+(browser launch, Appium session, ...).
+
+Ordering puts tests that failed last time (or fail often) first, so a broken
+change shows up in seconds, and the rest longest first. The parallel runner
+deals them out longest-processing-time-first: each test goes to the worker
+with the least predicted work so far (counting the suite's setup once per
+worker that runs any of its tests), so no worker is left with one slow
+straggler at the end. Inside a shard, tests of one class stay together so
+setUpClass runs once. Both print the predicted wall time next to the actual
+one. Tests without history count as the median known duration.
+"""
+
+import heapq
+import json
+import os
+import statistics
+import sys
+import time
+import unittest
+
+from testkit import config
+
+# Hooks called as hook("start", test) before and hook("stop", test) after every
+# test run through HistoryRunner or testkit.parallel (used by the profiler and
+# browser.RecyclingDriver).
+listeners = []
+
+HISTORY_VERSION = 1
+ALPHA = 0.3            # weight of the newest run in the moving averages
+FAILING = 0.25         # fail_rate from which a test counts as recently failing
+DEFAULT_SECONDS = 2.0  # estimate when nothing at all is known
+
+
+def history_path():
+    return os.path.join(config.cache_dir(), "history.json")
+
+
+def load_history(path=None):
+    try:
+        with open(path or history_path(), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {"tests": {}, "setup": {}}
+    if data.get("version") != HISTORY_VERSION:
+        return {"tests": {}, "setup": {}}
+    return {"tests": data.get("tests", {}), "setup": data.get("setup", {})}
+
+
+def save_history(history, path=None):
+    """Write `history` over what is on disk now (other suites may have saved meanwhile)."""
+    path = path or history_path()
+    current = load_history(path)
+    current["tests"].update(history["tests"])
+    current["setup"].update(history["setup"])
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dict(current, version=HISTORY_VERSION), f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _ewma(old, new):
+    return new if old is None else ALPHA * new + (1 - ALPHA) * old
+
+
+def record(history, records):
+    """Fold outcome records ({"id", "outcome", "duration"}) into the history."""
+    for r in records:
+        if r["outcome"] == "skip" or r.get("details") == "cached":
+            continue
+        entry = history["tests"].setdefault(r["id"], {"duration": None, "fail_rate": None, "runs": 0})
+        entry["duration"] = _ewma(entry["duration"], r["duration"])
+        entry["fail_rate"] = _ewma(entry["fail_rate"], 0.0 if r["outcome"] == "ok" else 1.0)
+        entry["runs"] += 1
+        entry["last"] = r["outcome"]
+    return history
+
+
+def record_setup(history, module, seconds):
+    history["setup"][module] = _ewma(history["setup"].get(module), seconds)
+
+
+# ------------------------------------------------------------------ ordering
+
+class Estimates:
+    """Predicted duration and failing flag for test ids, from one history."""
+
+    def __init__(self, history):
+        self.history = history
+        known = [e["duration"] for e in history["tests"].values() if e.get("duration") is not None]
+        self.default = statistics.median(known) if known else DEFAULT_SECONDS
+
+    def duration(self, test_id):
+        entry = self.history["tests"].get(test_id)
+        return entry["duration"] if entry and entry.get("duration") is not None else self.default
+
+    def failing(self, test_id):
+        entry = self.history["tests"].get(test_id)
+        return bool(entry) and (entry.get("last") in ("fail", "error")
+                                or (entry.get("fail_rate") or 0) >= FAILING)
+
+    def setup(self, module):
+        return self.history["setup"].get(module, 0.0)
+
+    def priority(self, test_id):
+        return (not self.failing(test_id), -self.duration(test_id))
+
+
+def _class_of(test_id):
+    return test_id.rsplit(".", 1)[0]
+
+
+def order(tests, test_id, estimates):
+    """Tests grouped by class, failing/longest classes first, failing/longest tests first inside."""
+    groups = {}
+    for test in tests:
+        groups.setdefault(_class_of(test_id(test)), []).append(test)
+    for members in groups.values():
+        members.sort(key=lambda t: estimates.priority(test_id(t)))
+    ranked = sorted(groups.values(), key=lambda members: (
+        estimates.priority(test_id(members[0]))[0],
+        -sum(estimates.duration(test_id(t)) for t in members)))
+    return [t for members in ranked for t in members]
+
+
+def lpt(tests, workers, test_id, estimates, module_of):
+    """Longest-processing-time-first shards: [(predicted seconds, [tests in run order])].
+
+    A worker pays a suite module's setup once, with the first test it gets from it.
+    """
+    heap = [(0.0, w) for w in range(max(1, min(workers, len(tests))))]
+    shards = {w: (set(), []) for _, w in heap}
+    for test in sorted(tests, key=lambda t: estimates.priority(test_id(t))):
+        load, w = heapq.heappop(heap)
+        modules, placed = shards[w]
+        if module_of(test) not in modules:
+            modules.add(module_of(test))
+            load += estimates.setup(module_of(test))
+        placed.append(test)
+        heapq.heappush(heap, (load + estimates.duration(test_id(test)), w))
+    loads = {w: load for load, w in heap}
+    return [(loads[w], order(placed, test_id, estimates))
+            for w, (_, placed) in sorted(shards.items()) if placed]
+
+
+def lower_bound(tests, workers, test_id, estimates, module_of):
+    """No schedule of these tests on `workers` workers can finish sooner than this."""
+    durations = [estimates.duration(test_id(t)) for t in tests]
+    setup = min((estimates.setup(module_of(t)) for t in tests), default=0.0)
+    return setup + max(sum(durations) / max(1, min(workers, len(tests))), max(durations, default=0.0))
+
+
+# ------------------------------------------------------------- direct runs
+
+def test_key(test):
+    """History id of a test: module named after its file (as testkit.parallel loads it)."""
+    from testkit.parallel import module_name
+
+    module = sys.modules.get(type(test).__module__)
+    path = getattr(module, "__file__", None)
+    name = module_name(path) if path else type(test).__module__
+    return f"{name}.{type(test).__name__}.{test._testMethodName}"
+
+
+class ListeningResult(unittest.TestResult):
+    """TestResult that calls `listeners` around every test."""
+
+    def startTest(self, test):
+        for listener in list(listeners):
+            listener("start", test)
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        for listener in list(listeners):
+            listener("stop", test)
+
+
+class _TimedResult(ListeningResult, unittest.TextTestResult):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.records = []
+        self._started = None
+
+    def startTest(self, test):
+        self._started = time.perf_counter()
+        super().startTest(test)
+
+    def _add(self, test, outcome):
+        duration = time.perf_counter() - self._started if self._started else 0.0
+        self.records.append({"id": test_key(test), "outcome": outcome, "duration": duration})
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self._add(test, "ok")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._add(test, "fail")
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        if hasattr(test, "_testMethodName"):  # not a setUpClass/setUpModule error
+            self._add(test, "error")
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._add(test, "skip")
+
+
+class HistoryRunner(unittest.TextTestRunner):
+    """TextTestRunner that orders tests from history and records this run in it."""
+
+    resultclass = _TimedResult
+
+    def run(self, test):
+        from testkit.parallel import iter_tests
+
+        history = load_history()
+        estimates = Estimates(history)
+        tests = order(list(iter_tests(test)), test_key, estimates)
+        modules = {test_key(t).rsplit(".", 2)[0] for t in tests}
+        predicted = sum(estimates.duration(test_key(t)) for t in tests) \
+            + sum(estimates.setup(m) for m in modules)
+        failing = sum(1 for t in tests if estimates.failing(test_key(t)))
+        started = time.perf_counter()
+        result = super().run(unittest.TestSuite(tests))
+        actual = time.perf_counter() - started
+        record(history, result.records)
+        if len(modules) == 1 and result.records and result.testsRun == len(tests):
+            record_setup(history, modules.pop(), actual - sum(r["duration"] for r in result.records))
+        save_history(history)
+        self.stream.writeln(f"[SCHEDULE] {len(tests)} tests ({failing} recently failing run first): "
+                            f"predicted {predicted:.1f}s, actual {actual:.1f}s")
+        return result
+
+
+def main(**kwargs):
+    """unittest.main() with the history-ordered runner."""
+    return unittest.main(testRunner=HistoryRunner, **kwargs)
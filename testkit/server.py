@@ -0,0 +1,272 @@
+"""In-process static file server for the web suites.
+
+Replaces `python3 -m http.server 3000`:
+
+* binds an ephemeral port, so concurrent runs never collide;
+* answers requests on a thread pool instead of one request at a time, and
+  closes keep-alive connections that stay idle for `idle_timeout` seconds
+  so idle clients cannot hold every worker;
+* `start()` returns only after a probe request has been answered;
+* keeps files in memory, gzip-compressed up front, and sends ETag /
+  Cache-Control: no-cache so repeat loads are 304 Not Modified.
+
+Cached entries are revalidated against the file's mtime and size on every
+request, so edits on disk are picked up without restarting.
+
+It can also run on its own (the load generator does this):
+
+    python -m testkit.server project3 --port 8000
+"""
+
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+PRELOAD = (".html", ".js", ".css")
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+def content_length(headers):
+    """A request's Content-Length (0 when absent), or None when it is not a plain number.
+
+    A negative length would make rfile.read() wait for the client to close a
+    keep-alive connection, so callers answer 400 and close instead.
+    """
+    value = headers.get("Content-Length") or "0"
+    return int(value) if value.isascii() and value.isdigit() else None
+
+
+class Asset:
+    __slots__ = ("body", "gzipped", "etag", "content_type", "stamp")
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.body = f.read()
+        st = os.stat(path)
+        self.stamp = (st.st_mtime_ns, st.st_size)
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type == "application/javascript":
+            self.content_type += "; charset=utf-8"
+        self.etag = '"%s"' % hashlib.sha1(self.body).hexdigest()
+        self.gzipped = None
+        if self.content_type.startswith(COMPRESSIBLE) and len(self.body) > 256:
+            self.gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+
+
+class _PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each connection to a thread pool."""
+
+    # the default backlog of 5 drops SYNs (1 s retransmit) when many clients connect at once
+    request_queue_size = 1024
+
+    def __init__(self, address, handler, workers):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="static")
+        self.open_connections = set()
+
+    def process_request(self, request, client_address):
+        self.open_connections.add(request)
+        self.pool.submit(self._work, request, client_address)
+
+    def _work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.open_connections.discard(request)
+            self.shutdown_request(request)
+
+    def handle_error(self, request, client_address):
+        pass  # browsers drop keep-alive connections all the time
+
+    def server_close(self):
+        super().server_close()
+        # Idle keep-alive connections would otherwise pin pool threads until exit
+        for conn in list(self.open_connections):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.pool.shutdown(wait=True)
+
+
+class StaticServer:
+    def __init__(self, root, host="127.0.0.1", port=0, workers=16, idle_timeout=5.0):
+        self.root = os.path.abspath(root)
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.idle_timeout = idle_timeout
+        self.ready = threading.Event()
+        self.startup_ms = None
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    # ------------------------------------------------------------ lifecycle
+
+    def start(self, timeout=5):
+        started = time.perf_counter()
+        for name in os.listdir(self.root):
+            if name.endswith(PRELOAD):
+                self.asset("/" + name)
+        self._httpd = _PooledHTTPServer((self.host, self.port), self._handler(), self.workers)
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._serve, name="static-server", daemon=True)
+        self._thread.start()
+        if not self.ready.wait(timeout):
+            raise RuntimeError(f"static server on port {self.port} did not start")
+        with urllib.request.urlopen(self.url + "/", timeout=timeout):
+            pass
+        self.startup_ms = (time.perf_counter() - started) * 1000
+        return self
+
+    def _serve(self):
+        self.ready.set()
+        self._httpd.serve_forever(poll_interval=0.05)
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self):
+        return f"http://localhost:{self.port}"
+
+    def url_for(self, page):
+        return f"{self.url}/{page.lstrip('/')}"
+
+    # ---------------------------------------------------------------- cache
+
+    def _fs_path(self, url_path):
+        path = posixpath.normpath(urllib.parse.unquote(url_path))
+        parts = [p for p in path.split("/") if p and p not in (".", "..")]
+        full = os.path.join(self.root, *parts)
+        if os.path.isdir(full):
+            full = os.path.join(full, "index.html")
+        return full
+
+    def asset(self, url_path):
+        """Cached Asset for a URL path (query string ignored), or None if missing."""
+        full = self._fs_path(url_path.split("?", 1)[0])
+        try:
+            st = os.stat(full)
+        except OSError:
+            return None
+        cached = self._cache.get(full)
+        if cached is not None and cached.stamp == (st.st_mtime_ns, st.st_size):
+            return cached
+        with self._lock:
+            cached = Asset(full)
+            self._cache[full] = cached
+        return cached
+
+    def etag(self, url_path):
+        """Current ETag of a page, e.g. to notice that a file changed on disk."""
+        asset = self.asset(url_path)
+        return asset.etag if asset else None
+
+    # -------------------------------------------------------------- handler
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; with Nagle on, the body of
+            # every response after the first on a keep-alive connection waits ~40 ms
+            # for the client's delayed ACK
+            disable_nagle_algorithm = True
+            # Each connection holds a pool worker; drop it once the client goes quiet
+            timeout = server.idle_timeout
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._respond(head=True)
+
+            def do_GET(self):
+                self._respond(head=False)
+
+            def _respond(self, head):
+                asset = server.asset(self.path)
+                if asset is None:
+                    body = b"Not Found"
+                    self.send_response(404)
+                    self.send_header("Content-Type", "text/plain")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    if not head:
+                        self.wfile.write(body)
+                    return
+
+                if asset.etag in (self.headers.get("If-None-Match") or ""):
+                    self.send_response(304)
+                    self.send_header("ETag", asset.etag)
+                    self.send_header("Cache-Control", "no-cache")
+                    self.end_headers()
+                    return
+
+                body = asset.body
+                use_gzip = asset.gzipped is not None and \
+                    "gzip" in (self.headers.get("Accept-Encoding") or "")
+                if use_gzip:
+                    body = asset.gzipped
+                self.send_response(200)
+                self.send_header("Content-Type", asset.content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", asset.etag)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Vary", "Accept-Encoding")
+                if use_gzip:
+                    self.send_header("Content-Encoding", "gzip")
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a folder with StaticServer.")
+    parser.add_argument("root")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--idle-timeout", type=float, default=5.0,
+                        help="seconds before an idle keep-alive connection is closed")
+    args = parser.parse_args(argv)
+
+    server = StaticServer(args.root, args.host, args.port, args.workers, args.idle_timeout).start()
+    print(f"Serving {os.path.abspath(args.root)} on {server.url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
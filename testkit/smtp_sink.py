@@ -0,0 +1,224 @@
+"""Local SMTP server that keeps every mail it receives in memory.
+
+The survey app sends its result by e-mail (`_sendEmail` in
+project2/lib/home_page.dart). Built with
+
+    flutter build apk --debug --dart-define=SMTP_HOST=10.0.2.2 --dart-define=SMTP_PORT=2525
+
+it talks to this sink instead of Gmail (10.0.2.2 is the host machine as
+seen from the Android emulator). Tests then block on `wait_for()` until
+the matching mail arrives and check its fields.
+
+Messages are indexed by recipient and by subject, so a lookup does not
+scan everything captured so far. The server is plain asyncio on its own
+thread and handles many concurrent sessions; it speaks just enough SMTP
+(EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) for mailer and smtplib.
+"""
+
+import asyncio
+import email
+import email.policy
+import threading
+import time
+from email.utils import parseaddr
+
+
+class CapturedMail:
+    def __init__(self, seq, mail_from, recipients, data):
+        self.seq = seq
+        self.received = time.time()
+        self.mail_from = mail_from
+        self.recipients = recipients
+        self.data = data
+        self.message = email.message_from_bytes(data, policy=email.policy.default)
+        self.subject = str(self.message["Subject"] or "")
+
+    @property
+    def text(self):
+        part = self.message.get_body(preferencelist=("plain", "html"))
+        return part.get_content() if part is not None else ""
+
+    def fields(self):
+        """"Key: value" lines of the body as a dict (the app's mail is all such lines)."""
+        out = {}
+        for line in self.text.splitlines():
+            key, sep, value = line.strip().partition(": ")
+            if sep:
+                out[key] = value.strip()
+        return out
+
+    def __repr__(self):
+        return f"<CapturedMail #{self.seq} to={self.recipients} subject={self.subject!r}>"
+
+
+class SmtpSink:
+    """In-memory SMTP server on a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=0, max_message=10 << 20):
+        self.host = host
+        self.port = port
+        self.max_message = max_message
+        self.messages = []
+        self.by_recipient = {}
+        self.by_subject = {}
+        self._cond = threading.Condition()
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    # ------------------------------------------------------------- lifecycle
+
+    def start(self, timeout=5):
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._server = self._loop.run_until_complete(asyncio.start_server(
+                    self._session, self.host, self.port, reuse_address=True, backlog=512))
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                return
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="smtp-sink", daemon=True)
+        self._thread.start()
+        if not ready.wait(timeout):
+            raise RuntimeError("SMTP sink did not start")
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+            self._loop = None
+
+    # ----------------------------------------------------------------- lookup
+
+    def mark(self):
+        """Sequence number to pass as `after=` so only later mails match."""
+        with self._cond:
+            return len(self.messages)
+
+    def find(self, to=None, subject=None, after=0, match=None):
+        with self._cond:
+            return self._find(to, subject, after, match)
+
+    def _find(self, to, subject, after, match):
+        if to is not None:
+            candidates = self.by_recipient.get(to.lower(), [])
+        elif subject is not None:
+            candidates = self.by_subject.get(subject, [])
+        else:
+            candidates = self.messages
+        return [m for m in candidates
+                if m.seq >= after
+                and (subject is None or m.subject == subject)
+                and (match is None or match(m))]
+
+    def wait_for(self, to=None, subject=None, timeout=10, after=0, match=None):
+        """Block until a matching mail has arrived; AssertionError after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                found = self._find(to, subject, after, match)
+                if found:
+                    return found[0]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise AssertionError(
+                        f"no mail to={to!r} subject={subject!r} within {timeout}s "
+                        f"({len(self.messages) - after} other mails arrived)")
+                self._cond.wait(remaining)
+
+    def _store(self, mail_from, recipients, data):
+        with self._cond:
+            mail = CapturedMail(len(self.messages), mail_from, recipients, data)
+            self.messages.append(mail)
+            for rcpt in recipients:
+                self.by_recipient.setdefault(rcpt.lower(), []).append(mail)
+            self.by_subject.setdefault(mail.subject, []).append(mail)
+            self._cond.notify_all()
+
+    # --------------------------------------------------------------- protocol
+
+    async def _session(self, reader, writer):
+        def reply(line):
+            writer.write(line.encode("ascii") + b"\r\n")
+
+        mail_from, recipients = None, []
+        reply("220 cs458 smtp sink ready")
+        try:
+            while True:
+                await writer.drain()
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, arg = line.decode("utf-8", "replace").strip().partition(" ")
+                command = command.upper()
+                if command == "EHLO":
+                    writer.write(b"250-cs458 smtp sink\r\n250-8BITMIME\r\n"
+                                 b"250-SMTPUTF8\r\n250 SIZE %d\r\n" % self.max_message)
+                elif command == "HELO":
+                    reply("250 cs458 smtp sink")
+                elif command == "MAIL":
+                    mail_from, recipients = parseaddr(arg.partition(":")[2].split(" ")[0])[1], []
+                    reply("250 OK")
+                elif command == "RCPT":
+                    if mail_from is None:
+                        reply("503 need MAIL first")
+                        continue
+                    recipients.append(parseaddr(arg.partition(":")[2].split(" ")[0])[1])
+                    reply("250 OK")
+                elif command == "DATA":
+                    if not recipients:
+                        reply("503 need RCPT first")
+                        continue
+                    reply("354 end data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    data = await self._read_data(reader)
+                    if data is None:
+                        reply("552 message too large")
+                    else:
+                        self._store(mail_from, recipients, data)
+                        reply("250 OK queued")
+                    mail_from, recipients = None, []
+                elif command == "RSET":
+                    mail_from, recipients = None, []
+                    reply("250 OK")
+                elif command == "NOOP":
+                    reply("250 OK")
+                elif command == "QUIT":
+                    reply("221 bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("502 command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_data(self, reader):
+        lines, size = [], 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise asyncio.IncompleteReadError(b"", None)
+            if line in (b".\r\n", b".\n"):
+                break
+            if line.startswith(b".."):
+                line = line[1:]  # dot-stuffing
+            size += len(line)
+            if size <= self.max_message:
+                lines.append(line)
+        return b"".join(lines) if size <= self.max_message else None
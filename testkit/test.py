@@ -0,0 +1,968 @@
+import unittest
+import base64
+import gzip
+import http.client
+import hashlib
+import json
+import os
+import smtplib
+import socket
+import stat
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from testkit import auth_service, browser, cdp, impact, perfbench, profiler, schedule, waits
+from testkit.appium_pool import SessionPool
+from testkit import auth_state
+from testkit.auth_state import AppLogin, WebLogin
+from testkit.fake_appium import FakeAppium, W3CSession
+from testkit.flutter_snapshot import snapshot
+from testkit.locators import MANY, LocatorError, Locators
+from testkit.oauth_stub import OAuthStub
+from testkit.server import StaticServer
+from testkit.smtp_sink import SmtpSink
+
+
+class SessionPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeAppium().start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.apk = os.path.join(self.tmp.name, "app-debug.apk")
+        with open(self.apk, "wb") as f:
+            f.write(b"build 1")
+        self.state = os.path.join(self.tmp.name, "installed.json")
+        self.resets = 0
+
+    def tearDown(self):
+        self.fake.stop()
+        self.tmp.cleanup()
+
+    def make_pool(self, udid="emulator-5554"):
+        def reset(driver):
+            self.resets += 1
+            driver.execute_script("flutter:waitFor", "EmailField", 1)
+        caps = {"platformName": "Android"}
+        if udid:
+            caps["udid"] = udid
+        return SessionPool(self.fake.url, caps, self.apk,
+                           reset=reset, create=W3CSession, state_file=self.state)
+
+    def test_one_session_is_shared_and_reset_between_tests(self):
+        """Three acquires create one session and reset it twice in-app."""
+        pool = self.make_pool()
+        drivers = [pool.acquire() for _ in range(3)]
+        self.assertEqual(len({d.session_id for d in drivers}), 1)
+        self.assertEqual(len(self.fake.created), 1)
+        self.assertEqual(self.resets, 2)
+        pool.close()
+        self.assertEqual(self.fake.deleted, [drivers[0].session_id])
+
+    def test_apk_is_reinstalled_only_when_its_hash_changes(self):
+        """A second run with the same APK skips the install; a rebuilt APK forces one."""
+        pool = self.make_pool()
+        pool.acquire()
+        pool.close()
+        self.assertTrue(self.fake.created[-1]["enforceAppInstall"])
+
+        pool = self.make_pool()
+        pool.acquire()
+        pool.close()
+        self.assertFalse(self.fake.created[-1]["enforceAppInstall"])
+        self.assertTrue(self.fake.created[-1]["noReset"])
+
+        with open(self.apk, "wb") as f:
+            f.write(b"build 2")
+        pool = self.make_pool()
+        pool.acquire()
+        pool.close()
+        self.assertTrue(self.fake.created[-1]["enforceAppInstall"])
+        self.assertEqual(pool.installs, 1)
+
+    def test_installs_are_tracked_per_device(self):
+        """An install on one emulator doesn't count for another, or for an unknown device."""
+        for udid in ("emulator-5554", "emulator-5556", "emulator-5554", None, None):
+            pool = self.make_pool(udid)
+            pool.acquire()
+            pool.close()
+        self.assertEqual([c["enforceAppInstall"] for c in self.fake.created],
+                         [True, True, False, True, True])
+
+    def test_broken_session_is_replaced(self):
+        """If the in-app reset fails the pool quits that session and starts a new one."""
+        pool = self.make_pool()
+        first = pool.acquire()
+        self.fake.sessions.clear()  # the server forgets the session, so the reset fails
+        second = pool.acquire()
+        self.assertNotEqual(first.session_id, second.session_id)
+        self.assertEqual(pool.sessions_created, 2)
+        pool.close()
+
+
+class ProfilerTests(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeAppium().start()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.fake.stop()
+        self.tmp.cleanup()
+
+    def test_commands_are_attributed_to_the_running_test(self):
+        """Each command lands under the test that sent it, fixtures under (fixtures)."""
+        prof = profiler.Profiler()
+        prof.enabled = True  # without enable(): no global waits/schedule hooks
+        driver = prof.attach(W3CSession(self.fake.url, {}))
+        prof.start_test("suite.A.test_one")
+        driver.execute_script("flutter:waitFor", "EmailField", 1)
+        driver.execute_script("flutter:waitFor", "EmailField", 1)
+        prof.stop_test()
+        driver.quit()
+
+        report = prof.report()
+        test = report["tests"]["suite.A.test_one"]
+        self.assertEqual(test["commands"], 2)
+        self.assertIsNotNone(test["wall"])
+        self.assertIn("(fixtures)", report["tests"])
+        self.assertEqual(report["totals"]["command"]["count"], 3)  # + quit
+        self.assertLessEqual(len(report["slowest"]), 20)
+
+    def test_worker_reports_merge(self):
+        """merge() sums totals and keeps every test from every worker."""
+        paths = []
+        for worker in range(2):
+            prof = profiler.Profiler()
+            prof.start_test(f"suite.A.test_{worker}")
+            prof.events.append((prof.current_test, "command", "executeScript", 0.5, None))
+            prof.stop_test()
+            path = os.path.join(self.tmp.name, f"profile.w{worker}.json")
+            with open(path, "w") as f:
+                json.dump(prof.report(), f)
+            paths.append(path)
+        out = profiler.merge(paths, os.path.join(self.tmp.name, "profile.json"))
+        with open(out) as f:
+            merged = json.load(f)
+        self.assertEqual(merged["totals"]["command"], {"count": 2, "seconds": 1.0})
+        self.assertEqual(sorted(merged["tests"]), ["suite.A.test_0", "suite.A.test_1"])
+
+    def test_stale_worker_reports_are_removed(self):
+        """A new parallel run starts without the worker parts of an earlier, wider one."""
+        out = os.path.join(self.tmp.name, "profile.json")
+        for worker in range(3):
+            open(profiler.worker_report(out, worker), "w").close()
+        open(out, "w").close()
+        profiler.remove_worker_reports(out)
+        self.assertEqual(os.listdir(self.tmp.name), ["profile.json"])
+
+    def test_result_hooks_tag_the_running_test(self):
+        """enable() follows tests through schedule's result hooks, not a patched TestResult."""
+        prof = profiler.Profiler()
+        seen = []
+
+        class Case(unittest.TestCase):
+            def test_one(self):
+                seen.append(prof.current_test)
+
+        prof.enable()
+        self.addCleanup(schedule.listeners.remove, prof._on_test)
+        self.addCleanup(waits.listeners.remove, prof._on_wait)
+        unittest.TestLoader().loadTestsFromTestCase(Case).run(schedule.ListeningResult())
+        self.assertTrue(seen[0].endswith("Case.test_one"))
+        self.assertIn(seen[0], prof.tests)
+        self.assertIsNone(prof.current_test)
+
+
+class SmtpSinkTests(unittest.TestCase):
+    def setUp(self):
+        self.sink = SmtpSink().start()
+
+    def tearDown(self):
+        self.sink.stop()
+
+    def send(self, to, subject, body):
+        msg = EmailMessage()
+        msg["From"] = "cs458 <app@example.com>"
+        msg["To"] = to
+        msg["Subject"] = subject
+        msg.set_content(body)
+        with smtplib.SMTP(self.sink.host, self.sink.port) as smtp:
+            smtp.send_message(msg)
+
+    def test_wait_for_returns_the_matching_mail(self):
+        """The survey mail is found by recipient and subject and its fields parsed."""
+        self.send("other@example.com", "AI Survey Response", "Name-Surname: Someone")
+        after = self.sink.mark()
+        self.send("example@gmail.com", "AI Survey Response",
+                  "      Name-Surname: Tester\n      City: Izmir\n")
+        mail = self.sink.wait_for(to="example@gmail.com", subject="AI Survey Response",
+                                  after=after, timeout=5)
+        self.assertEqual(mail.mail_from, "app@example.com")
+        self.assertEqual(mail.fields(), {"Name-Surname": "Tester", "City": "Izmir"})
+        with self.assertRaises(AssertionError):
+            self.sink.wait_for(to="nobody@example.com", timeout=0.2)
+
+    def test_concurrent_senders_are_all_captured(self):
+        """200 mails from 20 parallel connections all land in the index."""
+        def sender(n):
+            for k in range(10):
+                self.send(f"user{n}@example.com", f"survey {k}", f"Sender: {n}")
+
+        with ThreadPoolExecutor(20) as pool:
+            list(pool.map(sender, range(20)))
+        self.assertEqual(len(self.sink.messages), 200)
+        self.assertEqual(len(self.sink.find(to="user7@example.com")), 10)
+        self.assertEqual(len(self.sink.find(subject="survey 3")), 20)
+
+
+class ImpactTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name in ("index.html", "app.js", "other.js"):
+            self.write(name, f"// {name}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.tmp.name, name), "w") as f:
+            f.write(text)
+
+    def test_files_served_during_a_test_are_recorded(self):
+        """Only requests made between start() and stop() count, query strings ignored."""
+        recorder = impact.RECORDER.enable()
+        with StaticServer(self.tmp.name) as server:
+            urllib.request.urlopen(server.url_for("other.js")).read()
+            recorder.start()
+            urllib.request.urlopen(server.url_for("index.html")).read()
+            urllib.request.urlopen(server.url_for("app.js?v=2")).read()
+            served = recorder.stop()
+        self.assertEqual(sorted(os.path.basename(p) for p in served), ["app.js", "index.html"])
+
+    def test_only_tests_with_changed_inputs_run_again(self):
+        """Editing app.js re-runs the test that loaded it; failed tests always re-run."""
+        path = lambda name: os.path.join(self.tmp.name, name)
+        hasher = impact.FileHasher()
+        store = impact.update({}, [
+            {"id": "s.A.test_page", "outcome": "ok", "duration": 1.0,
+             "inputs": impact.fingerprint({path("index.html")}, hasher)},
+            {"id": "s.A.test_script", "outcome": "ok", "duration": 1.0,
+             "inputs": impact.fingerprint({path("index.html"), path("app.js")}, hasher)},
+            {"id": "s.A.test_broken", "outcome": "fail", "duration": 1.0,
+             "inputs": impact.fingerprint({path("index.html")}, hasher)},
+        ])
+        impact.save_store(store, path("impact.json"))
+        store = impact.load_store(path("impact.json"))
+        tests = ["test_page", "test_script", "test_broken"]
+        test_id = lambda name: f"s.A.{name}"
+
+        to_run, cached = impact.select(tests, test_id, store)
+        self.assertEqual(to_run, ["test_broken"])
+
+        self.write("app.js", "// edited")
+        to_run, cached = impact.select(tests, test_id, store)
+        self.assertEqual(to_run, ["test_script", "test_broken"])
+        self.assertEqual([t for t, _ in cached], ["test_page"])
+
+
+# Stands in for both chrome and chromedriver: answers every GET on the port it is given
+FAKE_BROWSER = """#!%s
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+port = next(int(a.split("=")[1]) for a in sys.argv if a.startswith(("--port=", "--remote-debugging-port=")))
+class H(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+    def log_message(self, *args):
+        pass
+HTTPServer(("127.0.0.1", port), H).serve_forever()
+"""
+
+
+class StaticServerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.write("index.html", "<p>hello</p>")  # start() probes /
+        self.write("app.js", "console.log('hello');\n" * 50)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def get(self, server, path, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        try:
+            conn.request("GET", path, headers=headers or {})
+            resp = conn.getresponse()
+            return resp.status, dict(resp.getheaders()), resp.read()
+        finally:
+            conn.close()
+
+    def test_idle_keep_alive_connections_free_their_worker(self):
+        """With every worker held by an idle client, a new client is served after idle_timeout."""
+        with StaticServer(self.tmp.name, workers=1, idle_timeout=0.2) as server:
+            idle = http.client.HTTPConnection("127.0.0.1", server.port)
+            idle.request("GET", "/app.js")
+            idle.getresponse().read()  # the connection stays open, holding the only worker
+            started = time.perf_counter()
+            self.assertEqual(self.get(server, "/app.js")[0], 200)
+            self.assertLess(time.perf_counter() - started, 2)
+            idle.close()
+
+    def test_matching_etag_gets_an_empty_304(self):
+        """If-None-Match with the current ETag is answered 304 without a body."""
+        with StaticServer(self.tmp.name) as server:
+            status, headers, _ = self.get(server, "/app.js")
+            self.assertEqual(status, 200)
+            status, headers, body = self.get(server, "/app.js", {"If-None-Match": headers["ETag"]})
+        self.assertEqual((status, body), (304, b""))
+        self.assertEqual(headers["Cache-Control"], "no-cache")
+
+    def test_changed_file_gets_a_new_etag(self):
+        """An edit on disk is served with a new ETag; the old one no longer matches."""
+        with StaticServer(self.tmp.name) as server:
+            old = self.get(server, "/app.js")[1]["ETag"]
+            path = self.write("app.js", "console.log('changed');\n" * 50)
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+            status, headers, body = self.get(server, "/app.js", {"If-None-Match": old})
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["ETag"], old)
+        self.assertIn(b"changed", body)
+
+    def test_gzip_is_sent_when_accepted(self):
+        """Accept-Encoding: gzip gets a gzip body that decompresses to the file."""
+        with StaticServer(self.tmp.name) as server:
+            status, headers, body = self.get(server, "/app.js", {"Accept-Encoding": "gzip"})
+            plain = self.get(server, "/app.js")
+        with open(os.path.join(self.tmp.name, "app.js"), "rb") as f:
+            original = f.read()
+        self.assertEqual((status, headers["Content-Encoding"]), (200, "gzip"))
+        self.assertEqual(gzip.decompress(body), original)
+        self.assertLess(len(body), len(original))
+        self.assertNotIn("Content-Encoding", plain[1])
+        self.assertEqual(plain[2], original)
+
+    def test_keep_alive_responses_are_not_delayed(self):
+        """Repeat 200s on one connection come back as fast as the first (no Nagle stall)."""
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "index.html"), "w") as f:
+                f.write("<p>hello</p>" * 100)
+            with StaticServer(tmp) as server:
+                conn = http.client.HTTPConnection("127.0.0.1", server.port)
+                times = []
+                for _ in range(6):
+                    started = time.perf_counter()
+                    conn.request("GET", "/index.html")
+                    resp = conn.getresponse()
+                    self.assertEqual(resp.status, 200)
+                    resp.read()
+                    times.append(time.perf_counter() - started)
+                conn.close()
+        # a delayed-ACK stall costs ~40 ms per request after the first
+        self.assertLess(sum(times[1:]), 0.1, [f"{t * 1000:.1f} ms" for t in times])
+
+
+class BrowserDaemonTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name in ("chrome", "chromedriver"):
+            path = os.path.join(self.tmp.name, name)
+            with open(path, "w") as f:
+                f.write(FAKE_BROWSER % sys.executable)
+            os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        self.env = dict(os.environ)
+        os.environ["PATH"] = self.tmp.name + os.pathsep + os.environ["PATH"]
+        os.environ["CS458_CHROME"] = "chrome"
+        os.environ["CS458_CACHE"] = self.tmp.name
+        self.daemon = browser.BrowserDaemon(browser.chrome_args(), worker=0)
+
+    def tearDown(self):
+        self.daemon.stop()
+        os.environ.clear()
+        os.environ.update(self.env)
+        self.tmp.cleanup()
+
+    def test_later_runs_reuse_the_running_daemon(self):
+        """ensure() starts both processes once; the next call finds them healthy."""
+        first = self.daemon.ensure()
+        self.assertTrue(browser.BrowserDaemon.healthy(first))
+        again = browser.BrowserDaemon(browser.chrome_args(), worker=0).ensure()
+        self.assertEqual(again, first)
+
+    def test_dead_browser_is_respawned(self):
+        """If Chrome is gone the pair is replaced and the state file updated."""
+        first = self.daemon.ensure()
+        os.kill(first["chrome_pid"], 15)
+        os.waitpid(first["chrome_pid"], 0)
+        second = self.daemon.ensure()
+        self.assertNotEqual(second["chrome_pid"], first["chrome_pid"])
+        self.assertTrue(browser.BrowserDaemon.healthy(second))
+        self.assertEqual(self.daemon.state(), second)
+
+
+class OAuthStubTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = OAuthStub().start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def request(self, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        try:
+            with urllib.request.urlopen(self.stub.url + path, data) as resp:
+                return resp.status, resp.read().decode()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode()
+
+    def test_known_account_gets_an_id_token(self):
+        """The sign-in page is served, and /token hands out a JWT with the account's claims."""
+        status, page = self.request("/o/oauth2/v2/auth?client_id=abc&origin=http://localhost")
+        self.assertEqual(status, 200)
+        self.assertIn('name="identifier"', page)
+        self.assertEqual(self.request("/lookup?email=nobody@example.com")[0], 404)
+
+        status, body = self.request("/token", {"provider": "google", "client_id": "abc",
+                                               "email": "tester@gmail.com", "password": "cs458-pass"})
+        self.assertEqual(status, 200)
+        claims = json.loads(body)["credential"].split(".")[1]
+        payload = json.loads(base64.urlsafe_b64decode(claims + "=" * (-len(claims) % 4)))
+        self.assertEqual((payload["email"], payload["aud"]), ("tester@gmail.com", "abc"))
+        status, body = self.request("/token", {"provider": "google", "email": "tester@gmail.com",
+                                               "password": "wrong"})
+        self.assertEqual(status, 401)
+
+    def test_latency_and_failures_can_be_injected(self):
+        """configure() delays every response and turns pages into 500s or denials."""
+        self.stub.configure(latency=0.2, failure="server_error")
+        started = time.perf_counter()
+        self.assertEqual(self.request("/dialog/oauth")[0], 500)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.2)
+
+        self.stub.configure(failure="access_denied")
+        status, body = self.request("/token", {"provider": "facebook", "email": "tester@gmail.com",
+                                               "password": "cs458-pass"})
+        self.assertEqual(json.loads(body), {"error": "access_denied"})
+        self.assertEqual(self.stub.issued, [])
+        with self.assertRaises(ValueError):
+            self.stub.configure(failure="flaky")
+
+    def test_malformed_content_length_answers_400_and_closes(self):
+        """/token refuses a negative or non-numeric length instead of reading until EOF."""
+        port = int(self.stub.url.rsplit(":", 1)[1])
+        for length in ("-1", "12abc"):
+            self.assertIn(" 400 ", raw_post(port, "/token", length), length)
+
+
+class AuthServiceTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["CS458_CACHE"], self.cache = self.tmp.name, os.environ.get("CS458_CACHE")
+
+    def tearDown(self):
+        if self.cache is None:
+            del os.environ["CS458_CACHE"]
+        else:
+            os.environ["CS458_CACHE"] = self.cache
+        self.tmp.cleanup()
+
+    def test_store_checks_hashes_by_identifier(self):
+        """Seeded page accounts and generated users log in; wrong passwords and strangers do not."""
+        store = auth_service.CredentialStore.seeded(40, iterations=10)
+        self.assertEqual(len(store), 44)
+        self.assertTrue(store.check("john@example.com", "12345"))
+        self.assertTrue(store.check("5551234567", "phonePass"))
+        self.assertFalse(store.check("john@example.com", "1234"))
+        self.assertFalse(store.check("nobody@example.com", ""))
+        self.assertNotIn("12345", store.records["john@example.com"])
+
+        users = auth_service.fixture(40, iterations=10)["users"]  # read back from the cache
+        self.assertEqual(users, auth_service.make_fixture(40, iterations=10)["users"])
+        self.assertEqual(sum(u["emailOrPhone"].isdigit() for u in users), 10)
+        self.assertTrue(all(store.check(u["emailOrPhone"], u["password"]) for u in users))
+
+    def test_login_endpoint(self):
+        """POST /login answers 200/401 with CORS headers; /health counts the outcomes."""
+        store = auth_service.CredentialStore.seeded(iterations=10)
+        with auth_service.AuthService(store) as service:
+            def post(body, path="/login"):
+                request = urllib.request.Request(service.url + path, body, {"Content-Type": "text/plain"})
+                try:
+                    with urllib.request.urlopen(request) as resp:
+                        return resp.status, resp.headers, json.loads(resp.read())
+                except urllib.error.HTTPError as e:
+                    return e.code, e.headers, json.loads(e.read())
+
+            status, headers, body = post(json.dumps({"emailOrPhone": "test@@example.comñ",
+                                                     "password": "12345"}).encode())
+            self.assertEqual((status, body), (200, {"ok": True}))
+            self.assertEqual(headers["Access-Control-Allow-Origin"], "*")
+            self.assertEqual(post(b'{"emailOrPhone": "john@example.com", "password": "x"}')[0], 401)
+            self.assertEqual(post(b"not json")[0], 400)
+            self.assertEqual(post(b'{"emailOrPhone": 1}')[0], 400)
+            self.assertEqual(post(b"{}", "/token")[0], 404)
+            with urllib.request.urlopen(service.url + "/health") as resp:
+                self.assertEqual(json.loads(resp.read()), {"logins": 1, "rejected": 1, "users": 4})
+
+    def test_keep_alive_logins_are_not_delayed(self):
+        """Logins after the first on one connection are not held back by Nagle."""
+        store = auth_service.CredentialStore.seeded(iterations=10)
+        with auth_service.AuthService(store) as service:
+            conn = http.client.HTTPConnection("127.0.0.1", int(service.url.rsplit(":", 1)[1]))
+            times = []
+            for _ in range(6):
+                started = time.perf_counter()
+                conn.request("POST", "/login", json.dumps({"emailOrPhone": "5551234567",
+                                                           "password": "phonePass"}))
+                resp = conn.getresponse()
+                self.assertEqual(resp.status, 200)
+                resp.read()
+                times.append(time.perf_counter() - started)
+            conn.close()
+        self.assertLess(sum(times[1:]), 0.1, [f"{t * 1000:.1f} ms" for t in times])
+
+    def test_malformed_content_length_answers_400_and_closes(self):
+        """A negative or non-numeric length gets a 400 at once instead of a read until EOF."""
+        store = auth_service.CredentialStore.seeded(iterations=10)
+        with auth_service.AuthService(store) as service:
+            port = int(service.url.rsplit(":", 1)[1])
+            for length in ("-1", "12abc", "\u00b2"):
+                self.assertIn(" 400 ", raw_post(port, "/login", length), length)
+
+
+def raw_post(port, path, length):
+    """POST with a hand-written Content-Length; returns the status line once the server closes."""
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        request = f"POST {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n"
+        sock.sendall(request.encode("latin-1"))
+        data = b""
+        while chunk := sock.recv(4096):  # times out unless the server closes
+            data += chunk
+    return data.split(b"\r\n", 1)[0].decode()
+
+
+class FakeDomDriver:
+    """Answers the locator script from a {selector: [elements]} dict and logs commands."""
+
+    def __init__(self, dom):
+        self.dom = dom
+        self.commands = []
+
+    def execute(self, driver_command, params=None):
+        self.commands.append(driver_command)
+        return {"value": None}
+
+    def execute_script(self, script, *args):
+        self.execute("w3cExecuteScript")
+        return {key: list(self.dom.get(value, [])) for key, _, value in args[0]}
+
+
+class LocatorTests(unittest.TestCase):
+    SPECS = {
+        "email": ("id", "emailInput"),
+        "login": ("css selector", ".btn-login"),
+        "items": ("class name", "q-item", MANY),
+        "radio": ("css selector", "input[value='{}']"),
+    }
+
+    def setUp(self):
+        self.driver = FakeDomDriver({"emailInput": ["<email>"], ".btn-login": ["<b1>", "<b2>"],
+                                     "q-item": ["<i1>", "<i2>"], "input[value='A']": ["<a>"]})
+        self.page = Locators(self.driver, "login page", self.SPECS)
+
+    def scripts(self):
+        return self.driver.commands.count("w3cExecuteScript")
+
+    def test_lookups_are_batched_and_cached_until_the_page_changes(self):
+        """resolve() is one script; hits cost nothing until a mutating command is sent."""
+        found = self.page.resolve("email", "items")
+        self.assertEqual(found, {"email": "<email>", "items": ["<i1>", "<i2>"]})
+        self.assertEqual(self.scripts(), 1)
+        self.assertEqual(self.page.el("email"), "<email>")
+        self.assertEqual(self.page.el("radio", "A"), "<a>")
+        self.assertEqual(self.scripts(), 2)  # only the new (radio, "A") lookup
+
+        self.driver.execute("clickElement")
+        self.driver.dom["emailInput"] = ["<new email>"]
+        self.assertEqual(self.page.el("email"), "<new email>")
+        self.assertEqual(self.scripts(), 3)
+
+    def test_bad_locators_fail_fast_with_a_clear_error(self):
+        """No match and several matches raise LocatorError naming the locator; no waiting."""
+        with self.assertRaisesRegex(LocatorError, r"login page\.login .* ambiguous: 2 elements"):
+            self.page.el("login")
+        with self.assertRaisesRegex(LocatorError, r"login page\.radio .* with \('B',\) matches nothing"):
+            self.page.el("radio", "B")
+        self.assertEqual(self.page.els("radio", "B"), [])
+        with self.assertRaises(ValueError):
+            Locators(self.driver, "page", {"button": ("xpath", "/html/body/div/div[3]/div[2]")})
+
+
+class ScheduleTests(unittest.TestCase):
+    def history(self, durations, failed=()):
+        history = {"tests": {}, "setup": {"suite": 1.0}}
+        schedule.record(history, [{"id": f"suite.{t}", "duration": d,
+                                   "outcome": "fail" if t in failed else "ok"}
+                                  for t, d in durations.items()])
+        return history
+
+    def test_longest_first_shards_stay_near_the_lower_bound(self):
+        """LPT keeps the slow tests apart; the prediction is close to the lower bound."""
+        durations = {"A.test_google": 9.0, "A.test_a": 1.0, "B.test_rapid": 8.0,
+                     "B.test_b": 1.0, "C.test_c": 1.0, "C.test_d": 1.0}
+        estimates = schedule.Estimates(self.history(durations))
+        tests = sorted(durations)
+        test_id = lambda t: f"suite.{t}"
+        plan = schedule.lpt(tests, 2, test_id, estimates, lambda t: "suite")
+        self.assertEqual(sorted(load for load, _ in plan), [11.0, 12.0])
+        self.assertEqual(sorted(len(s) for _, s in plan), [3, 3])
+        self.assertLessEqual(max(load for load, _ in plan),
+                             schedule.lower_bound(tests, 2, test_id, estimates, lambda t: "suite") + 1.0)
+
+    def test_recent_failures_run_first_and_classes_stay_together(self):
+        durations = {"A.test_slow": 5.0, "A.test_fast": 0.1, "B.test_broken": 0.2, "B.test_mid": 1.0}
+        history = self.history(durations, failed={"B.test_broken"})
+        ordered = schedule.order(sorted(durations), lambda t: f"suite.{t}", schedule.Estimates(history))
+        self.assertEqual(ordered, ["B.test_broken", "B.test_mid", "A.test_slow", "A.test_fast"])
+
+        schedule.record(history, [{"id": "suite.B.test_broken", "duration": 0.2, "outcome": "ok"}] * 4)
+        self.assertFalse(schedule.Estimates(history).failing("suite.B.test_broken"))
+
+
+class PerfBenchTests(unittest.TestCase):
+    def test_only_changes_past_both_thresholds_are_regressions(self):
+        """+25% and the absolute slack must both be exceeded; improvements never fail."""
+        baseline = {"survey 500 questions": {"script_ms": 100.0, "layouts": 4, "heap_mb": 3.0},
+                    "project3 index": {"script_ms": 2.0}}
+        current = {"survey 500 questions": {"script_ms": 180.0, "layouts": 5, "heap_mb": 2.0},
+                   "project3 index": {"script_ms": 6.0}, "survey 1000 questions": {"script_ms": 400.0}}
+        regressions = perfbench.compare(baseline, current)
+        self.assertEqual([(s, m) for s, m, *_ in regressions], [("survey 500 questions", "script_ms")])
+        self.assertAlmostEqual(regressions[0][4], 0.8)
+        self.assertEqual(perfbench.compare(baseline, current, scale=4), [])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            perfbench.save_baseline(current, path)
+            self.assertEqual(perfbench.load_baseline(path), current)
+
+
+class FakeBrowser:
+    """Just enough of a WebDriver for RecyclingDriver: windows, quit, a pid."""
+
+    def __init__(self, n):
+        self.n = n
+        self.window_handles = ["main"]
+        self.implicit_wait = None
+        self.quit_called = False
+        self.browser_pid = os.getpid()
+
+    def implicitly_wait(self, seconds):
+        self.implicit_wait = seconds
+
+    def quit(self):
+        self.quit_called = True
+
+
+class RecyclingDriverTests(unittest.TestCase):
+    def setUp(self):
+        self.made = []
+        self.logged = []
+
+    def make(self, **limits):
+        def factory():
+            self.made.append(FakeBrowser(len(self.made)))
+            return self.made[-1]
+        limits = dict({"rss_mb": 0, "windows": 0, "tests": 0}, **limits)
+        driver = browser.RecyclingDriver(factory, limits, log=self.logged.append)
+        self.addCleanup(driver.quit)
+        return driver
+
+    def run_tests(self, driver, bodies):
+        class Case(unittest.TestCase):
+            pass
+        for i, body in enumerate(bodies):
+            setattr(Case, f"test_{i}", lambda self, body=body: body(driver))
+        unittest.TestLoader().loadTestsFromTestCase(Case).run(schedule.ListeningResult())
+
+    def test_leaked_windows_trigger_a_recycle_between_tests(self):
+        """The next test gets a fresh browser, set up again; the cause is logged."""
+        driver = self.make(windows=2)
+        driver.on_start(lambda d: d.implicitly_wait(0))
+        leak = lambda d: d.window_handles.extend(["tab1", "tab2"])
+        seen = []
+        self.run_tests(driver, [leak, lambda d: seen.append(d.n)])
+
+        self.assertEqual(len(self.made), 2)
+        self.assertTrue(self.made[0].quit_called)
+        self.assertEqual(seen, [1])
+        self.assertEqual(self.made[1].implicit_wait, 0)
+        self.assertEqual(driver.recycles[0]["cause"], "3 windows > 2")
+        self.assertRegex(self.logged[0], r"\[RECYCLE\] browser #2 after 1 tests \(3 windows > 2\)")
+
+    def test_runs_without_the_schedule_hooks_are_reported(self):
+        """A driver whose checkpoint never ran says so when it quits."""
+        driver = self.make(windows=2)
+        unittest.TestLoader().loadTestsFromTestCase(type("Case", (unittest.TestCase,), {
+            "test_0": lambda self: None})).run(unittest.TestResult())
+        driver.quit()
+        self.assertEqual(len(self.logged), 1)
+        self.assertIn("needs the schedule runner", self.logged[0])
+
+    def test_within_limits_nothing_is_replaced(self):
+        """Attributes go to the current browser; memory is read from /proc."""
+        driver = self.make(rss_mb=1 << 20, windows=5, tests=10)
+        driver.custom = "x"
+        self.assertEqual(self.made[0].custom, "x")
+        self.run_tests(driver, [lambda d: None] * 3)
+        self.assertEqual(len(self.made), 1)
+        if os.path.isdir("/proc"):
+            self.assertGreater(driver.usage()["rss_mb"], 1)
+
+
+class FakeDevTools:
+    """One page's DevTools websocket: replies from `results`, a dialog on mouse release."""
+
+    def __init__(self, results):
+        self.results = results
+        self.methods = []
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.url = f"ws://127.0.0.1:{self.sock.getsockname()[1]}/devtools/page/T1"
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        conn, _ = self.sock.accept()
+        self.sock.close()
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += conn.recv(4096)
+        key = next(line.split(b":", 1)[1].strip() for line in request.split(b"\r\n")
+                   if line.lower().startswith(b"sec-websocket-key"))
+        accept = base64.b64encode(hashlib.sha1(key + b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11").digest())
+        conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        reader = conn.makefile("rb")
+        blocked = None
+        while True:
+            head = reader.read(2)
+            if len(head) < 2 or head[0] & 0x0F == 8:
+                break
+            length = head[1] & 0x7F
+            if length == 126:
+                length = int.from_bytes(reader.read(2), "big")
+            elif length == 127:
+                length = int.from_bytes(reader.read(8), "big")
+            mask = reader.read(4)
+            message = json.loads(bytes(b ^ mask[i % 4] for i, b in enumerate(reader.read(length))))
+            method, params = message["method"], message["params"]
+            self.methods.append(method)
+            if method == "Input.dispatchMouseEvent" and params["type"] == "mouseReleased":
+                # like a page whose click handler calls alert(): no reply until it is handled
+                blocked = message["id"]
+                self.send(conn, {"method": "Runtime.consoleAPICalled",
+                                 "params": {"type": "log", "args": [{"type": "string", "value": "loading"}]}})
+                self.send(conn, {"method": "Page.javascriptDialogOpening",
+                                 "params": {"type": "alert", "message": "Invalid survey code"}})
+                continue
+            self.send(conn, {"id": message["id"], "result": self.results.get(method, {})})
+            if method == "Page.handleJavaScriptDialog" and blocked:
+                self.send(conn, {"id": blocked, "result": {}})
+        conn.close()
+
+    @staticmethod
+    def send(conn, message):
+        data = json.dumps(message).encode()
+        conn.sendall(bytes([0x81, len(data)]) + data if len(data) < 126
+                     else bytes([0x81, 126]) + len(data).to_bytes(2, "big") + data)
+
+
+class CdpTests(unittest.TestCase):
+    def test_commands_events_and_dialogs_share_one_websocket(self):
+        """Replies are matched to calls; a dialog opened by a click is recorded and accepted."""
+        devtools = FakeDevTools({"Runtime.evaluate": {"result": {"type": "object", "value": [10, 20]}}})
+        fast = cdp.CdpPath(devtools.url, timeout=5)
+        self.addCleanup(fast.close)
+        self.assertEqual(fast.evaluate("return [10, 20];"), [10, 20])
+
+        fast.click("#loadSurveyBtn")
+        self.assertEqual(fast.wait_for_dialog(1), {"type": "alert", "message": "Invalid survey code"})
+        self.assertEqual(fast.console, [{"type": "log", "text": "loading"}])
+        self.assertEqual(devtools.methods.count("Page.handleJavaScriptDialog"), 1)
+        with self.assertRaises(AssertionError):
+            fast.wait_for_dialog(0.05)
+
+        devtools.results["Runtime.evaluate"] = {"exceptionDetails": {"text": "Uncaught",
+                                                "exception": {"description": "ReferenceError: x"}}}
+        with self.assertRaisesRegex(Exception, "ReferenceError"):
+            fast.evaluate("return x;")
+
+    def test_falls_back_to_webdriver_without_a_debugger_address(self):
+        class Driver:
+            capabilities = {"browserName": "firefox"}
+
+            def execute(self, command, params=None):
+                return None
+
+        self.assertEqual(cdp.fast_path(Driver()).kind, "webdriver")
+
+
+class WidgetSnapshotTests(unittest.TestCase):
+    TREE = {"description": "MaterialApp", "children": [
+        {"description": "Text-[<'Survey Form'>]"},
+        {"description": "Column", "children": [
+            {"description": "TextField-[<'BardConsField'>]"},
+            {"description": "Padding", "children": [{"description": "ElevatedButton-[<'SendSurveyButton'>]"}]},
+        ]},
+    ]}
+
+    def setUp(self):
+        self.fake = FakeAppium().start()
+        self.fake.script_results["flutter:getWidgetDiagnostics"] = self.TREE
+        self.driver = W3CSession(self.fake.url, {})
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def fetches(self):
+        return sum(1 for _, script, _ in self.fake.scripts if script == "flutter:getWidgetDiagnostics")
+
+    def test_many_checks_share_one_snapshot_until_the_next_command(self):
+        """Presence and absence are answered from one call; any command drops the snapshot."""
+        tree = snapshot(self.driver, "<MaterialApp>")
+        self.assertIn("Survey Form", tree)
+        self.assertIn("SendSurveyButton", tree)
+        self.assertNotIn("ChatGPTConsField", snapshot(self.driver, "<MaterialApp>"))
+        self.assertEqual(tree.widgets["BardConsField"], "TextField")
+        self.assertEqual(self.fetches(), 1)
+
+        self.driver.execute_script("flutter:clickElement")
+        self.fake.script_results["flutter:getWidgetDiagnostics"] = {"description": "MaterialApp"}
+        self.assertNotIn("Survey Form", snapshot(self.driver, "<MaterialApp>"))
+        self.assertEqual(self.fetches(), 2)
+
+
+class AppLoginTests(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeAppium().start()
+        self.fake.script_results["flutter:getWidgetDiagnostics"] = WidgetSnapshotTests.TREE
+        self.driver = W3CSession(self.fake.url, {})
+        self.logins = 0
+
+    def tearDown(self):
+        self.fake.stop()
+
+    def login(self, driver):
+        self.logins += 1
+        driver.execute_script("flutter:clickElement")
+
+    def test_one_real_login_then_the_home_page_is_reopened(self):
+        auth = AppLogin(self.login, "<MaterialApp>", "Survey Form")
+        self.fake.script_results["flutter:requestData"] = "home"
+        self.assertEqual(auth.enter(self.driver), "login")
+        self.assertEqual(auth.enter(self.driver), "restored")
+        self.assertEqual(auth.enter(self.driver, real=True), "login")
+        self.assertEqual(self.logins, 2)
+        self.assertIn((self.driver.session_id, "flutter:requestData", ["session:home"]), self.fake.scripts)
+
+    def test_restored_page_must_match_the_real_login(self):
+        """A reopened page with other widgets than the real login's landing page is not used."""
+        auth = AppLogin(self.login, "<MaterialApp>", "Survey Form")
+        self.fake.script_results["flutter:requestData"] = "home"
+        auth.enter(self.driver)
+        self.fake.script_results["flutter:getWidgetDiagnostics"] = {"description": "Column", "children": [
+            {"description": "Text-[<'Survey Form'>]"}]}
+        self.assertEqual(auth.enter(self.driver), "login")
+        self.assertEqual(auth.mismatch[0], ["BardConsField", "SendSurveyButton"])
+        self.assertIn((self.driver.session_id, "flutter:requestData", ["session:login"]), self.fake.scripts)
+
+    def test_apps_without_the_handler_log_in_for_real(self):
+        auth = AppLogin(self.login, "<MaterialApp>", "Survey Form")
+        self.fake.script_results["flutter:requestData"] = None
+        auth.enter(self.driver)
+        self.assertEqual(auth.enter(self.driver), "login")
+        self.assertEqual(auth.summary(), "[LOGIN] 2 real logins, 0 restored")
+
+
+class FakePage:
+    """A page reduced to element styles, web storage and cookies, for WebLogin."""
+
+    def __init__(self):
+        self.cookies = []
+        self.reload()
+
+    def reload(self):
+        self.styles = {"loginContainer": None, "surveyContainer": "display: none;", "message": None}
+        self.local, self.session = {}, {}
+
+    def execute_script(self, script, *args):
+        if script == auth_state._STATE_JS:
+            return {"styles": dict(self.styles), "local": dict(self.local), "session": dict(self.session)}
+        if script == auth_state._APPLY_JS:
+            state = args[0]
+            if any(element not in self.styles for element in state["styles"]):
+                return False
+            self.styles.update(state["styles"])
+            self.local.update(state["local"])
+            self.session.update(state["session"])
+            return True
+        raise AssertionError(f"unexpected script {script!r}")
+
+    def get_cookies(self):
+        return list(self.cookies)
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+
+
+class WebLoginTests(unittest.TestCase):
+    def setUp(self):
+        self.page = FakePage()
+        self.logins = 0
+        self.auth = WebLogin(self.login, ready=lambda d: d.styles["surveyContainer"] == "display: block;")
+
+    def login(self, page):
+        self.logins += 1
+        page.styles.update(loginContainer="display: none;", surveyContainer="display: block;")
+        page.local["user"] = "testuser@example.com"
+        page.cookies.append({"name": "sid", "value": "abc"})
+
+    def test_one_real_login_then_its_state_is_replayed(self):
+        """Only the styles the login changed are kept; storage and cookies come back too."""
+        self.assertEqual(self.auth.enter(self.page), "login")
+        self.assertEqual(set(self.auth.state["styles"]), {"loginContainer", "surveyContainer"})
+
+        self.page.reload()
+        self.page.cookies = []  # a fresh browser context
+        self.assertEqual(self.auth.enter(self.page), "restored")
+        self.assertEqual(self.page.styles["loginContainer"], "display: none;")
+        self.assertEqual(self.page.local, {"user": "testuser@example.com"})
+        self.assertEqual(self.page.cookies, [{"name": "sid", "value": "abc"}])
+
+        self.page.reload()
+        self.assertEqual(self.auth.enter(self.page, real=True), "login")
+        self.assertEqual(self.logins, 2)
+        self.assertEqual(self.auth.summary(), "[LOGIN] 2 real logins, 1 restored")
+
+    def test_changed_page_falls_back_to_the_real_login(self):
+        """When the captured elements are gone the state is not forced onto the page."""
+        self.auth.enter(self.page)
+        self.page.reload()
+        del self.page.styles["loginContainer"]
+        self.assertEqual(self.auth.enter(self.page), "login")
+        self.assertEqual((self.logins, self.auth.restored), (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
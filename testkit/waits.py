@@ -0,0 +1,163 @@
+"""Event-driven waits with adaptive polling, shared by all three suites.
+
+`Waiter` is a drop-in for selenium's WebDriverWait: `until(method)` calls
+`method(driver)` until it returns something truthy. Instead of a fixed
+0.5 s poll it starts at a few milliseconds and backs off, so a condition
+that is already true (or becomes true quickly) costs almost nothing.
+
+Every wait is recorded in `STATS`, so a suite can print how long it
+actually spent waiting with `summary()`.
+"""
+
+import time
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+
+class WaitRecord:
+    __slots__ = ("label", "seconds", "polls", "ok")
+
+    def __init__(self, label, seconds, polls, ok):
+        self.label = label
+        self.seconds = seconds
+        self.polls = polls
+        self.ok = ok
+
+
+STATS = []
+
+# Hooks called with every finished WaitRecord (used by the profiler).
+listeners = []
+
+
+def _record(label, started, polls, ok):
+    rec = WaitRecord(label, time.perf_counter() - started, polls, ok)
+    STATS.append(rec)
+    for listener in listeners:
+        listener(rec)
+    return rec
+
+
+def summary(top=5):
+    """One-paragraph report of the waits recorded so far."""
+    if not STATS:
+        return "[WAIT] no waits recorded"
+    total = sum(r.seconds for r in STATS)
+    timeouts = sum(1 for r in STATS if not r.ok)
+    lines = [f"[WAIT] {len(STATS)} waits, {total:.2f}s total, {timeouts} timed out"]
+    for r in sorted(STATS, key=lambda r: r.seconds, reverse=True)[:top]:
+        lines.append(f"[WAIT]   {r.seconds * 1000:8.1f} ms  {r.polls:3d} polls  {r.label}")
+    return "\n".join(lines)
+
+
+class Waiter:
+    """Poll a condition with exponential backoff until it holds or the deadline passes."""
+
+    def __init__(self, driver, timeout=5, initial=0.005, factor=1.6, max_interval=0.25,
+                 ignored_exceptions=(NoSuchElementException,)):
+        self.driver = driver
+        self.timeout = timeout
+        self.initial = initial
+        self.factor = factor
+        self.max_interval = max_interval
+        self.ignored_exceptions = tuple(ignored_exceptions)
+
+    def until(self, method, message="", timeout=None, label=None):
+        """Return the first truthy value of method(driver); raise TimeoutException otherwise."""
+        label = label or message or getattr(method, "__name__", repr(method))
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        deadline = started + timeout
+        interval = self.initial
+        polls = 0
+        while True:
+            polls += 1
+            try:
+                value = method(self.driver)
+                if value:
+                    _record(label, started, polls, True)
+                    return value
+            except self.ignored_exceptions:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                _record(label, started, polls, False)
+                raise TimeoutException(message or f"timed out after {timeout}s waiting for {label}")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * self.factor, self.max_interval)
+
+    def until_not(self, method, message="", timeout=None, label=None):
+        """Wait until method(driver) is falsy (a missing element counts as falsy)."""
+        def negated(driver):
+            try:
+                return not method(driver)
+            except self.ignored_exceptions:
+                return True
+        return self.until(negated, message, timeout, label or f"not {getattr(method, '__name__', method)}")
+
+
+# ---------------------------------------------------------------- web signals
+
+_DOM_SETTLED_JS = """
+const quiet = arguments[0], limit = arguments[1], done = arguments[arguments.length - 1];
+const start = performance.now();
+let last = start;
+const obs = new MutationObserver(() => { last = performance.now(); });
+obs.observe(document.documentElement,
+            {subtree: true, childList: true, attributes: true, characterData: true});
+(function check() {
+  const now = performance.now();
+  if (document.readyState === 'complete' && now - last >= quiet) { obs.disconnect(); done(now - start); }
+  else if (now - start >= limit) { obs.disconnect(); done(-1); }
+  else setTimeout(check, 10);
+})();
+"""
+
+
+def page_ready(driver, timeout=10):
+    """Wait for document.readyState == 'complete'."""
+    return Waiter(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") == "complete",
+        label="document ready")
+
+
+def dom_settled(driver, quiet=0.1, timeout=5):
+    """Block until the DOM has had no mutations for `quiet` seconds.
+
+    The observer runs inside the page, so this is one WebDriver round-trip
+    no matter how long the page takes. Returns False if the page was still
+    changing when `timeout` ran out.
+    """
+    started = time.perf_counter()
+    if timeout + 1 > 30:
+        driver.set_script_timeout(timeout + 1)
+    waited = driver.execute_async_script(_DOM_SETTLED_JS, quiet * 1000, timeout * 1000)
+    _record(f"dom settled ({quiet * 1000:.0f} ms quiet)", started, 1, waited >= 0)
+    return waited >= 0
+
+
+# ------------------------------------------------------------ flutter signals
+
+def flutter_first_frame(driver):
+    """Wait for the Flutter app to render its first frame (replaces post-launch sleeps)."""
+    started = time.perf_counter()
+    driver.execute_script("flutter:waitForFirstFrame")
+    _record("flutter first frame", started, 1, True)
+
+
+def flutter_wait_for(driver, finder, timeout=5, absent=False, tappable=False):
+    """Run flutter:waitFor / waitForAbsent / waitForTappable; True when the condition held.
+
+    The Flutter driver synchronises these with the frame scheduler, so they
+    return as soon as the widget tree has settled into the wanted state.
+    """
+    command = "flutter:waitForAbsent" if absent else (
+        "flutter:waitForTappable" if tappable else "flutter:waitFor")
+    started = time.perf_counter()
+    try:
+        driver.execute_script(command, finder, timeout)
+        ok = True
+    except Exception:
+        ok = False
+    _record(command.split(":")[1], started, 1, ok)
+    return ok